@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from database import db, as_date
+from models import Application
+from dashboard import status_counts_statement
+
+ANALYTICS_WEEKS = 26
+MAX_ANALYTICS_WEEKS = 104
+
+# per-user results are dropped when that user's applications change in this
+# process. The ttl only bounds how stale another gunicorn worker's copy can get
+ANALYTICS_CACHE_TTL = 60
+ANALYTICS_CACHE_SIZE = 1024
+
+INTERVIEW_STATUSES = ('Interviewing', 'Offer')  # an offer means the interview happened too
+
+
+class AnalyticsCache:
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_SIZE, ttl: float = ANALYTICS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: tuple, value: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+
+analytics_cache = AnalyticsCache()
+
+
+def week_start(when: date) -> date:
+    # weeks start on monday, same as leaderboards.week_key
+    return when - timedelta(days=when.weekday())
+
+
+def _week_bucket(column, dialect: str):
+    if dialect == 'postgresql':
+        return db.func.date(db.func.date_trunc('week', column))
+    # monday on or before the date
+    return db.func.date(column, '-6 days', 'weekday 1')
+
+
+def weekly_statement(user_id: int, since: datetime, dialect: str):
+    when = db.func.coalesce(Application.applied_date, Application.created_at)
+    week = _week_bucket(when, dialect).label('week')
+    return db.select(
+        week,
+        db.func.count(Application.id),
+        db.func.sum(db.case((Application.status.in_(INTERVIEW_STATUSES), 1), else_=0)),
+        db.func.sum(db.case((Application.status == 'Offer', 1), else_=0))
+    ).where(Application.user_id == user_id, when >= since).group_by(week).order_by(week)
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def build_weeks(rows, first_week: date, last_week: date) -> List[Dict]:
+    by_week = {as_date(week): (total, interviews, offers) for week, total, interviews, offers in rows}
+    weeks = []
+    week = first_week
+    while week <= last_week:
+        total, interviews, offers = by_week.get(week, (0, 0, 0))
+        weeks.append({
+            'week': week.isoformat(),
+            'applications': total,
+            'interviews': interviews or 0,
+            'offers': offers or 0,
+            'interview_rate': _rate(interviews or 0, total),
+            'offer_rate': _rate(offers or 0, total)
+        })
+        week += timedelta(days=7)
+    return weeks
+
+
+def build_funnel(status_counts: Dict[str, int]) -> Dict:
+    total = sum(status_counts.values())
+    interviews = sum(status_counts.get(status, 0) for status in INTERVIEW_STATUSES)
+    offers = status_counts.get('Offer', 0)
+    return {
+        'funnel': {
+            'applied': total,
+            'interviewing': interviews,
+            'offer': offers,
+            'rejected': status_counts.get('Rejected', 0),
+            'ghosted': status_counts.get('Ghosted', 0),
+            'withdrawn': status_counts.get('Withdrawn', 0)
+        },
+        'conversion': {
+            'interview_rate': _rate(interviews, total),
+            'offer_rate': _rate(offers, total),
+            'offer_per_interview_rate': _rate(offers, interviews)
+        }
+    }
+
+
+def get_user_analytics(user_id: int, weeks: int = ANALYTICS_WEEKS, today: Optional[date] = None) -> Dict:
+    """Weekly volume and conversion plus the lifetime status funnel, all
+    aggregated by the database. Cached per user until their next write"""
+    weeks = max(1, min(weeks, MAX_ANALYTICS_WEEKS))
+    today = today or datetime.utcnow().date()
+    cache_key = (user_id, weeks, today)
+    cached = analytics_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    last_week = week_start(today)
+    first_week = last_week - timedelta(weeks=weeks - 1)
+    dialect = db.session.get_bind().dialect.name
+
+    weekly_rows = db.session.execute(
+        weekly_statement(user_id, datetime.combine(first_week, datetime.min.time()), dialect)
+    ).all()
+    status_counts = dict(db.session.execute(status_counts_statement(user_id)).all())
+
+    result = {
+        'weeks': build_weeks(weekly_rows, first_week, last_week),
+        **build_funnel(status_counts),
+        'range': {'weeks': weeks, 'since': first_week.isoformat()}
+    }
+    analytics_cache.set(cache_key, result)
+    return result
+
+
+# drop cached analytics for users whose applications changed, after commit so
+# a rolled back write doesn't throw away a good entry
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault('analytics_changed_users', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Application) and obj.user_id is not None:
+            changed.add(obj.user_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('analytics_changed_users', ()):
+        analytics_cache.invalidate_user(user_id)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_changed_users(session, previous_transaction):
+    session.info.pop('analytics_changed_users', None)
@@ -1,39 +1,81 @@
 from flask import Flask
 from flask_cors import CORS
-from database import db
+from werkzeug.middleware.proxy_fix import ProxyFix
+from database import db, create_missing_columns, create_missing_indexes
 from routes import app_routes
+from progression import init_progression
+from serializers import FastJSONProvider
+from compression import init_compression
+from profiler import init_profiler
+from companies import init_companies, ensure_trigram_index
+from search import ensure_search_index
+from insights import init_insights
+from streaks import init_streaks
+from status_history import init_status_history
+from events import init_events
+from recompute import init_recompute
+from replicas import configure_replica_binds, init_replicas
+from ratelimit import init_rate_limiting
 import os
 from config import config
+from engine_profiles import normalize_database_url, build_engine_options, install_sqlite_pragmas
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+def trust_proxies(wsgi_app, config):
+    """Take the client address and scheme from the last TRUSTED_PROXY_HOPS
+    X-Forwarded-* entries, anything a client sends beyond those is ignored"""
+    hops = config['TRUSTED_PROXY_HOPS']
+    return ProxyFix(wsgi_app, x_for=hops, x_proto=hops) if hops else wsgi_app
+
 def create_app(config_name=None):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
     # Load configuration
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
-    # SSL for PostgreSQL on Render
-    if os.environ.get('DATABASE_URL'):
-        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
-        
-        # if in sqlalchemy engine options, apply the ssl configuration
-        if hasattr(config[config_name], 'SQLALCHEMY_ENGINE_OPTIONS'):
-            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = config[config_name].SQLALCHEMY_ENGINE_OPTIONS
-            print("SSL configuration applied for PostgreSQL") # debugging message
+    # DATABASE_URL can change after config.py is imported (scripts, tests)
+    database_url = os.environ.get('DATABASE_URL') or app.config['SQLALCHEMY_DATABASE_URI']
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(database_url)
+    replica_urls = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url] or app.config['DATABASE_REPLICA_URLS']
+    configure_replica_binds(app, replica_urls)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config, database_url)
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, app.config)
+        init_replicas(app, db)
+        # registered before the other hooks so the profile covers them too
+        init_profiler(app, db.engines)
+        init_events(app)
+    init_progression(app)
+    init_companies(app)
+    init_insights(app)
+    init_streaks(app)
+    init_status_history(app)
+    init_recompute(app)
     
     # Security middleware
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
     
+    # Token buckets and concurrency caps, registered as app.extensions['limiter']
+    init_rate_limiting(app)
+    
+    # Compress large responses (applications list, import results, exports)
+    init_compression(app)
+    
     # Register blueprints
     app.register_blueprint(app_routes)
     
+    # behind a proxy every client would otherwise share its address
+    app.wsgi_app = trust_proxies(app.wsgi_app, app.config)
+    
     return app
 
 app = create_app()
@@ -41,6 +83,10 @@ app = create_app()
 # Ensure database tables are created
 with app.app_context():
     db.create_all()
+    create_missing_columns()
+    create_missing_indexes()
+    ensure_trigram_index(app)
+    ensure_search_index(db.engine)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
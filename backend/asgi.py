@@ -0,0 +1,247 @@
+"""
+Optional ASGI entry point.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:application --workers 2
+
+Every route of the Flask app is still served, through a WSGI bridge running
+on a bounded thread pool. Read-heavy, I/O bound paths registered in
+CoopTrackerASGI.routes are served natively on the event loop with an async engine
+(asyncpg / aiosqlite) and fan their queries out concurrently, inside a Flask
+request context so the app's before/after/teardown hooks still run. Each
+async route also exists as a normal Flask route, so gunicorn deployments
+behave the same.
+"""
+
+import asyncio
+import io
+import sys
+import time
+from urllib.parse import parse_qs
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from flask import jsonify
+from app import app as flask_app, trust_proxies
+from database import db
+from async_db import create_async_engine_for
+from dashboard import user_statement, dashboard_statements, build_dashboard
+from routes import verify_jwt_token, STREAM_TOKEN_SCOPE
+from events import broker, format_sse, AsyncSubscription, StreamLimitReached
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    # asgiref runs every WSGI request on one shared thread by default, which
+    # would serialise the whole app. A ThreadSensitiveContext per request gives
+    # each its own thread, the semaphore bounds how many run at once
+    def __init__(self, wsgi_application, max_threads: int):
+        super().__init__(wsgi_application)
+        self.slots = asyncio.Semaphore(max_threads)
+
+    async def __call__(self, scope, receive, send):
+        async with self.slots:
+            async with ThreadSensitiveContext():
+                await super().__call__(scope, receive, send)
+
+
+class CoopTrackerASGI:
+    def __init__(self, app):
+        self.flask_app = app
+        self.wsgi = ThreadPoolWsgiToAsgi(app, app.config['ASGI_WSGI_THREADS'])
+        # native routes skip app.wsgi_app, ProxyFix rewrites their environ in place the same way
+        self.fix_environ = trust_proxies(lambda environ, start_response: None, app.config)
+        self.engine = None
+        self.routes = {
+            ('GET', '/dashboard'): self.dashboard,
+            ('GET', '/events/stream'): self.events
+        }
+
+    def get_engine(self):
+        if self.engine is None:
+            with self.flask_app.app_context():
+                url = db.engine.url.render_as_string(hide_password=False)
+            self.engine = create_async_engine_for(self.flask_app.config, url)
+        return self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+        await handler(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.get_engine()
+                broker.ensure_relay()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def fetch_all(self, statement):
+        # every statement gets its own pooled connection so they run concurrently
+        async with self.get_engine().connect() as conn:
+            return (await conn.execute(statement)).all()
+
+    def current_user_id(self, headers, query_string: bytes = b''):
+        auth_header = headers.get(b'authorization', b'').decode()
+        if auth_header.startswith('Bearer '):
+            with self.flask_app.app_context():
+                return verify_jwt_token(auth_header.split(' ')[1])
+        token = self.stream_token(query_string)
+        if token:
+            with self.flask_app.app_context():
+                return verify_jwt_token(token, scope=STREAM_TOKEN_SCOPE)
+        return None
+
+    @staticmethod
+    def stream_token(query_string: bytes):
+        # EventSource can't set headers, it sends a stream token as ?token= instead
+        return parse_qs(query_string.decode()).get('token', [None])[0]
+
+    async def dashboard(self, scope, receive, send):
+        # the queries run natively, but the request still goes through the Flask
+        # app's hooks (rate limits, profiler, replica bookkeeping, compression,
+        # CORS) so it is answered the same as under gunicorn
+        app = self.flask_app
+        environ = self.wsgi_environ(scope)
+        self.fix_environ(environ, None)
+        with app.request_context(environ):
+            response = app.preprocess_request()
+            if response is None:
+                response = await self.dashboard_response(dict(scope.get('headers') or []))
+            response = app.process_response(app.make_response(response))
+            await self.send_response(send, response)
+
+    async def dashboard_response(self, headers):
+        user_id = self.current_user_id(headers)
+        users = await self.fetch_all(user_statement(user_id))
+        if not users:
+            return jsonify({'error': 'User not found'}), 404
+        user = users[0]
+
+        statements = dashboard_statements(user.id)
+        results = await asyncio.gather(*(self.fetch_all(stmt) for stmt in statements.values()))
+        return jsonify(build_dashboard(user, **dict(zip(statements, results))))
+
+    async def events(self, scope, receive, send):
+        # the same stream as the Flask route, but an open connection costs a
+        # coroutine here instead of a worker thread, so only the per-user cap applies
+        headers = dict(scope.get('headers') or [])
+        query_string = scope.get('query_string', b'')
+        user_id = self.current_user_id(headers, query_string)
+        if user_id is None and self.stream_token(query_string) and not headers.get(b'authorization'):
+            await self.send_json(send, headers, {'error': 'Invalid or expired stream token'}, 401)
+            return
+        if user_id is None:
+            await self.send_json(send, headers, {'error': 'User not found'}, 404)
+            return
+
+        config = self.flask_app.config
+        try:
+            subscription = broker.add(
+                AsyncSubscription(user_id, config['SSE_QUEUE_SIZE'], asyncio.get_running_loop()),
+                config['SSE_MAX_STREAMS_PER_USER']
+            )
+        except StreamLimitReached:
+            await self.send_json(send, headers, {'error': 'Too many open event streams'}, 503)
+            return
+
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')
+            ] + self.cors_headers(headers)})
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+            deadline = time.monotonic() + config['SSE_MAX_STREAM_SECONDS']
+            while not disconnected.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await subscription.get_async(min(config['SSE_HEARTBEAT_SECONDS'], remaining))
+                    chunk = format_sse(message, self.flask_app.json.dumps)
+                except asyncio.TimeoutError:
+                    chunk = ': ping\n\n'
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            broker.remove(subscription)
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def cors_headers(self, request_headers):
+        # same origins flask-cors allows for the WSGI routes
+        origin = request_headers.get(b'origin', b'').decode()
+        if origin and origin in self.flask_app.config['CORS_ORIGINS']:
+            return [
+                (b'access-control-allow-origin', origin.encode()),
+                (b'access-control-allow-credentials', b'true'),
+                (b'vary', b'Origin')
+            ]
+        return []
+
+    @staticmethod
+    def wsgi_environ(scope) -> dict:
+        # enough of a WSGI environ for Flask to match the route and run its hooks,
+        # natively served routes take no request body
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client')
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0] if client else '',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False
+        }
+        for name, value in scope.get('headers') or []:
+            key = name.decode('latin1').upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = f'HTTP_{key}'
+            value = value.decode('latin1')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def send_response(self, send, response):
+        body = response.get_data()
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': [
+            (name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers.items()
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def send_json(self, send, request_headers, payload, status: int = 200):
+        body = self.flask_app.json.dumps(payload).encode()
+        response_headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ] + self.cors_headers(request_headers)
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+application = CoopTrackerASGI(flask_app)
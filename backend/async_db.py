@@ -0,0 +1,62 @@
+from typing import Dict
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from engine_profiles import normalize_database_url, install_sqlite_pragmas
+
+# async drivers are optional, only needed for the ASGI entry point
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+
+def async_database_url(url: str):
+    url = make_url(normalize_database_url(url))
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    # asyncpg doesn't understand libpq's sslmode, it's passed as connect_args instead
+    return url.difference_update_query(['sslmode'])
+
+
+def async_engine_options(config, url: str) -> Dict:
+    parsed = make_url(normalize_database_url(url))
+    backend = parsed.get_backend_name()
+    if backend == 'sqlite' and parsed.database in (None, '', ':memory:'):
+        # in-memory sqlite is a single shared connection, no pool to size
+        return {}
+
+    options = {
+        # the pool is what bounds connections per process, fan-out waits on it.
+        # aiosqlite would default to NullPool for file databases
+        'poolclass': AsyncAdaptedQueuePool,
+        'pool_size': config['ASYNC_DB_POOL_SIZE'],
+        'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT']
+    }
+    if backend == 'postgresql':
+        # same sslmode the sync engine profile picked
+        sync_connect_args = (config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}).get('connect_args', {})
+        default_sslmode = sync_connect_args.get('sslmode', 'prefer')
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = 300
+        options['connect_args'] = {
+            'ssl': parsed.query.get('sslmode') or default_sslmode,
+            'timeout': 10,
+            'server_settings': {
+                'application_name': config['DB_APPLICATION_NAME'],
+                'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])
+            }
+        }
+    return options
+
+
+def create_async_engine_for(config, url: str):
+    """Async engine pointing at the same database as the Flask app. Pass the
+    sync engine's resolved url so relative sqlite paths point at the same file."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(async_database_url(url), **async_engine_options(config, url))
+    install_sqlite_pragmas(engine.sync_engine, config)
+    return engine
@@ -0,0 +1,164 @@
+"""
+Micro-benchmarks for the importer, achievement engine and leaderboard.
+
+Not collected by the normal test run, point pytest at the file:
+
+    python -m pytest benchmarks/bench_internals.py --benchmark-autosave
+    python -m pytest benchmarks/bench_internals.py --benchmark-compare          # vs the last saved run
+    python -m pytest benchmarks/bench_internals.py --benchmark-json=bench.json
+
+Sizes come from BENCH_SIZES (default 10,1000,10000,100000). Each imported row
+checks for duplicates against the user's earlier applications at that
+company, so rows get slower as an import goes on (about 8s for 1,000 rows and
+3 minutes for 10,000 on sqlite). Importer runs above BENCH_MAX_IMPORT_ROWS are
+skipped unless you raise it.
+"""
+
+import os
+import tempfile
+import time
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import pandas as pd
+from sqlalchemy import insert, delete
+from database import db
+from models import User, Application, Achievement
+from bulk_import import ApplicationImporter
+from benchmarks.synthetic_data import SyntheticDataGenerator, generate
+
+SIZES = [int(size) for size in os.environ.get('BENCH_SIZES', '10,1000,10000,100000').split(',')]
+MAX_IMPORT_ROWS = int(os.environ.get('BENCH_MAX_IMPORT_ROWS', 1000))
+BACKENDS = ['sqlite-memory', 'sqlite-file']
+
+
+def _database_url(backend: str) -> str:
+    if backend == 'sqlite-memory':
+        return 'sqlite://'
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'coop_bench.db')}"
+
+
+@pytest.fixture(scope='module', params=BACKENDS)
+def bench_app(request):
+    old_url = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = _database_url(request.param)
+    try:
+        # app.py builds an app from DATABASE_URL on first import, so import it here
+        from app import create_app
+        app = create_app()
+    finally:
+        if old_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = old_url
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+_seeded_users = {}
+
+
+def _user_with_applications(app, size: int) -> User:
+    """One user owning `size` synthetic applications, cached per app and size"""
+    key = (id(app), size)
+    if key not in _seeded_users:
+        user = User(name=f"Bench {size}", email=f"bench_{size}_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        rows = SyntheticDataGenerator(seed=size).application_rows(size)
+        for start in range(0, size, 5000):
+            db.session.execute(insert(Application), [dict(row, user_id=user.id) for row in rows[start:start + 5000]])
+        db.session.commit()
+        _seeded_users[key] = user.id
+    return db.session.get(User, _seeded_users[key])
+
+
+def _reset_achievements(user: User) -> User:
+    user_id = user.id
+    db.session.execute(delete(Achievement).where(Achievement.user_id == user_id))
+    db.session.execute(db.update(User).where(User.id == user_id).values(xp=0, level=1))
+    db.session.commit()
+    # the bulk delete bypasses the identity map, start from a clean session
+    db.session.expunge_all()
+    return db.session.get(User, user_id)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_parse_date(benchmark, size):
+    importer = ApplicationImporter(user_id=0)
+    formats = ['2024-01-15', '01/15/2024', '1-15-2024', '2024/01/15', '9/19', '9/19/24', 'Jan 15 2024', 'not a date']
+    dates = [formats[i % len(formats)] for i in range(size)]
+
+    benchmark(lambda: [importer.parse_date(value) for value in dates])
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_check_duplicate(benchmark, bench_app, size):
+    user = _user_with_applications(bench_app, size)
+    importer = ApplicationImporter(user.id)
+
+    # a miss has to look at every existing application
+    benchmark(importer.check_duplicate, 'Nowhere Inc', 'Not A Real Co-op', None)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_import_from_dataframe(benchmark, bench_app, size):
+    if size > MAX_IMPORT_ROWS:
+        pytest.skip(f"slow at this size, raise BENCH_MAX_IMPORT_ROWS to run {size} rows")
+
+    rows = SyntheticDataGenerator(seed=size).import_rows(size)
+
+    def setup():
+        user = User(name="Import Bench", email=f"import_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        return (ApplicationImporter(user.id), pd.DataFrame(rows)), {}
+
+    def run(importer, df):
+        importer.import_from_dataframe(df)
+        db.session.rollback()
+
+    benchmark.pedantic(run, setup=setup, rounds=3 if size <= 1000 else 1)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_check_and_award_achievements(benchmark, bench_app, size):
+    from routes import check_and_award_achievements
+    user = _user_with_applications(bench_app, size)
+
+    def setup():
+        return (_reset_achievements(user),), {}
+
+    benchmark.pedantic(check_and_award_achievements, setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_check_and_revoke_achievements(benchmark, bench_app, size):
+    from routes import check_and_award_achievements, check_and_revoke_achievements
+    user = _reset_achievements(_user_with_applications(bench_app, size))
+    check_and_award_achievements(user)
+
+    # nothing gets revoked, this measures evaluating every held achievement
+    benchmark(check_and_revoke_achievements, user)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_leaderboard(benchmark, bench_app, size):
+    from routes import get_leaderboard
+
+    key = (id(bench_app), 'leaderboard')
+    seeded = _seeded_users.get(key, 0)
+    if seeded < size:
+        generate(users=size - seeded, apps_per_user=2, seed=size)
+        _seeded_users[key] = size
+
+    def run():
+        with bench_app.test_request_context('/leaderboard'):
+            return get_leaderboard()
+
+    benchmark(run)
+
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Local load test: seeds synthetic users, replays a realistic request mix
+against the Flask app and reports throughput and p50/p95/p99 per endpoint.
+
+    python -m benchmarks.load_test --users 200 --apps 40 --requests 2000 --concurrency 8
+    python -m benchmarks.load_test --save-baseline local
+    python -m benchmarks.load_test --compare-baseline local   # exit code 1 on regression
+
+By default everything runs in-process against a throwaway SQLite file. Pass
+--url to hit a running server instead (the database behind it still gets seeded
+through DATABASE_URL).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# (weight, name, method, path) - roughly what the dashboard and applications pages do
+REQUEST_MIX = [
+    (40, 'GET /applications', 'GET', '/applications'),
+    (30, 'GET /user/profile', 'GET', '/user/profile'),
+    (20, 'GET /leaderboard', 'GET', '/leaderboard'),
+    (5, 'GET /achievements', 'GET', '/achievements'),
+    (5, 'POST /applications/bulk-import', 'POST', '/applications/bulk-import')
+]
+
+BULK_IMPORT_ROWS = 25
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # nearest rank, good enough for latency reporting
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class InProcessTarget:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, headers: Dict, body: Optional[bytes]) -> int:
+        # the flask test client isn't thread safe, give every worker thread its own
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, data=body)
+        return response.status_code
+
+
+class HttpTarget:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method: str, path: str, headers: Dict, body: Optional[bytes]) -> int:
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def build_schedule(total_requests: int, tokens: List[str], seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    from benchmarks.synthetic_data import SyntheticDataGenerator
+    generator = SyntheticDataGenerator(seed)
+
+    weights = [weight for weight, _, _, _ in REQUEST_MIX]
+    schedule = []
+    for _ in range(total_requests):
+        _, name, method, path = rng.choices(REQUEST_MIX, weights=weights)[0]
+        headers = {'Authorization': f'Bearer {rng.choice(tokens)}'}
+        body = None
+        if method == 'POST':
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps({'applications': generator.import_rows(BULK_IMPORT_ROWS)}).encode()
+        schedule.append({'name': name, 'method': method, 'path': path, 'headers': headers, 'body': body})
+    return schedule
+
+
+def run_load(target, schedule: List[Dict], concurrency: int) -> Dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def send(item):
+        started = time.perf_counter()
+        try:
+            status = target.request(item['method'], item['path'], item['headers'], item['body'])
+        except Exception:
+            status = 599
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies[item['name']].append(elapsed_ms)
+            if status >= 400:
+                errors[item['name']] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, schedule))
+    wall_seconds = time.perf_counter() - started
+
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'throughput_rps': round(len(values) / wall_seconds, 2),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2)
+        }
+
+    return {
+        'total_requests': len(schedule),
+        'concurrency': concurrency,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(schedule) / wall_seconds, 2),
+        'endpoints': endpoints
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Endpoints whose p95 got more than `tolerance` slower than the baseline"""
+    regressions = []
+    for name, stats in report['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if not before or not before['p95_ms']:
+            continue
+        if stats['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def print_report(report: Dict):
+    print(f"\n{report['total_requests']} requests in {report['wall_seconds']}s "
+          f"({report['throughput_rps']} req/s, concurrency {report['concurrency']})")
+    print(f"{'endpoint':<34}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, stats in report['endpoints'].items():
+        print(f"{name:<34}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Co-op tracker load test')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--apps', type=int, default=40, help='mean applications per user')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='hit a running server instead of the in-process app')
+    parser.add_argument('--database-url', help='defaults to a throwaway sqlite file')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare-baseline', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown vs baseline')
+    args = parser.parse_args(argv)
+
+    # has to be set before app.py is imported, it builds the app at import time
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    elif not args.url:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'coop_load_test.db')}"
+
+    from app import app
+    from database import db
+    from models import User
+    from routes import create_jwt_token
+    from benchmarks.synthetic_data import generate
+
+    with app.app_context():
+        print(f"Seeding {args.users} users (~{args.apps} applications each)...")
+        totals = generate(args.users, args.apps, args.seed)
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.email.like(f"{totals['email_prefix']}%"))]
+        with app.test_request_context():
+            tokens = [create_jwt_token(user_id) for user_id in user_ids]
+        print(f"✅ {totals['users']} users, {totals['applications']} applications, {totals['achievements']} achievements")
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget(app)
+    schedule = build_schedule(args.requests, tokens, args.seed)
+    report = run_load(target, schedule, args.concurrency)
+    report['dataset'] = {'users': totals['users'], 'applications': totals['applications'], 'seed': args.seed}
+    print_report(report)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save_baseline), 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {baseline_path(args.save_baseline)}")
+
+    if args.compare_baseline:
+        with open(baseline_path(args.compare_baseline)) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Performance regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n✅ No p95 regressions against '{args.compare_baseline}' (tolerance {int(args.tolerance * 100)}%)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
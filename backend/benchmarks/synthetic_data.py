@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic data for benchmarks and load tests.
+
+    python -m benchmarks.synthetic_data --users 500 --apps 40 --seed 7
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List
+from sqlalchemy import insert
+from database import db
+from models import User, Application, Achievement, get_level
+from streaks import activity_day, longest_run
+from recompute import evaluate_rules
+
+# rough shape of a real recruiting cycle, most applications never hear back
+STATUS_WEIGHTS = {
+    'Applied': 52,
+    'Rejected': 20,
+    'Ghosted': 14,
+    'Interviewing': 9,
+    'Offer': 3,
+    'Withdrawn': 2
+}
+
+COMPANY_NAMES = [
+    'Wayfair', 'State Street', 'Fidelity', 'Boston Red Sox', 'TJX', 'HubSpot', 'Vertex', 'Moderna',
+    'MathWorks', 'Raytheon', 'Liberty Mutual', 'Draper', 'iRobot', 'Akamai', 'Klaviyo', 'DraftKings',
+    'Toast', 'Cisco', 'Amazon', 'Google', 'Microsoft', 'Pegasystems', 'Verisk', 'Unilever', 'Keurig Dr. Pepper',
+    'Bose', 'New Balance', 'Reebok', 'Biogen', 'Takeda', 'Putnam', 'MFS Investment', 'Natixis', 'Arbella',
+    'Dell', 'Red Hat', 'Oracle', 'Salesforce', 'Meta', 'Apple'
+]
+
+POSITIONS = [
+    'Software Engineer Co-op', 'Data Science Co-op', 'Data Analyst Co-op', 'Business Analyst Co-op',
+    'Product Management Co-op', 'Financial Analyst Co-op', 'Marketing Co-op', 'IT Engineering Co-op',
+    'Supply Chain Co-op', 'Internal Audit Co-op', 'Research Co-op', 'Operations Co-op'
+]
+
+NOTES = [
+    None, None, None, 'Applied through NUWorks', 'Referral from a friend', 'Cover letter submitted',
+    'Recruiter reached out on LinkedIn', 'Final round scheduled', 'Need to follow up next week'
+]
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed: int = 42, start_date: datetime = None, cycle_days: int = 120):
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.start_date = start_date or datetime(2025, 9, 1)
+        self.cycle_days = cycle_days
+        # zipf-ish popularity so a few companies get most applications, like real data
+        self.company_weights = [1 / (rank + 1) for rank in range(len(COMPANY_NAMES))]
+
+    def random_status(self) -> str:
+        return self.random.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+
+    def random_applied_date(self) -> datetime:
+        # front loaded: most applications go out in the first weeks of the cycle, mostly on weekdays
+        day = int(self.random.triangular(0, self.cycle_days, 0))
+        date = self.start_date + timedelta(days=day)
+        if date.weekday() >= 5 and self.random.random() < 0.7:
+            date -= timedelta(days=date.weekday() - 4)
+        return date + timedelta(hours=self.random.randint(8, 23), minutes=self.random.randint(0, 59))
+
+    def application_rows(self, count: int) -> List[Dict]:
+        rows = []
+        for _ in range(count):
+            applied_date = self.random_applied_date() if self.random.random() > 0.05 else None
+            rows.append({
+                'company': self.random.choices(COMPANY_NAMES, weights=self.company_weights)[0],
+                'position': self.random.choice(POSITIONS),
+                'status': self.random_status(),
+                'applied_date': applied_date,
+                'notes': self.random.choice(NOTES),
+                'created_at': (applied_date or self.start_date) + timedelta(minutes=self.random.randint(0, 600))
+            })
+        return rows
+
+    def applications_per_user(self, mean: int) -> int:
+        # some students apply to a handful of places, some to hundreds
+        return max(1, int(self.random.lognormvariate(0, 0.6) * mean))
+
+    def import_rows(self, count: int) -> List[Dict]:
+        """Rows shaped like a bulk-import upload (strings, loose status names)"""
+        rows = []
+        for row in self.application_rows(count):
+            rows.append({
+                'company': row['company'],
+                'position': f"{row['position']} {self.random.randint(1, 10 ** 6)}",
+                'status': self.random.choice(['Submitted', 'Applied', 'Interviewing', 'Rejected', 'Accepted']),
+                'applied_date': row['applied_date'].strftime('%m/%d/%Y') if row['applied_date'] else '',
+                'notes': row['notes'] or ''
+            })
+        return rows
+
+
+def _earned_achievements(applications: List[Dict]):
+    """Evaluate the achievement rules against plain rows instead of ORM objects"""
+    longest = longest_run(
+        day for day in (activity_day(app['applied_date'], app['created_at']) for app in applications) if day
+    )
+    return evaluate_rules([SimpleNamespace(**app) for app in applications], longest)
+
+
+def generate(users: int, apps_per_user: int, seed: int = 42, batch_size: int = 500) -> Dict:
+    """Insert `users` users with about `apps_per_user` applications each.
+
+    Rows go in through executemany inserts in batches, not the ORM unit of
+    work, so 100k+ rows take seconds. Must be called inside an app context.
+    """
+    generator = SyntheticDataGenerator(seed)
+    # emails have to be unique across runs, the data itself stays reproducible
+    prefix = f"bench{seed}_{int(time.time() * 1000)}"
+    totals = {'users': 0, 'applications': 0, 'achievements': 0}
+
+    for batch_start in range(0, users, batch_size):
+        batch_count = min(batch_size, users - batch_start)
+        per_user_apps = [
+            generator.application_rows(generator.applications_per_user(apps_per_user))
+            for _ in range(batch_count)
+        ]
+
+        user_rows = []
+        earned_per_user = []
+        for offset, applications in enumerate(per_user_apps):
+            xp, earned = _earned_achievements(applications)
+            earned_per_user.append(earned)
+            user_rows.append({
+                'name': f"Bench User {batch_start + offset}",
+                'email': f"{prefix}_{batch_start + offset}@northeastern.edu",
+                'xp': xp,
+                'level': get_level(xp),
+                'joined': generator.start_date
+            })
+
+        db.session.execute(insert(User), user_rows)
+        emails = [row['email'] for row in user_rows]
+        ids_by_email = dict(db.session.query(User.email, User.id).filter(User.email.in_(emails)).all())
+
+        application_rows = []
+        achievement_rows = []
+        for row, applications, earned in zip(user_rows, per_user_apps, earned_per_user):
+            user_id = ids_by_email[row['email']]
+            application_rows.extend(dict(app, user_id=user_id) for app in applications)
+            achievement_rows.extend({
+                'name': achievement_def.name,
+                'description': achievement_def.description,
+                'icon': achievement_def.icon,
+                'condition_met': True,
+                'user_id': user_id
+            } for achievement_def in earned)
+
+        db.session.execute(insert(Application), application_rows)
+        if achievement_rows:
+            db.session.execute(insert(Achievement), achievement_rows)
+        db.session.commit()
+
+        totals['users'] += len(user_rows)
+        totals['applications'] += len(application_rows)
+        totals['achievements'] += len(achievement_rows)
+
+    totals['email_prefix'] = prefix
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate synthetic co-op tracker data')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--apps', type=int, default=40, help='mean applications per user')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        totals = generate(args.users, args.apps, args.seed)
+    print(f"✅ Created {totals['users']} users, {totals['applications']} applications, {totals['achievements']} achievements")
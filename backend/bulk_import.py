@@ -1,22 +1,153 @@
 import pandas as pd
+import numpy as np
+import csv
+import hashlib
 import io
+import json
+import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
-from models import Application, calculate_xp, get_level
-from database import db
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Tuple, Optional
+from models import Application, ImportErrorRow, ImportRowFingerprint, ImportUpload, calculate_xp, get_level
+from database import db, upsert
+from companies import normalize_company_name, resolve_company_ids
+
+# compact results carry this many failures in full, the rest are in the error report
+COMPACT_DETAILED_ERRORS = 20
+REPORT_BATCH_SIZE = 500
+FINGERPRINT_BATCH_SIZE = 500
+HASH_CHUNK_SIZE = 64 * 1024
+
+# one sentence per error code, sent once instead of once per failed row
+ERROR_MESSAGES = {
+    'missing_company': 'Missing required field: company',
+    'missing_position': 'Missing required field: position',
+    'missing_status': 'Missing required field: status',
+    'invalid_status': 'Invalid status',
+    'duplicate': 'Duplicate application',
+    'database_error': 'Could not be saved',
+    'parse_error': 'The file could not be read',
+}
+
+
+def row_ranges(rows: Iterable[int]) -> List[List[int]]:
+    """[2, 3, 4, 7, 9, 10] -> [[2, 4], [7, 7], [9, 10]]"""
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] + 1 == row:
+            ranges[-1][1] = row
+        elif not ranges or ranges[-1][1] != row:
+            ranges.append([row, row])
+    return ranges
+
+
+def row_fingerprint(company: str, position: str, applied_date: str) -> str:
+    """What makes a row the same application again, see check_duplicate"""
+    key = '\x1f'.join([normalize_company_name(company), position.strip().lower(), applied_date.strip()])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def hash_upload(stream, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """sha256 of an uploaded file, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_applications(applications: List[Dict]) -> str:
+    return hashlib.sha256(json.dumps(applications, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ImportRow(NamedTuple):
+    row: int
+    company: str
+    position: str
+    status: str
+    applied_date: Optional[datetime]
+    notes: Optional[str]
+    fingerprint: str
+
+
+# results stay as small slotted records while the import runs, a 1000 row
+# import used to keep a dict per row plus the cleaned copy of every cell.
+# Item access is kept for callers that treated them as dicts
+@dataclass(slots=True)
+class ImportSuccess:
+    row: int
+    application_id: int
+    company: str
+    position: str
+    status: str
+    xp_gained: int
+    fingerprint: str = ''
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        return {
+            'row': self.row,
+            'application_id': self.application_id,
+            'company': self.company,
+            'position': self.position,
+            'status': self.status,
+            'xp_gained': self.xp_gained
+        }
+
+
+@dataclass(slots=True)
+class ImportFailure:
+    row: int
+    data: Dict
+    errors: List[str]
+    codes: List[str]  # one per error, see ERROR_MESSAGES
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        return {'row': self.row, 'data': self.data, 'errors': self.errors}
 
 
 class BulkImportResult:
+    __slots__ = ('successful_imports', 'failed_imports', 'total_xp_gained', 'duplicates_skipped')
+
     def __init__(self):
-        self.successful_imports: List[Dict] = []
-        self.failed_imports: List[Dict] = []
+        self.successful_imports: List[ImportSuccess] = []
+        self.failed_imports: List[ImportFailure] = []
         self.total_xp_gained: int = 0
         self.duplicates_skipped: int = 0
 
     def to_dict(self) -> Dict:
         return {
-            'successful_imports': self.successful_imports,
-            'failed_imports': self.failed_imports,
+            'successful_imports': [imported.to_dict() for imported in self.successful_imports],
+            'failed_imports': [failed.to_dict() for failed in self.failed_imports],
+            'total_xp_gained': self.total_xp_gained,
+            'duplicates_skipped': self.duplicates_skipped,
+            'summary': {
+                'total_processed': len(self.successful_imports) + len(self.failed_imports),
+                'successful': len(self.successful_imports),
+                'failed': len(self.failed_imports),
+                'duplicates': self.duplicates_skipped
+            }
+        }
+
+    def to_compact_dict(self, detailed_errors: int = COMPACT_DETAILED_ERRORS) -> Dict:
+        """Same result in a size that doesn't grow with the import: imported
+        rows as ranges, failed rows grouped by error code, and only the first
+        `detailed_errors` failures in full"""
+        rows_by_code: Dict[str, List[int]] = {}
+        for failed in self.failed_imports:
+            for code in failed.codes:
+                rows_by_code.setdefault(code, []).append(failed.row)
+        return {
+            'imported_rows': row_ranges(imported.row for imported in self.successful_imports),
+            'failed_rows_by_code': {code: row_ranges(rows) for code, rows in rows_by_code.items()},
+            'error_messages': {code: ERROR_MESSAGES[code] for code in rows_by_code},
+            'failed_imports': [failed.to_dict() for failed in self.failed_imports[:detailed_errors]],
+            'failed_imports_truncated': len(self.failed_imports) > detailed_errors,
             'total_xp_gained': self.total_xp_gained,
             'duplicates_skipped': self.duplicates_skipped,
             'summary': {
@@ -49,6 +180,20 @@ class ApplicationImporter:
     def __init__(self, user_id: int):
         self.user_id = user_id
         self.result = BulkImportResult()
+
+    def known_fingerprints(self, fingerprints: Iterable[str]) -> set:
+        """The fingerprints this user imported before and whose application
+        still exists"""
+        fingerprints = sorted(set(fingerprints))
+        known = set()
+        for start in range(0, len(fingerprints), FINGERPRINT_BATCH_SIZE):
+            known.update(db.session.scalars(
+                db.select(ImportRowFingerprint.fingerprint)
+                .join(Application, Application.id == ImportRowFingerprint.application_id)
+                .where(ImportRowFingerprint.user_id == self.user_id,
+                       ImportRowFingerprint.fingerprint.in_(fingerprints[start:start + FINGERPRINT_BATCH_SIZE]))
+            ))
+        return known
     
     def validate_status(self, status: str) -> bool:
         normalized_status = status.lower().strip()
@@ -104,18 +249,23 @@ class ApplicationImporter:
     def check_duplicate(self, company: str, position: str, applied_date: Optional[datetime]) -> bool:
         """Check if application already exists"""
         # Normalize company and position names for comparison
-        normalized_company = company.strip().lower()
+        normalized_company = normalize_company_name(company)
         normalized_position = position.strip().lower()
+        # lookup only, the company is created on flush if the row is saved
+        company_id = resolve_company_ids(db.session, [company], create=False).get(company)
         
-        # Check for existing applications with same company and position
-        existing_apps = Application.query.filter_by(
-            user_id=self.user_id
+        # only this company's applications, by id. Rows saved before the company
+        # table existed have no company_id yet and are compared by name
+        existing_apps = Application.query.filter(
+            Application.user_id == self.user_id,
+            db.or_(Application.company_id == company_id, Application.company_id.is_(None))
         ).all()
         
         for app in existing_apps:
+            same_company = (app.company_id == company_id if app.company_id is not None
+                            else normalize_company_name(app.company) == normalized_company)
             # Compare normalized names
-            if (app.company.strip().lower() == normalized_company and 
-                app.position.strip().lower() == normalized_position):
+            if same_company and app.position.strip().lower() == normalized_position:
                 # If date is provided, check if it's the same date
                 if applied_date and app.applied_date:
                     if app.applied_date.date() == applied_date.date():
@@ -131,6 +281,64 @@ class ApplicationImporter:
         
         return False
     
+    def validate_columns(self, cleaned: pd.DataFrame) -> Dict[int, List[Tuple[str, str]]]:
+        """Same checks as validate_row over whole columns. Position -> (code,
+        error) pairs, only for the rows that failed"""
+        rows = len(cleaned)
+        problems = []
+        for field in self.REQUIRED_FIELDS:
+            if field in cleaned.columns:
+                missing = (cleaned[field].str.strip() == '').to_numpy()
+            else:
+                missing = np.ones(rows, dtype=bool)
+            problems.append((missing, f"missing_{field}", f"Missing required field: {field}"))
+
+        invalid_status = np.zeros(rows, dtype=bool)
+        if 'status' in cleaned.columns:
+            status = cleaned['status'].str.strip()
+            valid = status.str.lower().isin(list(self.STATUS_MAPPING)) | status.isin(self.VALID_STATUSES)
+            invalid_status = ~valid.to_numpy()
+
+        errors_by_row: Dict[int, List[Tuple[str, str]]] = {}
+        failed = invalid_status.copy()
+        for missing, _, _ in problems:
+            failed |= missing
+        for i in np.flatnonzero(failed).tolist():
+            errors = [(code, message) for missing, code, message in problems if missing[i]]
+            if invalid_status[i]:
+                errors.append(('invalid_status', f"Invalid status: {status.iat[i]}. Must be one of: {', '.join(self.VALID_STATUSES)} or common variations like 'Submitted', 'Accepted', etc."))
+            errors_by_row[i] = errors
+        return errors_by_row
+
+    def _import_row(self, row: ImportRow) -> Optional[Tuple[str, str]]:
+        """Save one validated row, (code, error) if it was not imported"""
+        if self.check_duplicate(row.company, row.position, row.applied_date):
+            self.result.duplicates_skipped += 1
+            return 'duplicate', f'Duplicate application found: {row.company} - {row.position}'
+
+        try:
+            app = Application(
+                company=row.company,
+                position=row.position,
+                status=row.status,
+                applied_date=row.applied_date,
+                notes=row.notes,
+                user_id=self.user_id
+            )
+
+            db.session.add(app)
+            db.session.flush()
+        except Exception as e:
+            db.session.rollback()
+            return 'database_error', f'Database error: {str(e)}'
+
+        xp_gained = calculate_xp(row.status)
+        self.result.total_xp_gained += xp_gained
+        self.result.successful_imports.append(ImportSuccess(
+            row.row, app.id, row.company, row.position, row.status, xp_gained, row.fingerprint
+        ))
+        return None
+
     def import_from_dataframe(self, df: pd.DataFrame) -> BulkImportResult:
         print(f"Processing DataFrame with shape: {df.shape}")
         print(f"Original columns: {list(df.columns)}")
@@ -156,79 +364,53 @@ class ApplicationImporter:
         
         print(f"Mapped columns: {list(df.columns)}")
         
-        for index, row in df.iterrows():
-            row_dict = row.to_dict()
-            row_index = index + 2 
-            
-            # Clean the row_dict to handle NaN values
-            cleaned_row_dict = {}
-            for key, value in row_dict.items():
-                if pd.isna(value):
-                    cleaned_row_dict[key] = ''
-                else:
-                    cleaned_row_dict[key] = str(value)
-            
-            is_valid, errors, warnings = self.validate_row(cleaned_row_dict, row_index)
-            
-            if not is_valid:
-                self.result.failed_imports.append({
-                    'row': row_index,
-                    'data': cleaned_row_dict,
-                    'errors': errors
-                })
-                continue
-            
-            if warnings:
-                print(f"Row {row_index} warnings: {warnings}")
-            
-            company = str(row_dict['company']).strip() if not pd.isna(row_dict['company']) else ''
-            position = str(row_dict['position']).strip() if not pd.isna(row_dict['position']) else ''
-            status = self.normalize_status(str(row_dict['status']).strip()) if not pd.isna(row_dict['status']) else ''
-            applied_date = self.parse_date(row_dict.get('applied_date', ''))
-            notes = str(row_dict.get('notes', '')).strip() if 'notes' in row_dict and not pd.isna(row_dict['notes']) else None
-            
-            if self.check_duplicate(company, position, applied_date):
+        # every cell as text once, then validate whole columns at a time
+        cleaned = df.astype(object).where(df.notna(), '').astype(str)
+        errors_by_row = self.validate_columns(cleaned)
+        row_numbers = (df.index.to_numpy() + 2).tolist()
+        columns = {name: cleaned[name].to_numpy() for name in ('company', 'position', 'status', 'applied_date', 'notes')
+                   if name in cleaned.columns}
+
+        blank = np.full(len(row_numbers), '', dtype=object)
+        fingerprints = [
+            row_fingerprint(company, position, applied_date)
+            for company, position, applied_date in zip(
+                columns.get('company', blank), columns.get('position', blank), columns.get('applied_date', blank)
+            )
+        ]
+        # rows imported by an earlier upload are duplicates without another look
+        seen = self.known_fingerprints(fingerprints)
+
+        for i, row_number in enumerate(row_numbers):
+            errors = errors_by_row.get(i)
+            if fingerprints[i] in seen:
                 self.result.duplicates_skipped += 1
-                self.result.failed_imports.append({
-                    'row': row_index,
-                    'data': cleaned_row_dict,
-                    'errors': [f'Duplicate application found: {company} - {position}']
-                })
-                continue
-            
-            try:
-                app = Application(
-                    company=company,
-                    position=position,
-                    status=status,
+                company, position = columns['company'][i].strip(), columns['position'][i].strip()
+                errors = [('duplicate', f'Duplicate application found: {company} - {position}')]
+            elif errors is None:
+                raw_date = columns['applied_date'][i].strip() if 'applied_date' in columns else ''
+                applied_date = self.parse_date(raw_date)
+                if raw_date and applied_date is None:
+                    print(f"Row {row_number} warnings: Invalid date format '{raw_date}' - date will be left blank")
+                notes = columns['notes'][i].strip() if 'notes' in columns else ''
+                error = self._import_row(ImportRow(
+                    row=row_number,
+                    company=columns['company'][i].strip(),
+                    position=columns['position'][i].strip(),
+                    status=self.normalize_status(columns['status'][i].strip()),
                     applied_date=applied_date,
-                    notes=notes,
-                    user_id=self.user_id
-                )
-                
-                db.session.add(app)
-                db.session.flush()
-                
-                xp_gained = calculate_xp(status)
-                self.result.total_xp_gained += xp_gained
-                
-                self.result.successful_imports.append({
-                    'row': row_index,
-                    'application_id': app.id,
-                    'company': company,
-                    'position': position,
-                    'status': status,
-                    'xp_gained': xp_gained
-                })
-                
-            except Exception as e:
-                db.session.rollback()
-                self.result.failed_imports.append({
-                    'row': row_index,
-                    'data': cleaned_row_dict,
-                    'errors': [f'Database error: {str(e)}']
-                })
-        
+                    notes=notes or None,
+                    fingerprint=fingerprints[i]
+                ))
+                if error is None:
+                    continue
+                errors = [error]
+            # the cell values only matter for rows reported back
+            data = dict(zip(cleaned.columns, cleaned.iloc[i].tolist()))
+            self.result.failed_imports.append(ImportFailure(
+                row_number, data, [message for _, message in errors], [code for code, _ in errors]
+            ))
+
         return self.result
     
     def import_from_csv(self, csv_content: str) -> BulkImportResult:
@@ -238,11 +420,7 @@ class ApplicationImporter:
             return self.import_from_dataframe(df)
         except Exception as e:
             print(f"CSV parsing error: {str(e)}")
-            self.result.failed_imports.append({
-                'row': 1,
-                'data': {},
-                'errors': [f'CSV parsing error: {str(e)}']
-            })
+            self.result.failed_imports.append(ImportFailure(1, {}, [f'CSV parsing error: {str(e)}'], ['parse_error']))
             return self.result
     
     def import_from_excel(self, excel_content: bytes) -> BulkImportResult:
@@ -250,11 +428,7 @@ class ApplicationImporter:
             df = pd.read_excel(io.BytesIO(excel_content))
             return self.import_from_dataframe(df)
         except Exception as e:
-            self.result.failed_imports.append({
-                'row': 1,
-                'data': {},
-                'errors': [f'Excel parsing error: {str(e)}']
-            })
+            self.result.failed_imports.append(ImportFailure(1, {}, [f'Excel parsing error: {str(e)}'], ['parse_error']))
             return self.result
     
     def import_from_json(self, applications: List[Dict]) -> BulkImportResult:
@@ -262,6 +436,109 @@ class ApplicationImporter:
         return self.import_from_dataframe(df)
 
 
+def find_previous_upload(user_id: int, content_hash: str) -> Optional[ImportUpload]:
+    """An earlier upload with the same content, as long as every application
+    it created is still there. Deleting one makes the file importable again"""
+    upload = db.session.scalar(db.select(ImportUpload).where(
+        ImportUpload.user_id == user_id, ImportUpload.content_hash == content_hash
+    ))
+    if upload is None or not upload.imported:
+        # nothing to check it against, see record_upload
+        return None
+    remaining = db.session.scalar(
+        db.select(db.func.count(ImportRowFingerprint.fingerprint))
+        .join(Application, Application.id == ImportRowFingerprint.application_id)
+        .where(ImportRowFingerprint.upload_id == upload.id, ImportRowFingerprint.user_id == user_id)
+    )
+    return upload if remaining == upload.imported else None
+
+
+def describe_upload(upload: ImportUpload) -> Dict:
+    # the summary is the first upload's, so the client sees what that import did
+    return {'duplicate_upload': True, 'uploaded_at': upload.uploaded_at.isoformat(), 'summary': json.loads(upload.summary)}
+
+
+def record_upload(user_id: int, content_hash: Optional[str], result: BulkImportResult):
+    """Fingerprint the imported rows for later uploads that overlap this one.
+    The upload itself is only remembered when every row was imported: its
+    rows are then exactly the applications find_previous_upload checks for.
+    A row that failed, even as a duplicate, may import another time"""
+    upload_id = None
+    clean = result.successful_imports and not result.failed_imports
+    if content_hash and clean:
+        summary = json.dumps(result.to_dict()['summary'])
+        upsert(
+            ImportUpload,
+            [{'user_id': user_id, 'content_hash': content_hash, 'uploaded_at': datetime.utcnow(),
+              'imported': len(result.successful_imports), 'summary': summary}],
+            ['user_id', 'content_hash'],
+            lambda excluded: {'uploaded_at': excluded.uploaded_at, 'imported': excluded.imported, 'summary': excluded.summary}
+        )
+        upload_id = db.session.scalar(db.select(ImportUpload.id).where(
+            ImportUpload.user_id == user_id, ImportUpload.content_hash == content_hash
+        ))
+
+    imported = [imported for imported in result.successful_imports if imported.fingerprint]
+    for start in range(0, len(imported), FINGERPRINT_BATCH_SIZE):
+        upsert(
+            ImportRowFingerprint,
+            [{'user_id': user_id, 'fingerprint': row.fingerprint, 'application_id': row.application_id, 'upload_id': upload_id}
+             for row in imported[start:start + FINGERPRINT_BATCH_SIZE]],
+            ['user_id', 'fingerprint'],
+            lambda excluded: {'application_id': excluded.application_id, 'upload_id': excluded.upload_id}
+        )
+    db.session.commit()
+
+
+def save_error_report(user_id: int, failures: List[ImportFailure]) -> str:
+    """Keep every failed row of an import for the CSV report, replacing the
+    user's previous report. Returns the report's import id"""
+    import_id = uuid.uuid4().hex
+    db.session.execute(db.delete(ImportErrorRow).where(ImportErrorRow.user_id == user_id))
+    for start in range(0, len(failures), REPORT_BATCH_SIZE):
+        db.session.execute(db.insert(ImportErrorRow), [
+            {
+                'user_id': user_id,
+                'import_id': import_id,
+                'row': failed.row,
+                'codes': ' '.join(failed.codes),
+                'errors': '; '.join(failed.errors),
+                'data': json.dumps(failed.data)
+            }
+            for failed in failures[start:start + REPORT_BATCH_SIZE]
+        ])
+    db.session.commit()
+    return import_id
+
+
+def has_error_report(user_id: int, import_id: str) -> bool:
+    return db.session.scalar(db.select(ImportErrorRow.id).where(
+        ImportErrorRow.user_id == user_id, ImportErrorRow.import_id == import_id
+    ).limit(1)) is not None
+
+
+def iter_error_report(user_id: int, import_id: str, batch_size: int = REPORT_BATCH_SIZE) -> Iterator[str]:
+    """The failed rows as CSV lines: their original cells, so the file can be
+    fixed and uploaded again, followed by what went wrong"""
+    rows = db.session.execute(
+        db.select(ImportErrorRow.row, ImportErrorRow.codes, ImportErrorRow.errors, ImportErrorRow.data)
+        .where(ImportErrorRow.user_id == user_id, ImportErrorRow.import_id == import_id)
+        .order_by(ImportErrorRow.row).execution_options(yield_per=batch_size)
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = None
+    for row, codes, errors, data in rows:
+        data = json.loads(data)
+        if columns is None:
+            columns = list(data)
+            writer.writerow(columns + ['row', 'error_codes', 'errors'])
+        writer.writerow([data.get(column, '') for column in columns] + [row, codes, errors])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
 def get_import_template() -> Dict:
     return {
         'columns': {
@@ -0,0 +1,240 @@
+import logging
+import re
+from typing import Dict, Iterable, List
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from database import db, escape_like, upsert
+from models import Application, Company, CompanyAlias
+from insights import delete_company_insights, rebuild_company_insights
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 25
+BACKFILL_CHUNK_SIZE = 500
+
+# legal suffixes that don't make a different company, "Google LLC" is "Google"
+COMPANY_SUFFIXES = {'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company', 'plc', 'gmbh'}
+_TRAILING_WORDS = COMPANY_SUFFIXES | {'&', 'and'}
+_NON_NAME_CHARS = re.compile(r"[^\w\s&+]")
+
+
+def normalize_company_name(name: str) -> str:
+    words = _NON_NAME_CHARS.sub(' ', (name or '').casefold()).split()
+    while len(words) > 1 and words[-1] in _TRAILING_WORDS:
+        words.pop()
+    return ' '.join(words)
+
+
+def resolve_company_ids(session, names: Iterable[str], create: bool = True) -> Dict[str, int]:
+    """Company id for every name, creating companies that don't exist yet.
+    Aliases win over company names. Ids are remembered for the rest of the
+    transaction so a bulk import resolves each company once.
+
+    With create=False nothing is written and names without a company are
+    left out, for lookups that shouldn't leave companies behind."""
+    keys = {name: normalize_company_name(name) for name in set(names)}
+    keys = {name: key for name, key in keys.items() if key}
+    cache = session.info.setdefault('company_ids', {})
+
+    missing = {key for key in keys.values() if key not in cache}
+    if missing:
+        cache.update(session.execute(
+            db.select(CompanyAlias.normalized_alias, CompanyAlias.company_id).where(CompanyAlias.normalized_alias.in_(missing))
+        ).all())
+        missing -= cache.keys()
+    if missing and not create:
+        cache.update(session.execute(
+            db.select(Company.normalized_name, Company.id).where(Company.normalized_name.in_(missing))
+        ).all())
+    elif missing:
+        display_names = {}
+        for name, key in keys.items():
+            if key in missing:
+                display_names.setdefault(key, name.strip()[:100])
+        # concurrent imports may create the same company, the no-op update keeps the first one
+        upsert(
+            Company,
+            [{'name': display_names[key], 'normalized_name': key} for key in sorted(missing)],
+            ['normalized_name'],
+            lambda excluded: {'normalized_name': excluded.normalized_name}
+        )
+        cache.update(session.execute(
+            db.select(Company.normalized_name, Company.id).where(Company.normalized_name.in_(missing))
+        ).all())
+
+    return {name: cache[key] for name, key in keys.items() if key in cache}
+
+
+@event.listens_for(db.session, 'before_flush')
+def _assign_company_ids(session, flush_context, instances):
+    # covers every write path: add, update, bulk import
+    pending = [obj for obj in session.new if isinstance(obj, Application)]
+    pending += [
+        obj for obj in session.dirty
+        if isinstance(obj, Application) and db.inspect(obj).attrs.company.history.has_changes()
+    ]
+    if not pending:
+        return
+    company_ids = resolve_company_ids(session, [application.company for application in pending])
+    for application in pending:
+        application.company_id = company_ids.get(application.company)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_company_ids(session, previous_transaction):
+    # companies created in the rolled back transaction are gone
+    session.info.pop('company_ids', None)
+
+
+def _prefix_filter(column, key: str, dialect: str):
+    if dialect == 'postgresql':
+        # LIKE 'abc%' can use the text_pattern_ops index
+        return column.like(f"{escape_like(key)}%", escape='\\')
+    # a range is index friendly everywhere, the normalized key is plain lowercase text
+    return db.and_(column >= key, column < key + '\U0010ffff')
+
+
+def search_companies(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+    """Autocomplete: companies whose name or alias starts with `query`,
+    exact matches first, then shortest names"""
+    key = normalize_company_name(query)
+    if not key:
+        return []
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    dialect = db.session.get_bind().dialect.name
+
+    by_name = db.session.execute(
+        db.select(Company.id, Company.name, Company.normalized_name)
+        .where(_prefix_filter(Company.normalized_name, key, dialect))
+        .order_by(Company.normalized_name).limit(limit)
+    ).all()
+    by_alias = db.session.execute(
+        db.select(Company.id, Company.name, CompanyAlias.normalized_alias, CompanyAlias.alias)
+        .join(CompanyAlias, CompanyAlias.company_id == Company.id)
+        .where(_prefix_filter(CompanyAlias.normalized_alias, key, dialect))
+        .order_by(CompanyAlias.normalized_alias).limit(limit)
+    ).all()
+
+    matches = {}
+    for company_id, name, matched in by_name:
+        matches[company_id] = {'id': company_id, 'name': name, 'matched': matched}
+    for company_id, name, matched, alias in by_alias:
+        matches.setdefault(company_id, {'id': company_id, 'name': name, 'matched': matched, 'alias': alias})
+
+    if len(matches) < limit and current_app.extensions.get('company_trigram_index'):
+        # not enough prefix hits, fall back to substring matches off the trigram index
+        for company_id, name, matched in db.session.execute(
+            db.select(Company.id, Company.name, Company.normalized_name)
+            .where(Company.normalized_name.contains(key, autoescape=True))
+            .order_by(db.func.length(Company.normalized_name)).limit(limit)
+        ):
+            matches.setdefault(company_id, {'id': company_id, 'name': name, 'matched': matched})
+
+    results = sorted(matches.values(), key=lambda m: (m['matched'] != key, not m['matched'].startswith(key), len(m['matched']), m['name']))
+    for result in results:
+        del result['matched']
+    return results[:limit]
+
+
+def ensure_trigram_index(app):
+    """Substring search on postgres, needs the pg_trgm extension. Best effort,
+    prefix search works without it"""
+    app.extensions['company_trigram_index'] = False
+    if db.engine.dialect.name != 'postgresql':
+        return
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(db.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(db.text(
+                "CREATE INDEX IF NOT EXISTS ix_company_name_trgm ON company USING gin (normalized_name gin_trgm_ops)"
+            ))
+        app.extensions['company_trigram_index'] = True
+    except DBAPIError:
+        logger.warning("pg_trgm is not available, company search is prefix only", exc_info=True)
+
+
+def backfill_company_ids(chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """Point applications saved before the company table existed at their company"""
+    updated = 0
+    last_name = ''
+    while True:
+        # keyset over the distinct names, names that normalise to nothing stay unlinked
+        names = db.session.scalars(
+            db.select(Application.company).where(Application.company_id.is_(None), Application.company > last_name)
+            .distinct().order_by(Application.company).limit(chunk_size)
+        ).all()
+        if not names:
+            break
+        last_name = names[-1]
+        company_ids = resolve_company_ids(db.session, names)
+        for name, company_id in company_ids.items():
+            result = db.session.execute(
+                db.update(Application).where(Application.company_id.is_(None), Application.company == name)
+                .values(company_id=company_id).execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount or 0
+        db.session.commit()
+        # linked with bulk updates, which the incremental insight hooks don't see
+        rebuild_company_insights(sorted(set(company_ids.values())))
+    return updated
+
+
+def add_company_alias(canonical: str, alias: str) -> Company:
+    """Register `alias` as another name for `canonical`. A company already
+    created under the alias is merged into the canonical one"""
+    canonical_id = resolve_company_ids(db.session, [canonical])[canonical]
+    alias_key = normalize_company_name(alias)
+
+    duplicate = db.session.scalar(db.select(Company).where(Company.normalized_name == alias_key, Company.id != canonical_id))
+    if duplicate is not None:
+        delete_company_insights([duplicate.id])
+        db.session.execute(
+            db.update(Application).where(Application.company_id == duplicate.id)
+            .values(company_id=canonical_id).execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            db.update(CompanyAlias).where(CompanyAlias.company_id == duplicate.id)
+            .values(company_id=canonical_id).execution_options(synchronize_session=False)
+        )
+        db.session.delete(duplicate)
+
+    upsert(
+        CompanyAlias,
+        [{'company_id': canonical_id, 'alias': alias.strip()[:100], 'normalized_alias': alias_key}],
+        ['normalized_alias'],
+        lambda excluded: {'company_id': excluded.company_id, 'alias': excluded.alias}
+    )
+    db.session.commit()
+    session_cache = db.session.info.get('company_ids')
+    if session_cache is not None:
+        session_cache.pop(alias_key, None)
+    if duplicate is not None:
+        # the merge moved applications with a bulk update, recount the canonical company
+        rebuild_company_insights([canonical_id])
+    return db.session.get(Company, canonical_id)
+
+
+@click.command('backfill-companies')
+@with_appcontext
+def backfill_companies_command():
+    """Link existing applications to the company table"""
+    click.echo(f"Linked {backfill_company_ids()} applications to companies")
+
+
+@click.command('company-alias')
+@click.argument('canonical')
+@click.argument('alias')
+@with_appcontext
+def company_alias_command(canonical, alias):
+    """Treat ALIAS as another name for CANONICAL, merging them if needed"""
+    company = add_company_alias(canonical, alias)
+    click.echo(f"'{alias}' now resolves to {company.name} (id {company.id})")
+
+
+def init_companies(app):
+    app.cli.add_command(backfill_companies_command)
+    app.cli.add_command(company_alias_command)
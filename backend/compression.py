@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+from flask import current_app, request
+
+# brotli and zstd are optional, gzip is always there
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/csv', 'text/plain', 'text/html', 'application/javascript', 'text/css'}
+
+
+def available_encodings():
+    # server preference, used to break ties between equally weighted client encodings
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _BrotliCompressor:
+    # brotli calls it process()/finish(), give it the zlib-style names
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _compressor(encoding: str, config):
+    """Incremental compressor with compress()/flush() for streamed bodies"""
+    if encoding == 'gzip':
+        # wbits=31 -> gzip header and trailer
+        return zlib.compressobj(config['COMPRESSION_GZIP_LEVEL'], zlib.DEFLATED, 31)
+    if encoding == 'br':
+        return _BrotliCompressor(config['COMPRESSION_BROTLI_QUALITY'])
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=config['COMPRESSION_ZSTD_LEVEL']).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_bytes(data: bytes, encoding: str, config) -> bytes:
+    compressor = _compressor(encoding, config)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, config):
+    compressor = _compressor(encoding, config)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by encoding and body hash.
+
+    Only used for endpoints marked with @cache_compressed, whose bodies are
+    the same for everybody for a while (templates, leaderboard, feed).
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, data: bytes, encoding: str, config) -> bytes:
+        key = (encoding, hashlib.sha1(data).digest())
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        compressed = compress_bytes(data, encoding, config)
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+compressed_body_cache = CompressedBodyCache()
+
+
+def cache_compressed(view):
+    """Mark a GET endpoint whose compressed body can be reused"""
+    view.cache_compressed = True
+    return view
+
+
+def _is_cacheable() -> bool:
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method == 'GET' and getattr(view, 'cache_compressed', False)
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config['COMPRESSION_ENABLED']:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # compress chunk by chunk as the body is produced, length is unknown up front
+        response.response = compress_stream(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        if _is_cacheable():
+            compressed = compressed_body_cache.get_or_compress(data, encoding, config)
+        else:
+            compressed = compress_bytes(data, encoding, config)
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,6 +1,15 @@
 import os
+import json
+import tempfile
 from datetime import timedelta
 
+# the original xp // 100 + 1 levels, uncapped
+DEFAULT_LEVEL_CURVE = {
+    'type': 'polynomial',
+    'base': 100,
+    'exponent': 1
+}
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
@@ -8,23 +17,82 @@ class Config:
     
     # Database Configuration
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///instance/coop_tracker.db'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///instance/coop_tracker.db'
+    SQLALCHEMY_DATABASE_URI = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
-    # config for ssl connection for prod 
-    if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
-        SQLALCHEMY_DATABASE_URI = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
-        
-        SQLALCHEMY_ENGINE_OPTIONS = {
-            'pool_pre_ping': True,        
-            'pool_recycle': 300,         
-            'max_overflow': 20,           
-            'connect_args': {
-                'sslmode': 'require',     
-                'connect_timeout': 10,    
-                'application_name': 'coop-tracker'  # Identify your app in logs
-            }
-        }
+    # Engine profiles, see engine_profiles.py. SQLite gets WAL + pragmas on connect,
+    # postgres gets a pool sized so that all workers fit in DB_MAX_CONNECTIONS
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024))
+    
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # gunicorn workers
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_APPLICATION_NAME = os.environ.get('DB_APPLICATION_NAME', 'coop-tracker')  # Identify your app in logs
+    
+    # Read replicas, see replicas.py. GET requests read from a replica unless it is
+    # down or more than DB_REPLICA_MAX_LAG_SECONDS behind; clients that just wrote
+    # read from the primary for that long
+    DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 5))
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 10))
+    
+    # async engine used by the ASGI entry point (asgi.py), per process
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 0))
+    # requests the ASGI entry point hands to the Flask app at once, each on its own thread
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or min(32, (os.cpu_count() or 1) + 4))
+    
+    # Level progression, see progression.py. Supported types are polynomial
+    # (base * (level - 1) ** exponent), geometric (base, ratio) and tabulated
+    # (explicit list of thresholds starting at 0). max_level caps a curve, without
+    # it levels go on forever. Override with a JSON LEVEL_CURVE env var.
+    LEVEL_CURVE = json.loads(os.environ['LEVEL_CURVE']) if os.environ.get('LEVEL_CURVE') else DEFAULT_LEVEL_CURVE
+    
+    # Response compression, see compression.py. brotli/zstd are used when installed
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 500))  # bytes
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    COMPRESSION_ZSTD_LEVEL = 3
+    
+    # Rate limiting and admission control, see ratelimit.py. With several workers
+    # the buckets live in a sqlite file every worker on the host shares
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE') or (
+        'memory' if WEB_CONCURRENCY == 1
+        else 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'coop-tracker-ratelimit.db')
+    )
+    RATELIMIT_STORE_TIMEOUT = 1.0  # seconds to wait on the store lock
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '300/minute')  # per user, every endpoint
+    RATELIMIT_SLOT_TTL = 300  # seconds before a slot held by a dead worker is reclaimed
+    
+    # proxies in front of the app whose X-Forwarded-For/-Proto are trusted, see
+    # trust_proxies in app.py. Render runs one, set 0 when clients connect directly.
+    # request.remote_addr (anonymous rate limits, replica stickiness) depends on it
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+    
+    # On-demand profiling, see profiler.py. Send the header printed by
+    # `flask profile-token`, or sample endpoints with e.g. PROFILE_SAMPLE_RATES='{"routes.get_leaderboard": 0.01}'
+    PROFILE_SECRET = os.environ.get('PROFILE_SECRET') or SECRET_KEY
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'coop-tracker-profiles')
+    PROFILE_SAMPLE_RATES = json.loads(os.environ.get('PROFILE_SAMPLE_RATES') or '{}')
+    PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+    
+    # Live updates over server-sent events, see events.py. EVENTS_RELAY is auto, postgres
+    # (LISTEN/NOTIFY), socket (unix sockets, one host) or none. Under gunicorn every
+    # open stream holds a worker thread, SSE_MAX_STREAMS caps how many per worker
+    EVENTS_RELAY = os.environ.get('EVENTS_RELAY', 'auto')
+    EVENTS_SOCKET_DIR = os.environ.get('EVENTS_SOCKET_DIR') or os.path.join(tempfile.gettempdir(), 'coop-tracker-events')
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS') or max(4, GUNICORN_THREADS // 2))
+    SSE_MAX_STREAMS_PER_USER = int(os.environ.get('SSE_MAX_STREAMS_PER_USER', 3))  # a few tabs
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_STREAM_SECONDS = 240  # then the browser reconnects
+    SSE_TOKEN_EXPIRES = timedelta(hours=1)  # reconnects reuse it, see /events/token
+    SSE_QUEUE_SIZE = 100  # events buffered per stream before it is told to resync
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,https://co-op-tracker-orcin.vercel.app').split(',')
@@ -0,0 +1,87 @@
+from typing import Dict, List
+from database import db
+from models import Application, User
+from serializers import APPLICATION_SERIALIZER, ACHIEVEMENT_SERIALIZER
+
+# first page of applications shown on the dashboard
+DASHBOARD_APPLICATION_LIMIT = 50
+
+MOCK_USER_EMAIL = "harrison@example.com"
+
+
+# the dashboard is three independent reads. They are plain statements so the
+# WSGI route can run them one after another and the ASGI route can run them
+# concurrently on separate connections, see asgi.py
+def user_statement(user_id=None):
+    stmt = db.select(User.id, User.name, User.email, User.profile_picture, User.xp, User.level, User.joined)
+    if user_id is None:
+        # same development fallback as get_current_user()
+        return stmt.where(User.email == MOCK_USER_EMAIL)
+    return stmt.where(User.id == user_id)
+
+
+def status_counts_statement(user_id: int):
+    return db.select(Application.status, db.func.count(Application.id)).where(
+        Application.user_id == user_id
+    ).group_by(Application.status)
+
+
+def achievements_statement(user_id: int):
+    return ACHIEVEMENT_SERIALIZER.select().where(ACHIEVEMENT_SERIALIZER.model.user_id == user_id).order_by(
+        ACHIEVEMENT_SERIALIZER.model.id
+    )
+
+
+def recent_applications_statement(user_id: int, limit: int = DASHBOARD_APPLICATION_LIMIT):
+    return APPLICATION_SERIALIZER.select().where(Application.user_id == user_id).order_by(
+        Application.created_at.desc(), Application.id.desc()
+    ).limit(limit)
+
+
+def dashboard_statements(user_id: int) -> Dict:
+    return {
+        'status_counts': status_counts_statement(user_id),
+        'achievements': achievements_statement(user_id),
+        'applications': recent_applications_statement(user_id)
+    }
+
+
+def build_dashboard(user, status_counts: List, achievements: List, applications: List) -> Dict:
+    counts = {status: count for status, count in status_counts}
+    total_applications = sum(counts.values())
+    interviews = counts.get('Interviewing', 0)
+    offers = counts.get('Offer', 0)
+
+    interview_rate = (interviews / total_applications * 100) if total_applications > 0 else 0
+    offer_rate = (offers / total_applications * 100) if total_applications > 0 else 0
+
+    return {
+        'user': {
+            'id': user.id,
+            'name': user.name,
+            'email': user.email,
+            'picture': user.profile_picture,
+            'xp': user.xp,
+            'level': user.level,
+            'joined': user.joined.isoformat() if user.joined else None
+        },
+        'stats': {
+            'total_applications': total_applications,
+            'interviews': interviews,
+            'offers': offers,
+            'interview_rate': round(interview_rate, 1),
+            'offer_rate': round(offer_rate, 1),
+            'by_status': counts
+        },
+        'achievements': ACHIEVEMENT_SERIALIZER.dump_rows(achievements),
+        'applications': APPLICATION_SERIALIZER.dump_rows(applications)
+    }
+
+
+def load_dashboard(user) -> Dict:
+    """Synchronous version for the regular WSGI route"""
+    results = {
+        name: db.session.execute(stmt).all()
+        for name, stmt in dashboard_statements(user.id).items()
+    }
+    return build_dashboard(user, **results)
@@ -1,4 +1,60 @@
+from datetime import date
 from flask_sqlalchemy import SQLAlchemy
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends read-only requests to replicas when any are configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
+def upsert(model, rows, conflict_columns, update):
+    """INSERT ... ON CONFLICT DO UPDATE for sqlite and postgres.
+
+    `update` gets the statement's `excluded` row and returns the
+    column -> expression mapping to apply when the row already exists.
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not supported for {dialect}")
+
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=update(stmt.excluded))
+    db.session.execute(stmt)
+
+def as_date(value) -> date:
+    # sqlite hands back 'YYYY-MM-DD' strings, postgres real dates
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def escape_like(value: str) -> str:
+    # for LIKE ... ESCAPE '\\', so % and _ in user input match themselves
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def create_missing_indexes():
+    """create_all() skips tables that already exist, so indexes added to
+    existing models are created here instead"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def create_missing_columns():
+    """create_all() doesn't alter existing tables either. Nullable columns
+    added to existing models are added here, anything else needs a real migration"""
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        quote = conn.dialect.identifier_preparer.quote
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"{table.name}.{column.name} is NOT NULL and can't be added automatically")
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(db.text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
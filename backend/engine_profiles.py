@@ -0,0 +1,103 @@
+import os
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def normalize_database_url(url: str) -> str:
+    # heroku/render style urls use the scheme sqlalchemy dropped in 1.4
+    if url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def sqlite_engine_options(config) -> Dict:
+    # the sqlite3 module busy-waits on locks for `timeout` seconds, on top of the busy_timeout pragma
+    return {
+        'connect_args': {
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+        }
+    }
+
+
+def postgres_engine_options(config, url: str) -> Dict:
+    """Size the per-process pool from the gunicorn worker count so the
+    whole deployment stays inside DB_MAX_CONNECTIONS."""
+    workers = max(1, config['WEB_CONCURRENCY'])
+    threads = max(1, config['GUNICORN_THREADS'])
+    per_worker = max(1, config['DB_MAX_CONNECTIONS'] // workers)
+
+    pool_size = min(threads, per_worker)
+    max_overflow = max(0, per_worker - pool_size)
+
+    # render hands out postgres:// urls and requires ssl, local databases usually don't have it
+    default_sslmode = 'require' if url.startswith('postgres://') else 'prefer'
+
+    return {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'connect_args': {
+            'sslmode': os.environ.get('DATABASE_SSLMODE', default_sslmode),
+            'connect_timeout': 10,
+            'application_name': config['DB_APPLICATION_NAME'],
+            'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        }
+    }
+
+
+def build_engine_options(config, url: str) -> Dict:
+    """Engine options for the backend behind `url`. Anything already set in
+    SQLALCHEMY_ENGINE_OPTIONS wins over the profile."""
+    backend = make_url(normalize_database_url(url)).get_backend_name()
+    if backend == 'sqlite':
+        options = sqlite_engine_options(config)
+    elif backend == 'postgresql':
+        options = postgres_engine_options(config, url)
+    else:
+        options = {}
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def install_sqlite_pragmas(engine, config):
+    """Apply WAL and friends on every new sqlite connection"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    use_wal = not _is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if use_wal:
+            # readers no longer block the writer, which is what caused `database is locked`
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+        # negative cache_size is in KiB instead of pages
+        cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+        cursor.close()
+
+
+def pool_stats(engine) -> Dict:
+    pool = engine.pool
+    stats = {
+        'backend': engine.dialect.name,
+        'pool_class': type(pool).__name__,
+        'status': pool.status()
+    }
+    # only QueuePool style pools keep counters
+    for name in ['size', 'checkedin', 'checkedout', 'overflow']:
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            stats[name] = counter()
+    return stats
@@ -0,0 +1,350 @@
+"""
+Live updates pushed to the browser over Server-Sent Events.
+
+Session hooks collect XP, level and achievement changes during a flush and
+publish them after commit. The in-process broker fans each event out to the
+streams of the user it belongs to (or to every stream, for leaderboard
+moves). With several workers a relay forwards events to the other
+processes: LISTEN/NOTIFY on postgres, unix datagram sockets in a shared
+directory otherwise.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import event
+from database import db
+from models import Achievement, User
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'coop_tracker_events'
+NOTIFY_MAX_PAYLOAD = 7900  # postgres rejects payloads of 8000 bytes and up
+SOCKET_MAX_DATAGRAM = 60000
+
+
+class Subscription:
+    """One open stream. Events queue up until the stream writes them out; a
+    client that can't keep up gets a single 'resync' instead of a backlog"""
+
+    def __init__(self, user_id: int, max_queued: int):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.overflowed = False
+
+    def put(self, message: Dict):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Dict:
+        if self.overflowed:
+            self.overflowed = False
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            return {'event': 'resync', 'data': {}}
+        return self.queue.get(timeout=timeout)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read from an event loop, publishers run on other threads"""
+
+    def __init__(self, user_id: int, max_queued: int, loop: asyncio.AbstractEventLoop):
+        super().__init__(user_id, max_queued)
+        self.loop = loop
+        self.async_queue = asyncio.Queue(maxsize=max_queued)
+
+    def put(self, message: Dict):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: Dict):
+        try:
+            self.async_queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get_async(self, timeout: float) -> Dict:
+        if self.overflowed:
+            self.overflowed = False
+            while not self.async_queue.empty():
+                self.async_queue.get_nowait()
+            return {'event': 'resync', 'data': {}}
+        return await asyncio.wait_for(self.async_queue.get(), timeout)
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[int, List[Subscription]] = {}
+        self._total = 0
+        self.relay = None
+        self.relay_factory: Optional[Callable] = None
+        self._relay_pid = None
+        # in-process consumers of every event, local or relayed, e.g. the rank index
+        self.listeners: List[Callable[[List[Dict]], None]] = []
+
+    def add(self, subscription: Subscription, max_per_user: int, max_total: Optional[int] = None) -> Subscription:
+        self.ensure_relay()
+        with self._lock:
+            streams = self._subscriptions.setdefault(subscription.user_id, [])
+            if len(streams) >= max_per_user or (max_total is not None and self._total >= max_total):
+                raise StreamLimitReached()
+            streams.append(subscription)
+            self._total += 1
+        return subscription
+
+    def remove(self, subscription: Subscription):
+        with self._lock:
+            streams = self._subscriptions.get(subscription.user_id, [])
+            if subscription in streams:
+                streams.remove(subscription)
+                self._total -= 1
+            if not streams:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def deliver(self, messages: List[Dict]):
+        """Hand events to this process's streams"""
+        with self._lock:
+            for message in messages:
+                if message.get('user_id') is None:
+                    targets = [s for streams in self._subscriptions.values() for s in streams]
+                else:
+                    targets = list(self._subscriptions.get(message['user_id'], ()))
+                for subscription in targets:
+                    subscription.put(message)
+        for listener in self.listeners:
+            listener(messages)
+
+    def publish(self, messages: List[Dict]):
+        if not messages:
+            return
+        self.deliver(messages)
+        relay = self.ensure_relay()
+        if relay is not None:
+            try:
+                relay.send(messages)
+            except Exception:
+                # other workers miss this one, their clients catch up on the next event or reconnect
+                logger.warning("Could not relay events to other workers", exc_info=True)
+
+    def ensure_relay(self):
+        # keyed on the pid so a relay thread is never inherited across gunicorn's fork.
+        # workers call this at startup, every worker needs the other workers'
+        # events for its rank index, streams or not
+        if self.relay_factory is None:
+            return None
+        with self._lock:
+            if self._relay_pid != os.getpid():
+                self._relay_pid = os.getpid()
+                try:
+                    self.relay = self.relay_factory(self.deliver)
+                except Exception:
+                    logger.warning("Event relay unavailable, events stay within this worker", exc_info=True)
+                    self.relay = None
+            return self.relay
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'streams': self._total, 'users': len(self._subscriptions),
+                    'relay': type(self.relay).__name__ if self.relay else None}
+
+
+broker = EventBroker()
+
+
+class SocketRelay:
+    """Cross-worker relay for a single host without postgres. Every worker
+    binds a datagram socket in `directory` and sends to all the others"""
+
+    def __init__(self, directory: str, on_message: Callable):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.on_message = on_message
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        # separate non-blocking socket for sending, a stuck worker must not stall a request
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.setblocking(False)
+        threading.Thread(target=self._listen, name='event-relay', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                data = self.sock.recv(SOCKET_MAX_DATAGRAM)
+                self.on_message(json.loads(data))
+            except OSError:
+                return
+            except ValueError:
+                logger.warning("Dropped a malformed relayed event")
+
+    def send(self, messages: List[Dict]):
+        data = json.dumps(messages, default=str).encode()
+        if len(data) > SOCKET_MAX_DATAGRAM:
+            if len(messages) > 1:
+                for message in messages:
+                    self.send([message])
+            else:
+                logger.warning("Event too large to relay")
+            return
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            if path == self.path:
+                continue
+            try:
+                self.sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # a worker that exited without cleaning up
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning("Event relay to %s is backed up, dropping", path)
+
+
+class PostgresRelay:
+    """LISTEN/NOTIFY relay, reaches every worker on every host sharing the database"""
+
+    def __init__(self, engine, on_message: Callable):
+        self.engine = engine
+        self.on_message = on_message
+        self.origin = uuid.uuid4().hex
+        # a dedicated connection outside the pool, it sits in LISTEN for the life of the worker
+        self.connection = engine.raw_connection().driver_connection
+        self.connection.autocommit = True
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        threading.Thread(target=self._listen, name='event-relay', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                select.select([self.connection], [], [], 30)
+                self.connection.poll()
+            except Exception:
+                logger.warning("Event relay connection lost", exc_info=True)
+                return
+            while self.connection.notifies:
+                notify = self.connection.notifies.pop(0)
+                try:
+                    origin, messages = json.loads(notify.payload)
+                except ValueError:
+                    continue
+                if origin != self.origin:
+                    self.on_message(messages)
+
+    def send(self, messages: List[Dict]):
+        payload = json.dumps([self.origin, messages], default=str)
+        if len(payload) > NOTIFY_MAX_PAYLOAD:
+            if len(messages) > 1:
+                for message in messages:
+                    self.send([message])
+            else:
+                logger.warning("Event too large to relay")
+            return
+        with self.engine.connect() as conn:
+            conn.execute(db.text("SELECT pg_notify(:channel, :payload)"), {'channel': NOTIFY_CHANNEL, 'payload': payload})
+            conn.commit()
+
+
+def create_relay(app, engine) -> Optional[Callable]:
+    """Factory for the configured relay, or None when one worker is all there is"""
+    kind = app.config['EVENTS_RELAY']
+    if kind == 'auto':
+        if engine.dialect.name == 'postgresql':
+            kind = 'postgres'
+        else:
+            kind = 'socket' if app.config['WEB_CONCURRENCY'] > 1 else 'none'
+    if kind == 'postgres':
+        return lambda on_message: PostgresRelay(engine, on_message)
+    if kind == 'socket':
+        directory = app.config['EVENTS_SOCKET_DIR']
+        return lambda on_message: SocketRelay(directory, on_message)
+    return None
+
+
+def format_sse(message: Dict, dumps: Callable[[Dict], str]) -> str:
+    return f"event: {message['event']}\ndata: {dumps(message['data'])}\n\n"
+
+
+def event_stream(subscription: Subscription, dumps: Callable, heartbeat: float, max_seconds: float) -> Iterator[str]:
+    """Body of a text/event-stream response. Ends after `max_seconds` so the
+    worker thread is handed back, EventSource reconnects on its own"""
+    try:
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = subscription.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                # comment line, keeps proxies from closing an idle connection
+                yield ": ping\n\n"
+                continue
+            yield format_sse(message, dumps)
+    finally:
+        broker.remove(subscription)
+
+
+# collected on flush, published after commit so rolled back changes are never pushed
+@event.listens_for(db.session, 'after_flush')
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault('pending_events', [])
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        xp_history = db.inspect(obj).attrs.xp.history
+        level_history = db.inspect(obj).attrs.level.history
+        if not (xp_history.has_changes() or level_history.has_changes()):
+            continue
+        old_xp = xp_history.deleted[0] if xp_history.deleted else None
+        data = {
+            'xp': obj.xp,
+            'level': obj.level,
+            'xp_delta': obj.xp - old_xp if old_xp is not None else None,
+            'level_up': bool(level_history.deleted and obj.level > level_history.deleted[0])
+        }
+        pending.append({'user_id': obj.id, 'event': 'xp', 'data': data})
+        # every open leaderboard can move this user without refetching
+        pending.append({'user_id': None, 'event': 'leaderboard', 'data': {
+            'user_id': obj.id, 'name': obj.name, 'profile_picture': obj.profile_picture, 'xp': obj.xp, 'level': obj.level
+        }})
+    for obj in session.new:
+        if isinstance(obj, Achievement):
+            pending.append({'user_id': obj.user_id, 'event': 'achievement', 'data': {'name': obj.name, 'icon': obj.icon}})
+    for obj in session.deleted:
+        if isinstance(obj, Achievement):
+            pending.append({'user_id': obj.user_id, 'event': 'achievement_revoked', 'data': {'name': obj.name, 'icon': obj.icon}})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_events(session):
+    broker.publish(session.info.pop('pending_events', []))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_events(session, previous_transaction):
+    session.info.pop('pending_events', None)
+
+
+def init_events(app):
+    # the relay itself starts per worker, after the fork: warm_up() under
+    # gunicorn, lifespan startup under asgi.py. Not here, this runs in the
+    # preloading master
+    broker.relay_factory = create_relay(app, db.engine)
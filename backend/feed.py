@@ -0,0 +1,163 @@
+import base64
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from database import db
+from models import OfferFeedPost, calculate_xp
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 50
+
+# newest posts kept in memory; new posts are pushed onto the front instead of
+# dropping the whole page. The ttl only exists so posts written by another
+# gunicorn worker show up eventually.
+# one extra post so a full page from the cache still knows whether there is more
+FEED_CACHE_SIZE = FEED_MAX_PAGE_SIZE + 1
+FEED_CACHE_TTL = 30
+
+
+class FirstPageCache:
+    def __init__(self, size: int = FEED_CACHE_SIZE, ttl: float = FEED_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._posts: Optional[List[Dict]] = None
+        self._loaded_at = 0.0
+
+    def get(self, limit: int) -> Optional[List[Dict]]:
+        with self._lock:
+            if self._posts is None or time.monotonic() - self._loaded_at > self.ttl:
+                return None
+            return self._posts[:limit]
+
+    def fill(self, posts: List[Dict]):
+        with self._lock:
+            self._posts = posts[:self.size]
+            self._loaded_at = time.monotonic()
+
+    def push(self, post: Dict):
+        with self._lock:
+            if self._posts is None:
+                return
+            key = _sort_key(post)
+            # posts almost always arrive newest-first, so this is effectively a prepend
+            index = 0
+            while index < len(self._posts) and _sort_key(self._posts[index]) > key:
+                index += 1
+            self._posts.insert(index, post)
+            del self._posts[self.size:]
+
+    def clear(self):
+        with self._lock:
+            self._posts = None
+
+
+first_page_cache = FirstPageCache()
+
+
+def _sort_key(post: Dict) -> Tuple[str, int]:
+    return post['date_posted'], post['id']
+
+
+def serialize_post(post: OfferFeedPost) -> Dict:
+    user = post.user
+    return {
+        'id': post.id,
+        'user_id': post.user_id,
+        'name': user.name if user else None,
+        'profile_picture': user.profile_picture if user else None,
+        'company': post.company,
+        'role': post.role,
+        'message': post.message,
+        'xp_awarded': post.xp_awarded,
+        'date_posted': post.date_posted.isoformat()
+    }
+
+
+def encode_cursor(post: Dict) -> str:
+    raw = f"{post['date_posted']}|{post['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for anything that isn't a cursor we handed out"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise ValueError(f"Invalid feed cursor: {cursor}")
+
+
+def create_offer_post(user, company: str, role: str, xp_awarded: Optional[int] = None) -> OfferFeedPost:
+    """Queue a feed post for an application that just reached Offer.
+
+    The post is only published to the cached first page once the
+    surrounding transaction commits.
+    """
+    post = OfferFeedPost(
+        company=company,
+        role=role,
+        message=f"{user.name} got an offer at {company}!"[:100],
+        xp_awarded=calculate_xp('Offer') if xp_awarded is None else xp_awarded,
+        date_posted=datetime.utcnow(),
+        user=user
+    )
+    db.session.add(post)
+    return post
+
+
+def _query_page(before: Optional[Tuple[datetime, int]], limit: int) -> List[Dict]:
+    query = OfferFeedPost.query.options(db.joinedload(OfferFeedPost.user))
+    if before:
+        before_date, before_id = before
+        # keyset condition on (date_posted, id), served by ix_offer_feed_post_date_id
+        query = query.filter(db.or_(
+            OfferFeedPost.date_posted < before_date,
+            db.and_(OfferFeedPost.date_posted == before_date, OfferFeedPost.id < before_id)
+        ))
+    posts = query.order_by(OfferFeedPost.date_posted.desc(), OfferFeedPost.id.desc()).limit(limit).all()
+    return [serialize_post(post) for post in posts]
+
+
+def get_feed_page(cursor: Optional[str] = None, limit: int = FEED_PAGE_SIZE) -> Dict:
+    limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+
+    if cursor:
+        posts = _query_page(decode_cursor(cursor), limit + 1)
+    else:
+        posts = first_page_cache.get(limit + 1)
+        if posts is None:
+            cached = _query_page(None, first_page_cache.size)
+            first_page_cache.fill(cached)
+            posts = cached[:limit + 1]
+
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    return {
+        'posts': posts,
+        'next_cursor': encode_cursor(posts[-1]) if has_more and posts else None
+    }
+
+
+# posts are serialised once they have an id and pushed into the cache only
+# after commit, so rolled back posts never show up in the feed
+@event.listens_for(db.session, 'after_flush')
+def _collect_new_posts(session, flush_context):
+    pending = session.info.setdefault('pending_feed_posts', [])
+    for obj in session.new:
+        if isinstance(obj, OfferFeedPost):
+            pending.append(serialize_post(obj))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_new_posts(session):
+    for post in session.info.pop('pending_feed_posts', []):
+        first_page_cache.push(post)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_new_posts(session, previous_transaction):
+    session.info.pop('pending_feed_posts', None)
@@ -0,0 +1,71 @@
+"""
+Gunicorn settings, picked up automatically from the backend directory.
+
+The app is imported once in the master (preload_app), so app.py's
+create_all() and everything imported at startup happen once per deploy
+instead of once per worker. Workers then reset their inherited database
+pools and warm up before they accept traffic, see warmup.py.
+"""
+
+import multiprocessing
+import os
+
+
+def _cpu_count() -> int:
+    # cores this process may actually use, containers often get fewer than the host has
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+cores = _cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(2 * cores + 1, int(os.environ.get('GUNICORN_MAX_WORKERS', 4))))
+threads = int(os.environ.get('GUNICORN_THREADS') or 2 * cores)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# config.py sizes the database pools from these, set them before the app is imported
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+preload_app = True
+timeout = 60  # bulk imports of large files
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then, jittered so they don't all restart at once
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+# the default format logs the query string, which carries /events/stream's token
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+
+def when_ready(server):
+    # the master opened connections while preloading, close them before forking
+    from app import app
+    from database import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def post_fork(server, worker):
+    from app import app
+    from warmup import after_fork
+
+    after_fork(app)
+
+
+def post_worker_init(worker):
+    from app import app
+    from warmup import warm_up
+
+    try:
+        warm_up(app)
+    except Exception:
+        # a cold worker is still better than no worker
+        worker.log.exception("Warm-up failed")
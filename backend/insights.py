@@ -0,0 +1,204 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from database import db, upsert
+from models import Application, Company, CompanyStats, CompanyApplicant, value_before_flush
+
+INTERVIEW_STATUSES = ('Interviewing', 'Offer')
+REBUILD_BATCH_SIZE = 200
+
+
+def _contribution(status: Optional[str]) -> Tuple[int, int, int]:
+    # (applications, interviews, offers) one application adds to its company
+    return 1, int(status in INTERVIEW_STATUSES), int(status == 'Offer')
+
+
+def collect_deltas(new: Iterable, dirty: Iterable, deleted: Iterable):
+    """Per-company stat deltas and per-(company, user) application deltas
+    for a flush, from the objects and their attribute history"""
+    changes = []  # (sign, company_id, user_id, status)
+    for obj in new:
+        if isinstance(obj, Application):
+            changes.append((1, obj.company_id, obj.user_id, obj.status))
+    for obj in deleted:
+        if isinstance(obj, Application):
+            changes.append((-1, value_before_flush(obj, 'company_id'), value_before_flush(obj, 'user_id'), value_before_flush(obj, 'status')))
+    for obj in dirty:
+        if not isinstance(obj, Application):
+            continue
+        attrs = db.inspect(obj).attrs
+        if any(attrs[name].history.has_changes() for name in ('company_id', 'status', 'user_id')):
+            changes.append((-1, value_before_flush(obj, 'company_id'), value_before_flush(obj, 'user_id'), value_before_flush(obj, 'status')))
+            changes.append((1, obj.company_id, obj.user_id, obj.status))
+
+    stats = defaultdict(lambda: [0, 0, 0])
+    pairs = defaultdict(int)
+    for sign, company_id, user_id, status in changes:
+        if company_id is None:
+            continue
+        for i, value in enumerate(_contribution(status)):
+            stats[company_id][i] += sign * value
+        pairs[(company_id, user_id)] += sign
+    return stats, {pair: delta for pair, delta in pairs.items() if delta}
+
+
+def apply_deltas(session, stats: Dict, pairs: Dict):
+    if not stats and not pairs:
+        return
+
+    # distinct applicants only move when a user's count for a company goes
+    # between zero and non-zero, read the current counts for the pairs involved
+    applicant_deltas = defaultdict(int)
+    if pairs:
+        current = dict(
+            ((company_id, user_id), applications) for company_id, user_id, applications in session.execute(
+                db.select(CompanyApplicant.company_id, CompanyApplicant.user_id, CompanyApplicant.applications)
+                .where(db.tuple_(CompanyApplicant.company_id, CompanyApplicant.user_id).in_(list(pairs)))
+            )
+        )
+        for (company_id, user_id), delta in pairs.items():
+            before = current.get((company_id, user_id), 0)
+            applicant_deltas[company_id] += int(before + delta > 0) - int(before > 0)
+
+        upsert(
+            CompanyApplicant,
+            [{'company_id': c, 'user_id': u, 'applications': delta} for (c, u), delta in pairs.items()],
+            ['company_id', 'user_id'],
+            lambda excluded: {'applications': CompanyApplicant.applications + excluded.applications}
+        )
+        session.execute(db.delete(CompanyApplicant).where(
+            db.tuple_(CompanyApplicant.company_id, CompanyApplicant.user_id).in_(list(pairs)),
+            CompanyApplicant.applications <= 0
+        ).execution_options(synchronize_session=False))
+
+    rows = [
+        {
+            'company_id': company_id,
+            'applications': values[0],
+            'interviews': values[1],
+            'offers': values[2],
+            'applicants': applicant_deltas.get(company_id, 0)
+        }
+        for company_id, values in stats.items()
+    ]
+    rows = [row for row in rows if any(row[key] for key in ('applications', 'interviews', 'offers', 'applicants'))]
+    upsert(
+        CompanyStats,
+        rows,
+        ['company_id'],
+        lambda excluded: {
+            'applications': CompanyStats.applications + excluded.applications,
+            'interviews': CompanyStats.interviews + excluded.interviews,
+            'offers': CompanyStats.offers + excluded.offers,
+            'applicants': CompanyStats.applicants + excluded.applicants
+        }
+    )
+
+
+# after_flush: company ids are assigned (companies.py, before_flush) and the
+# attribute history still shows what each row looked like before
+@event.listens_for(db.session, 'after_flush')
+def _update_company_stats(session, flush_context):
+    stats, pairs = collect_deltas(session.new, session.dirty, session.deleted)
+    apply_deltas(session, stats, pairs)
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def get_company_insights(company_id: int) -> Optional[Dict]:
+    """Primary key lookups only, no matter how many applications exist"""
+    company = db.session.get(Company, company_id)
+    if company is None:
+        return None
+    stats = db.session.get(CompanyStats, company_id)
+    applications = stats.applications if stats else 0
+    interviews = stats.interviews if stats else 0
+    offers = stats.offers if stats else 0
+    return {
+        'company': {'id': company.id, 'name': company.name},
+        'applications': applications,
+        'applicants': stats.applicants if stats else 0,
+        'interviews': interviews,
+        'offers': offers,
+        'interview_rate': _rate(interviews, applications),
+        'offer_rate': _rate(offers, applications)
+    }
+
+
+def delete_company_insights(company_ids: List[int]):
+    db.session.execute(db.delete(CompanyApplicant).where(CompanyApplicant.company_id.in_(company_ids))
+                       .execution_options(synchronize_session=False))
+    db.session.execute(db.delete(CompanyStats).where(CompanyStats.company_id.in_(company_ids))
+                       .execution_options(synchronize_session=False))
+
+
+def _rebuild_companies(company_ids: List[int]):
+    delete_company_insights(company_ids)
+
+    per_user = db.session.execute(
+        db.select(
+            Application.company_id,
+            Application.user_id,
+            db.func.count(Application.id),
+            db.func.sum(db.case((Application.status.in_(INTERVIEW_STATUSES), 1), else_=0)),
+            db.func.sum(db.case((Application.status == 'Offer', 1), else_=0))
+        ).where(Application.company_id.in_(company_ids)).group_by(Application.company_id, Application.user_id)
+    ).all()
+    if not per_user:
+        return
+
+    stats = defaultdict(lambda: {'applications': 0, 'interviews': 0, 'offers': 0, 'applicants': 0})
+    for company_id, user_id, applications, interviews, offers in per_user:
+        totals = stats[company_id]
+        totals['applications'] += applications
+        totals['interviews'] += interviews or 0
+        totals['offers'] += offers or 0
+        totals['applicants'] += 1
+
+    db.session.execute(db.insert(CompanyApplicant), [
+        {'company_id': company_id, 'user_id': user_id, 'applications': applications}
+        for company_id, user_id, applications, _, _ in per_user
+    ])
+    db.session.execute(db.insert(CompanyStats), [
+        {'company_id': company_id, **totals} for company_id, totals in stats.items()
+    ])
+
+
+def rebuild_company_insights(company_ids: Optional[List[int]] = None, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Recompute insights from the application table, `batch_size` companies
+    per transaction. Fixes drift from writes that bypassed the session"""
+    if company_ids is not None:
+        for start in range(0, len(company_ids), batch_size):
+            _rebuild_companies(company_ids[start:start + batch_size])
+            db.session.commit()
+        return len(company_ids)
+
+    rebuilt = 0
+    last_id = 0
+    while True:
+        batch = db.session.scalars(
+            db.select(Company.id).where(Company.id > last_id).order_by(Company.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        _rebuild_companies(batch)
+        db.session.commit()
+        rebuilt += len(batch)
+        last_id = batch[-1]
+    return rebuilt
+
+
+@click.command('rebuild-company-insights')
+@click.option('--batch-size', default=REBUILD_BATCH_SIZE, help='Companies per transaction')
+@with_appcontext
+def rebuild_company_insights_command(batch_size):
+    """Recompute every company's insights from the application table"""
+    click.echo(f"Rebuilt insights for {rebuild_company_insights(batch_size=batch_size)} companies")
+
+
+def init_insights(app):
+    app.cli.add_command(rebuild_company_insights_command)
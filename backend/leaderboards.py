@@ -0,0 +1,119 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from database import db, upsert
+from models import User, XPBucket
+
+LEADERBOARD_SIZE = 25
+PERIODS = ['week', 'month', 'cycle']
+
+
+def week_key(when: datetime) -> str:
+    # weeks start on monday
+    return (when.date() - timedelta(days=when.weekday())).isoformat()
+
+
+def month_key(when: datetime) -> str:
+    return when.strftime('%Y-%m')
+
+
+def cycle_key(when: datetime) -> str:
+    # students recruit in the fall (Jul-Dec) for the spring co-op of the next
+    # year and in the spring (Jan-Jun) for the fall co-op of the same year
+    if when.month >= 7:
+        return f"{when.year + 1}-spring"
+    return f"{when.year}-fall"
+
+
+PERIOD_KEYS = {
+    'week': week_key,
+    'month': month_key,
+    'cycle': cycle_key
+}
+
+
+def period_key_for(period: str, when: Optional[datetime] = None) -> str:
+    if period not in PERIOD_KEYS:
+        raise ValueError(f"Unknown leaderboard window: {period}. Must be one of: {', '.join(PERIODS)}")
+    return PERIOD_KEYS[period](when or datetime.utcnow())
+
+
+def roll_up_xp_changes(changes) -> List[Dict]:
+    """Collapse (user_id, delta, when) tuples into one row per bucket"""
+    totals = defaultdict(int)
+    for user_id, delta, when in changes:
+        for period, key_for in PERIOD_KEYS.items():
+            totals[(user_id, period, key_for(when))] += delta
+
+    return [
+        {'user_id': user_id, 'period': period, 'period_key': key, 'xp': xp}
+        for (user_id, period, key), xp in totals.items()
+        if xp
+    ]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _apply_xp_changes(session, flush_context, instances):
+    changes = session.info.pop('pending_xp_changes', None)
+    if not changes:
+        return
+    rows = roll_up_xp_changes(changes)
+    upsert(
+        XPBucket,
+        [row for row in rows if row['xp'] > 0],
+        ['user_id', 'period', 'period_key'],
+        lambda excluded: {'xp': XPBucket.xp + excluded.xp}
+    )
+    # losses only take back what a window holds, a window with nothing in it
+    # (xp earned before buckets existed) has nothing to lose
+    losses = [row for row in rows if row['xp'] < 0]
+    if losses:
+        # the table, not the model, so this is a plain executemany and not an
+        # ORM bulk update by primary key
+        buckets = XPBucket.__table__
+        new_xp = buckets.c.xp + db.bindparam('loss')
+        session.execute(
+            db.update(buckets).where(
+                buckets.c.user_id == db.bindparam('bucket_user_id'),
+                buckets.c.period == db.bindparam('bucket_period'),
+                buckets.c.period_key == db.bindparam('bucket_period_key')
+            ).values(xp=db.case((new_xp < 0, 0), else_=new_xp)),
+            [{'bucket_user_id': row['user_id'], 'bucket_period': row['period'],
+              'bucket_period_key': row['period_key'], 'loss': row['xp']} for row in losses]
+        )
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_xp_changes(session, previous_transaction):
+    session.info.pop('pending_xp_changes', None)
+
+
+def get_window_leaderboard(period: str, period_key: Optional[str] = None, limit: int = LEADERBOARD_SIZE) -> Dict:
+    # period_key_for raises ValueError for unknown windows, even with an explicit key
+    current_key = period_key_for(period)
+    period_key = period_key or current_key
+
+    # top-k comes straight off ix_xp_bucket_period_rank, no scan of history
+    rows = db.session.query(XPBucket.xp, User).join(User, User.id == XPBucket.user_id).filter(
+        XPBucket.period == period,
+        XPBucket.period_key == period_key,
+        XPBucket.xp > 0
+    ).order_by(XPBucket.xp.desc(), XPBucket.user_id).limit(limit).all()
+
+    return {
+        'window': period,
+        'window_key': period_key,
+        'xp_leaderboard': [
+            {
+                'rank': i,
+                'user_id': user.id,
+                'name': user.name,
+                'profile_picture': user.profile_picture,
+                'xp': window_xp,
+                'total_xp': user.xp,
+                'level': user.level
+            }
+            for i, (window_xp, user) in enumerate(rows, 1)
+        ]
+    }
@@ -1,17 +1,145 @@
 from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
 from database import db
+from progression import get_active_curve
 
 class Application(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     company = db.Column(db.String(100), nullable=False)
     position = db.Column(db.String(100), nullable=False)
-    status = db.Column(db.String(50), nullable=False)  # Applied, Interviewing, Offer, Rejected
-    applied_date = db.Column(db.DateTime, nullable=True)
+    # active_history: the flush hooks in insights.py and streaks.py move counts
+    # away from the old value, so it's loaded before an update overwrites it
+    status = db.mapped_column(db.String(50), nullable=False, active_history=True)  # Applied, Interviewing, Offer, Rejected
+    applied_date = db.mapped_column(db.DateTime, nullable=True, active_history=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Foreign key to user
+    user_id = db.mapped_column(db.Integer, db.ForeignKey('user.id'), nullable=False, active_history=True)
+    
+    # canonical company, filled from `company` on flush, see companies.py
+    company_id = db.mapped_column(db.Integer, db.ForeignKey('company.id'), nullable=True, active_history=True)
+    
+    __table_args__ = (
+        db.Index('ix_application_user_company', 'user_id', 'company_id'),
+        # company insight rebuilds aggregate straight off this index
+        db.Index('ix_application_company_status', 'company_id', 'status', 'user_id'),
+    )
+
+# what the after_flush hooks in insights.py and streaks.py read off a deleted application
+DELETED_APPLICATION_ATTRIBUTES = ('status', 'company_id', 'user_id', 'applied_date', 'created_at')
+
+@event.listens_for(db.session, 'before_flush')
+def _load_deleted_applications(session, flush_context, instances):
+    # an expired row has nothing to read once it's deleted, load what's needed while it exists
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            unloaded = db.inspect(obj).unloaded.intersection(DELETED_APPLICATION_ATTRIBUTES)
+            if unloaded:
+                session.refresh(obj, attribute_names=sorted(unloaded))
+
+def value_before_flush(obj, attr: str):
+    """An attribute as it was before this flush changed it"""
+    history = db.inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+class ApplicationStatusEvent(db.Model):
+    # append-only, one row per status an application enters, see status_history.py.
+    # no foreign key to application, the history outlives deleted applications
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    application_id = db.Column(db.Integer, nullable=False)
+    from_status = db.Column(db.String(50), nullable=True)  # None when the application was created
+    to_status = db.Column(db.String(50), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # a user's history in time order is one range scan
+    __table_args__ = (db.Index('ix_application_status_event_user_ts', 'user_id', 'ts', 'id'),)
+
+class ImportErrorRow(db.Model):
+    # rows that failed the user's latest bulk import, served as a CSV report.
+    # only the latest import is kept, see bulk_import.py
+    id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    import_id = db.Column(db.String(32), nullable=False)
+    row = db.Column(db.Integer, nullable=False)
+    codes = db.Column(db.String(200), nullable=False)  # space separated error codes
+    errors = db.Column(db.Text, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # the row's cells as JSON
+
+    __table_args__ = (db.Index('ix_import_error_row_user_import', 'user_id', 'import_id', 'row'),)
+
+class ImportUpload(db.Model):
+    # a file (or JSON batch) a user imported, by content hash, so the same
+    # upload again is answered without parsing it. see bulk_import.py
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 hex
+    uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    summary = db.Column(db.Text, nullable=False)  # the result's summary as JSON
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'content_hash', name='uq_import_upload_user_hash'),)
+
+class ImportRowFingerprint(db.Model):
+    # imported rows by (company, position, date) hash -> the application they
+    # became. no foreign key, a fingerprint whose application is gone is ignored
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    fingerprint = db.Column(db.String(64), primary_key=True)
+    application_id = db.Column(db.Integer, nullable=False)
+    upload_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (db.Index('ix_import_row_fingerprint_upload', 'upload_id'),)
+
+class RecomputeRange(db.Model):
+    # one range of user ids in a `flask recompute` run and how far it got, see recompute.py
+    run_id = db.Column(db.String(32), primary_key=True)
+    start_id = db.Column(db.Integer, primary_key=True)
+    end_id = db.Column(db.Integer, nullable=False)  # exclusive
+    last_id = db.Column(db.Integer, nullable=True)  # last user id done, resume after it
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class Company(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # display name, as first entered
+    normalized_name = db.Column(db.String(100), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    aliases = db.relationship('CompanyAlias', backref='company', lazy=True, cascade='all, delete-orphan')
+    
+    # autocomplete does prefix lookups on the normalized key. postgres needs
+    # text_pattern_ops for LIKE 'abc%' to use the index under a non-C collation
+    __table_args__ = (
+        db.Index('ix_company_name_prefix', 'normalized_name', postgresql_ops={'normalized_name': 'text_pattern_ops'}),
+    )
+
+class CompanyAlias(db.Model):
+    # other names the same company goes by, e.g. "Facebook" for Meta
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    alias = db.Column(db.String(100), nullable=False)
+    normalized_alias = db.Column(db.String(100), nullable=False, unique=True)
+    
+    __table_args__ = (
+        db.Index('ix_company_alias_prefix', 'normalized_alias', postgresql_ops={'normalized_alias': 'text_pattern_ops'}),
+    )
+
+class CompanyStats(db.Model):
+    # running totals across all users, kept current on every application write, see insights.py
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), primary_key=True)
+    applications = db.Column(db.Integer, nullable=False, default=0)
+    interviews = db.Column(db.Integer, nullable=False, default=0)  # reached interviewing or offer
+    offers = db.Column(db.Integer, nullable=False, default=0)
+    applicants = db.Column(db.Integer, nullable=False, default=0)  # distinct users
+
+class CompanyApplicant(db.Model):
+    # applications per (company, user), only there to keep CompanyStats.applicants exact
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    applications = db.Column(db.Integer, nullable=False, default=0)
 
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -36,6 +164,38 @@ class User(db.Model):
     
     applications = db.relationship('Application', backref='user', lazy=True, cascade='all, delete-orphan')
     achievements = db.relationship('Achievement', backref='user', lazy=True, cascade='all, delete-orphan')
+    streak = db.relationship('UserStreak', uselist=False, lazy=True, cascade='all, delete-orphan')
+    
+    # the all-time board and rank lookups walk this in xp order, see ranking.py
+    __table_args__ = (db.Index('ix_user_xp_id', 'xp', 'id'),)
+
+class ActivityDay(db.Model):
+    # days a user applied on, with how many applications, see streaks.py
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    applications = db.Column(db.Integer, nullable=False, default=0)
+
+class ActivityStreak(db.Model):
+    # one row per run of consecutive active days, start_day..end_day inclusive
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    start_day = db.Column(db.Date, nullable=False)
+    end_day = db.Column(db.Date, nullable=False)
+    days = db.Column(db.Integer, nullable=False)
+    
+    # neighbouring runs are found by their ends, the longest by length
+    __table_args__ = (
+        db.Index('ix_activity_streak_user_start', 'user_id', 'start_day'),
+        db.Index('ix_activity_streak_user_end', 'user_id', 'end_day'),
+        db.Index('ix_activity_streak_user_days', 'user_id', 'days'),
+    )
+
+class UserStreak(db.Model):
+    # the latest run and the longest one, what achievements and the profile read
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    current = db.Column(db.Integer, nullable=False, default=0)  # length of the run ending on last_day
+    longest = db.Column(db.Integer, nullable=False, default=0)
+    last_day = db.Column(db.Date, nullable=True)
 
 class OfferFeedPost(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,8 +206,28 @@ class OfferFeedPost(db.Model):
     xp_awarded = db.Column(db.Integer, default=0)
 
     # add a fk to user, each post belongs to one user
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) 
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user = db.relationship('User')
+
+    # keyset pagination for the feed walks (date_posted, id) backwards
+    __table_args__ = (db.Index('ix_offer_feed_post_date_id', 'date_posted', 'id'),)
     
+class XPBucket(db.Model):
+    # xp earned by a user inside one time window, e.g. period='week', period_key='2025-09-15'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # week, month, cycle
+    period_key = db.Column(db.String(20), nullable=False)
+    xp = db.Column(db.Integer, nullable=False, default=0)
+
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_key', name='uq_xp_bucket_user_period'),
+        # windowed leaderboards read the top rows straight off this index
+        db.Index('ix_xp_bucket_period_rank', 'period', 'period_key', 'xp'),
+    )
+
 def calculate_xp(status: str) -> int:
     #Calculate the user's xp based on an applications status
     xp_map = {
@@ -61,18 +241,33 @@ def calculate_xp(status: str) -> int:
     return xp_map.get(status, 0)
 
 def get_level(xp: int) -> int:
-    #TODO: make the levels harder as the users progress
-    xp = max(0, xp)
-    return max(1, (xp // 100) + 1)
+    # thresholds are precomputed from LEVEL_CURVE at startup, see progression.py
+    return get_active_curve().level_for_xp(xp)
+
+def _track_xp_change(user, old_xp: int, earned_at: Optional[datetime] = None):
+    # queued on the session and rolled up into XPBucket rows on flush, see leaderboards.py.
+    # gains count in the current windows. A loss is taken back from the windows
+    # the xp was earned in (earned_at) or, when that isn't known, the current ones
+    delta = user.xp - (old_xp or 0)
+    if delta and user.id is not None:
+        when = earned_at if delta < 0 and earned_at is not None else datetime.utcnow()
+        pending = db.session.info.setdefault('pending_xp_changes', [])
+        pending.append((user.id, delta, when))
 
 def safe_add_xp(user, xp_to_add: int):
+    old_xp = user.xp
     user.xp = max(0, user.xp + xp_to_add)
     user.level = get_level(user.xp)
+    _track_xp_change(user, old_xp)
 
-def safe_subtract_xp(user, xp_to_subtract: int):
+def safe_subtract_xp(user, xp_to_subtract: int, earned_at: Optional[datetime] = None):
+    old_xp = user.xp
     user.xp = max(0, user.xp - xp_to_subtract)
     user.level = get_level(user.xp)
+    _track_xp_change(user, old_xp, earned_at)
 
 def safe_set_xp(user, new_xp: int):
+    old_xp = user.xp
     user.xp = max(0, new_xp)
-    user.level = get_level(user.xp) 
\ No newline at end of file
+    user.level = get_level(user.xp)
+    _track_xp_change(user, old_xp)
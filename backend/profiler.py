@@ -0,0 +1,190 @@
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional
+import click
+from flask import current_app, g, request
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+PROFILE_HEADER = 'X-Profile'
+
+# profile of the request running in this context, None almost always
+_active_profile: contextvars.ContextVar = contextvars.ContextVar('active_profile', default=None)
+
+
+def sign_profile_token(secret: str, expires: int) -> str:
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(secret: str, token: str, now: Optional[float] = None) -> bool:
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < (now or time.time()):
+        return False
+    return hmac.compare_digest(sign_profile_token(secret, int(expires)), token)
+
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds from a background
+    thread and counts identical stacks, the collapsed format flame graph
+    tools (flamegraph.pl, speedscope) read."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(frames))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    def __init__(self, config):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), config['PROFILE_SAMPLE_INTERVAL'])
+        self.statements = []
+        self.started = time.perf_counter()
+
+    def start(self):
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+
+    def write(self, directory: str, endpoint: str, status: int) -> str:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.id}-{endpoint}")
+        self.profile.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", 'w') as f:
+            f.write(self.sampler.collapsed())
+        with open(f"{base}.sql.json", 'w') as f:
+            json.dump({
+                'endpoint': endpoint,
+                'status': status,
+                'duration_ms': round(self.duration * 1000, 2),
+                'sql_ms': round(sum(s['duration_ms'] for s in self.statements), 2),
+                'statements': self.statements
+            }, f, indent=2)
+        return base
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is None or not conn.info.get('profile_query_start'):
+        return
+    started = conn.info['profile_query_start'].pop()
+    profile.statements.append({
+        'sql': statement,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'executemany': executemany,
+        'rows': cursor.rowcount
+    })
+
+
+def install_sql_capture(engine):
+    # one contextvar lookup per query while no request is being profiled
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _should_profile(config) -> bool:
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return verify_profile_token(config['PROFILE_SECRET'], token)
+    rate = config['PROFILE_SAMPLE_RATES'].get(request.endpoint)
+    return bool(rate) and random.random() < rate
+
+
+def start_profile():
+    config = current_app.config
+    if not config['PROFILE_SAMPLE_RATES'] and PROFILE_HEADER not in request.headers:
+        return
+    if not _should_profile(config):
+        return
+    profile = RequestProfile(config)
+    g.request_profile = profile
+    g.request_profile_token = _active_profile.set(profile)
+    profile.start()
+
+
+def _stop_profile(status: int) -> Optional[RequestProfile]:
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        return None
+    profile.stop()
+    _active_profile.reset(g.pop('request_profile_token'))
+    profile.write(current_app.config['PROFILE_DIR'], request.endpoint or 'unknown', status)
+    return profile
+
+
+def finish_profile(response):
+    profile = _stop_profile(response.status_code)
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+
+def abandon_profile(exc=None):
+    # unhandled errors skip after_request, still stop the profiler and keep what it saw
+    _stop_profile(500)
+
+
+@click.command('profile-token')
+@click.option('--minutes', default=15, help='How long the token stays valid')
+@with_appcontext
+def profile_token_command(minutes):
+    """Print a signed X-Profile header value for profiling requests on demand"""
+    expires = int(time.time()) + minutes * 60
+    click.echo(f"{PROFILE_HEADER}: {sign_profile_token(current_app.config['PROFILE_SECRET'], expires)}")
+
+
+def init_profiler(app, engines: Dict):
+    """Profile requests carrying a signed X-Profile header, or a sample of
+    the endpoints in PROFILE_SAMPLE_RATES. Results go to PROFILE_DIR as
+    <id>-<endpoint>.pstats / .collapsed / .sql.json"""
+    for engine in engines.values():
+        install_sql_capture(engine)
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(abandon_profile)
+    app.cli.add_command(profile_token_command)
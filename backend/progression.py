@@ -0,0 +1,154 @@
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import click
+from flask.cli import with_appcontext
+from config import DEFAULT_LEVEL_CURVE
+from database import db
+
+# levels precomputed for an uncapped curve, past them it keeps its last step
+UNCAPPED_PRECOMPUTED_LEVELS = 1000
+
+# how many levels go into a single UPDATE ... CASE when re-leveling users
+RELEVEL_CHUNK_SIZE = 200
+
+
+class LevelCurve:
+    """Level curve precomputed into a sorted list of XP thresholds.
+
+    thresholds[i] is the total XP needed to reach level i + 1, so
+    thresholds[0] is always 0 (everybody starts at level 1). A capped curve
+    ends at its last threshold, an uncapped one keeps adding levels at the
+    last step's size.
+    """
+
+    def __init__(self, thresholds: List[int], capped: bool = True):
+        if not thresholds or thresholds[0] != 0:
+            raise ValueError("Level thresholds must start at 0")
+        if any(b <= a for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError("Level thresholds must be strictly increasing")
+        self.thresholds = list(thresholds)
+        self.capped = capped or len(thresholds) < 2
+
+    @property
+    def max_level(self) -> Optional[int]:
+        return len(self.thresholds) if self.capped else None
+
+    @property
+    def last_step(self) -> int:
+        return self.thresholds[-1] - self.thresholds[-2]
+
+    def level_for_xp(self, xp: int) -> int:
+        # O(log L) lookup instead of walking the curve
+        xp = max(0, xp)
+        level = max(1, bisect_right(self.thresholds, xp))
+        if not self.capped and level == len(self.thresholds):
+            level += (xp - self.thresholds[-1]) // self.last_step
+        return level
+
+    def xp_for_level(self, level: int) -> int:
+        level = max(1, level)
+        if level > len(self.thresholds):
+            if self.capped:
+                return self.thresholds[-1]
+            return self.thresholds[-1] + (level - len(self.thresholds)) * self.last_step
+        return self.thresholds[level - 1]
+
+    @classmethod
+    def from_config(cls, curve_config: Optional[Dict]) -> 'LevelCurve':
+        curve_config = dict(DEFAULT_LEVEL_CURVE, **(curve_config or {}))
+        curve_type = curve_config['type']
+        capped = curve_config.get('max_level') is not None
+        max_level = int(curve_config['max_level']) if capped else UNCAPPED_PRECOMPUTED_LEVELS
+
+        if curve_type == 'tabulated':
+            return cls([int(t) for t in curve_config['thresholds']])
+
+        base = float(curve_config['base'])
+        thresholds = []
+        for level in range(1, max_level + 1):
+            n = level - 1
+            if curve_type == 'polynomial':
+                xp_needed = base * n ** float(curve_config['exponent'])
+            elif curve_type == 'geometric':
+                # each level costs `ratio` times more than the previous one
+                ratio = float(curve_config.get('ratio', 1.5))
+                xp_needed = base * n if ratio == 1 else base * (ratio ** n - 1) / (ratio - 1)
+            else:
+                raise ValueError(f"Unknown level curve type: {curve_type}")
+
+            xp_needed = int(round(xp_needed))
+            # very flat curves can round two levels onto the same threshold, stop there
+            if thresholds and xp_needed <= thresholds[-1]:
+                break
+            thresholds.append(xp_needed)
+
+        return cls(thresholds, capped)
+
+
+_active_curve = LevelCurve.from_config(DEFAULT_LEVEL_CURVE)
+
+
+def get_active_curve() -> LevelCurve:
+    return _active_curve
+
+
+def set_active_curve(curve: LevelCurve):
+    global _active_curve
+    _active_curve = curve
+
+
+def init_progression(app):
+    """Build the level curve once at startup from app config"""
+    set_active_curve(LevelCurve.from_config(app.config.get('LEVEL_CURVE')))
+    app.cli.add_command(relevel_command)
+
+
+def relevel_all_users(curve: Optional[LevelCurve] = None, chunk_size: int = RELEVEL_CHUNK_SIZE) -> int:
+    """Apply a level curve to every user with set-based UPDATEs.
+
+    Levels are processed in chunks so each statement carries at most
+    `chunk_size` CASE branches and only touches users whose XP falls in
+    that chunk's range. No user rows are loaded into Python.
+    """
+    from models import User
+
+    curve = curve or get_active_curve()
+    thresholds = curve.thresholds
+    user_xp = db.func.coalesce(User.xp, 0)
+    updated = 0
+
+    for start in range(0, len(thresholds), chunk_size):
+        chunk = thresholds[start:start + chunk_size]
+        end = start + len(chunk)
+
+        branches = [(user_xp >= threshold, start + i + 1) for i, threshold in enumerate(chunk)]
+        if end == len(thresholds) and not curve.capped:
+            # past the last threshold an uncapped curve keeps its last step
+            branches[-1] = (user_xp >= thresholds[-1], end + (user_xp - thresholds[-1]) // curve.last_step)
+        # highest threshold first so the first matching branch wins
+        level_case = db.case(*reversed(branches), else_=start + 1)
+
+        # the first chunk also picks up negative xp, which stays on level 1
+        conditions = []
+        if start > 0:
+            conditions.append(user_xp >= chunk[0])
+        if end < len(thresholds):
+            conditions.append(user_xp < thresholds[end])
+
+        result = db.session.execute(
+            db.update(User).where(*conditions).values(level=level_case).execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount or 0
+
+    db.session.commit()
+    return updated
+
+
+@click.command('relevel')
+@with_appcontext
+def relevel_command():
+    """Recalculate every user's level from the configured level curve"""
+    curve = get_active_curve()
+    updated = relevel_all_users(curve)
+    levels = f"{curve.max_level} levels" if curve.capped else "uncapped levels"
+    click.echo(f"Re-leveled {updated} users across {levels}")
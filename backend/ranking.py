@@ -0,0 +1,273 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from database import db
+from models import User, Achievement
+from events import broker
+
+LEADERBOARD_PAGE_SIZE = 25
+MAX_LEADERBOARD_PAGE_SIZE = 100
+MAX_NEIGHBOURS = 10
+
+# xp changes committed in this process are applied right away and other
+# workers' arrive through the event relay. The periodic reload only bounds
+# drift from writes neither of those saw (raw SQL, a relay hiccup)
+RANK_INDEX_TTL = 300
+
+# the tree holds one counter per xp value up to here (8MB at most); the rare
+# users beyond it are kept in a plain sorted list instead
+XP_TREE_LIMIT = 1 << 20
+
+
+class XPRankIndex:
+    """Order statistics over every user's total xp: how many users have more
+    xp than a value, and which xp value sits at the k-th position, both in
+    O(log max_xp) off a Fenwick tree of user counts per xp value."""
+
+    def __init__(self, ttl: float = RANK_INDEX_TTL, tree_limit: int = XP_TREE_LIMIT):
+        self.ttl = ttl
+        self.tree_limit = tree_limit
+        self._lock = threading.Lock()
+        self._xp_by_user: Dict[int, int] = {}
+        self._tree: List[int] = [0]
+        self._beyond: List[int] = []  # sorted xp values >= tree_limit
+        self._loaded_at: Optional[float] = None
+
+    # fenwick tree over xp values 0..size-1, stored 1-based
+    def _size(self) -> int:
+        return len(self._tree) - 1
+
+    def _add(self, xp: int, delta: int):
+        if xp >= self.tree_limit:
+            if delta > 0:
+                bisect.insort(self._beyond, xp)
+            else:
+                del self._beyond[bisect.bisect_left(self._beyond, xp)]
+            return
+        i = xp + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, xp: int) -> int:
+        if xp >= self.tree_limit:
+            return len(self._xp_by_user) - len(self._beyond) + bisect.bisect_right(self._beyond, xp)
+        i = min(xp, self._size() - 1) + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _rebuild(self, size: int):
+        # sized to a power of two so _xp_at_position can walk it bit by bit
+        capacity = 1
+        while capacity < min(size, self.tree_limit):
+            capacity *= 2
+        self._tree = [0] * (capacity + 1)
+        self._beyond = []
+        for xp in self._xp_by_user.values():
+            self._add(xp, 1)
+
+    def _set(self, user_id: int, xp: int):
+        xp = max(0, xp or 0)
+        old = self._xp_by_user.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._add(old, -1)
+        self._xp_by_user[user_id] = xp
+        if self._size() <= xp < self.tree_limit:
+            self._rebuild(2 * (xp + 1))
+        else:
+            self._add(xp, 1)
+
+    def load(self, rows):
+        with self._lock:
+            self._xp_by_user = {user_id: max(0, xp or 0) for user_id, xp in rows}
+            self._rebuild(max(self._xp_by_user.values(), default=0) + 1)
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.load(db.session.execute(db.select(User.id, User.xp)).all())
+
+    def update(self, changes: Dict[int, Optional[int]]):
+        """user_id -> new xp, None for users that are gone"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for user_id, xp in changes.items():
+                if xp is None:
+                    old = self._xp_by_user.pop(user_id, None)
+                    if old is not None:
+                        self._add(old, -1)
+                else:
+                    self._set(user_id, xp)
+
+    def total(self) -> int:
+        return len(self._xp_by_user)
+
+    def xp_of(self, user_id: int) -> Optional[int]:
+        return self._xp_by_user.get(user_id)
+
+    def count_above(self, xp: int) -> int:
+        with self._lock:
+            return len(self._xp_by_user) - self._count_at_most(xp)
+
+    def count_below(self, xp: int) -> int:
+        with self._lock:
+            return self._count_at_most(xp - 1) if xp > 0 else 0
+
+    def xp_at_position(self, position: int) -> Optional[Tuple[int, int]]:
+        """xp of the user at 0-based `position` in xp-descending order, and how
+        many users have more. None past the end"""
+        with self._lock:
+            total = len(self._xp_by_user)
+            if position < 0 or position >= total:
+                return None
+            if position < len(self._beyond):
+                xp = self._beyond[-1 - position]
+                return xp, len(self._beyond) - bisect.bisect_right(self._beyond, xp)
+            # the position-th largest is the (total - position)-th smallest
+            target = total - position
+            index, seen = 0, 0
+            step = self._size()
+            while step:
+                if index + step <= self._size() and seen + self._tree[index + step] < target:
+                    index += step
+                    seen += self._tree[index]
+                step //= 2
+            xp = index  # tree slot index + 1 holds xp == index
+            return xp, total - self._count_at_most(xp)
+
+
+rank_index = XPRankIndex()
+
+
+def board_rows_statement(xp: int, skip: int, limit: int):
+    # from the first user with `xp` onwards, same order as the top of the board
+    return (db.select(User.id, User.name, User.profile_picture, User.xp, User.level)
+            .where(User.xp <= xp).order_by(User.xp.desc(), User.id).offset(skip).limit(limit))
+
+
+def achievement_counts_statement(user_ids: List[int]):
+    return (db.select(Achievement.user_id, db.func.count(Achievement.id))
+            .where(Achievement.user_id.in_(user_ids)).group_by(Achievement.user_id))
+
+
+def _achievement_counts(user_ids: List[int]) -> Dict[int, int]:
+    if not user_ids:
+        return {}
+    return dict(db.session.execute(achievement_counts_statement(user_ids)).all())
+
+
+def get_xp_page(offset: int = 0, limit: int = LEADERBOARD_PAGE_SIZE) -> Dict:
+    """All-time xp board from `offset`. The index finds the xp value at the
+    offset, so the query starts there off ix_user_xp_id instead of skipping
+    `offset` rows; only users tied on that value are stepped over"""
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_LEADERBOARD_PAGE_SIZE))
+    rank_index.ensure_loaded()
+    total = rank_index.total()
+
+    start = rank_index.xp_at_position(offset)
+    rows = []
+    if start is not None:
+        xp, above = start
+        rows = db.session.execute(board_rows_statement(xp, offset - above, limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    counts = _achievement_counts([row.id for row in rows])
+    return {
+        'xp_leaderboard': [
+            {
+                'rank': offset + i,
+                'user_id': row.id,
+                'name': row.name,
+                'profile_picture': row.profile_picture,
+                'xp': row.xp,
+                'level': row.level,
+                'achievement_count': counts.get(row.id, 0)
+            }
+            for i, row in enumerate(rows, 1)
+        ],
+        'offset': offset,
+        'limit': limit,
+        'total_users': total,
+        'has_more': has_more
+    }
+
+
+def get_my_rank(user: User, neighbours: int = 2) -> Dict:
+    """Where `user` stands on the all-time board: rank, percentile and the
+    users just above and below"""
+    neighbours = max(0, min(neighbours, MAX_NEIGHBOURS))
+    rank_index.ensure_loaded()
+    if rank_index.xp_of(user.id) != user.xp:
+        # written by another worker and not relayed yet, trust the row
+        rank_index.update({user.id: user.xp})
+
+    # position among equal xp goes by id, like the board's order
+    tied_before = db.session.scalar(
+        db.select(db.func.count(User.id)).where(User.xp == user.xp, User.id < user.id)
+    )
+    position = rank_index.count_above(user.xp) + tied_before
+    total = rank_index.total()
+    below = rank_index.count_below(user.xp)
+
+    start = max(0, position - neighbours)
+    page = get_xp_page(start, position - start + neighbours + 1)['xp_leaderboard']
+    for entry in page:
+        entry['is_me'] = entry['user_id'] == user.id
+    return {
+        'rank': position + 1,
+        'total_users': total,
+        'percentile': round(below / (total - 1) * 100, 1) if total > 1 else 100.0,
+        'xp': user.xp,
+        'level': user.level,
+        'neighbours': page
+    }
+
+
+# committed xp changes go into this worker's index straight away
+@event.listens_for(db.session, 'after_flush')
+def _collect_xp_changes(session, flush_context):
+    changes = session.info.setdefault('rank_changes', {})
+    for obj in session.new:
+        if isinstance(obj, User):
+            changes[obj.id] = obj.xp
+    for obj in session.dirty:
+        if isinstance(obj, User) and db.inspect(obj).attrs.xp.history.has_changes():
+            changes[obj.id] = obj.xp
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes[obj.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_xp_changes(session):
+    changes = session.info.pop('rank_changes', None)
+    if changes:
+        rank_index.update(changes)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_xp_changes(session, previous_transaction):
+    session.info.pop('rank_changes', None)
+
+
+def _apply_relayed(messages):
+    # other workers' leaderboard events carry the user's new total
+    changes = {
+        message['data']['user_id']: message['data']['xp']
+        for message in messages if message.get('event') == 'leaderboard'
+    }
+    if changes:
+        rank_index.update(changes)
+
+
+broker.listeners.append(_apply_relayed)
@@ -0,0 +1,275 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+from flask import current_app, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+_FAIL_OPEN = object()
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class Limit:
+    """Token bucket that holds `count` tokens and refills all of them every `period` seconds"""
+
+    def __init__(self, count: int, period: int):
+        self.count = count
+        self.period = period
+
+    @property
+    def refill_rate(self) -> float:
+        return self.count / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> 'Limit':
+        # "10/minute", "300/hour"
+        count, _, period = value.partition('/')
+        if period not in PERIODS:
+            raise ValueError(f"Unknown rate limit period: {value}")
+        return cls(int(count), PERIODS[period])
+
+    def __repr__(self):
+        return f"Limit({self.count}/{self.period}s)"
+
+
+class MemoryStore:
+    """Per-process store, fine for a single worker and for tests"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._slots: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.count, now))
+            allowed, tokens, retry_after = _take_token(tokens, updated, limit, now)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+    def acquire_slot(self, key: str, capacity: int, ttl: float, now: float) -> Optional[str]:
+        with self._lock:
+            holders = {token: expires for token, expires in self._slots.get(key, {}).items() if expires > now}
+            self._slots[key] = holders
+            if len(holders) >= capacity:
+                return None
+            token = uuid.uuid4().hex
+            holders[token] = now + ttl
+            return token
+
+    def reset_after_fork(self):
+        # buckets are per process anyway, only the lock could be held mid fork
+        self._lock = threading.Lock()
+
+    def release_slot(self, key: str, token: str):
+        with self._lock:
+            self._slots.get(key, {}).pop(token, None)
+
+
+class SQLiteStore:
+    """Store shared by every gunicorn worker on the host through a small sqlite file.
+
+    Each check is one short IMMEDIATE transaction, so workers serialise on the
+    write lock for a few microseconds instead of each keeping their own buckets.
+    """
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS slots (token TEXT PRIMARY KEY, key TEXT NOT NULL, expires REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_slots_key ON slots (key, expires)')
+        # buckets idle for a day are full again anyway
+        conn.execute('DELETE FROM buckets WHERE updated < ?', (time.time() - PERIODS['day'],))
+
+    def reset_after_fork(self):
+        # sqlite connections must not cross a fork, the child opens its own
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit mode, transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (limit.count, now)
+            allowed, tokens, retry_after = _take_token(tokens, updated, limit, now)
+            conn.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+    def acquire_slot(self, key: str, capacity: int, ttl: float, now: float) -> Optional[str]:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # slots left behind by a killed worker expire after ttl
+            conn.execute('DELETE FROM slots WHERE key = ? AND expires <= ?', (key, now))
+            (held,) = conn.execute('SELECT COUNT(*) FROM slots WHERE key = ?', (key,)).fetchone()
+            token = None
+            if held < capacity:
+                token = uuid.uuid4().hex
+                conn.execute('INSERT INTO slots (token, key, expires) VALUES (?, ?, ?)', (token, key, now + ttl))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return token
+
+    def release_slot(self, key: str, token: str):
+        self._connection().execute('DELETE FROM slots WHERE token = ?', (token,))
+
+
+def _take_token(tokens: float, updated: float, limit: Limit, now: float) -> Tuple[bool, float, float]:
+    tokens = min(limit.count, tokens + max(0.0, now - updated) * limit.refill_rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / limit.refill_rate
+
+
+def create_store(config):
+    storage = config['RATELIMIT_STORAGE']
+    if storage == 'memory':
+        return MemoryStore()
+    if storage.startswith('sqlite:///'):
+        return SQLiteStore(storage[len('sqlite:///'):], timeout=config['RATELIMIT_STORE_TIMEOUT'])
+    raise ValueError(f"Unsupported RATELIMIT_STORAGE: {storage}")
+
+
+def rate_limited(per_user: Optional[str] = None, per_route: Optional[str] = None,
+                 concurrency: Optional[int] = None, per_user_concurrency: Optional[int] = None):
+    """Mark an expensive endpoint.
+
+    per_user / per_route are token buckets ("10/minute") and answer 429 when
+    empty. concurrency caps how many requests to the route run at once across
+    all workers and sheds the rest with 503, per_user_concurrency does the same
+    for a single user with 429.
+    """
+    limits = {
+        'per_user': Limit.parse(per_user) if per_user else None,
+        'per_route': Limit.parse(per_route) if per_route else None,
+        'concurrency': concurrency,
+        'per_user_concurrency': per_user_concurrency
+    }
+
+    def decorator(view):
+        view.rate_limits = limits
+        return view
+    return decorator
+
+
+def _client_identity() -> str:
+    # avoid a circular import, routes uses rate_limited
+    from routes import verify_jwt_token
+
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        user_id = verify_jwt_token(auth_header.split(' ')[1])
+        if user_id:
+            return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def _rejected(status: int, message: str, retry_after: float):
+    response = jsonify({'error': message, 'retry_after': round(retry_after, 1)})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.store = None
+        self.default_limit = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.store = create_store(app.config)
+        self.default_limit = Limit.parse(app.config['RATELIMIT_DEFAULT']) if app.config['RATELIMIT_DEFAULT'] else None
+        app.extensions['limiter'] = self
+        app.before_request(self.check_request)
+        app.teardown_request(self.release_request)
+
+    def _guarded(self, fallback, check, *args):
+        # the limiter must never take the API down with it, fail open
+        try:
+            return check(*args)
+        except sqlite3.Error:
+            logger.exception("Rate limit store unavailable, letting the request through")
+            return fallback
+
+    def check_request(self):
+        config = current_app.config
+        if not config['RATELIMIT_ENABLED'] or request.method == 'OPTIONS':
+            return None
+
+        view = current_app.view_functions.get(request.endpoint)
+        limits = getattr(view, 'rate_limits', None)
+        identity = _client_identity()
+        now = time.time()
+
+        buckets = []
+        if self.default_limit:
+            buckets.append((f"bucket:{identity}", self.default_limit))
+        if limits and limits['per_user']:
+            buckets.append((f"bucket:{request.endpoint}:{identity}", limits['per_user']))
+        if limits and limits['per_route']:
+            buckets.append((f"bucket:{request.endpoint}", limits['per_route']))
+
+        for key, limit in buckets:
+            allowed, retry_after = self._guarded((True, 0.0), self.store.consume, key, limit, now)
+            if not allowed:
+                return _rejected(429, 'Too many requests', retry_after)
+
+        if not limits:
+            return None
+
+        # concurrency caps, user first so one user can't hold every route slot
+        g.rate_limit_slots = []
+        ttl = config['RATELIMIT_SLOT_TTL']
+        slots = []
+        if limits['per_user_concurrency']:
+            slots.append((f"slots:{request.endpoint}:{identity}", limits['per_user_concurrency'], 429,
+                          'Too many requests in progress'))
+        if limits['concurrency']:
+            slots.append((f"slots:{request.endpoint}", limits['concurrency'], 503,
+                          'Server busy, try again shortly'))
+
+        for key, capacity, status, message in slots:
+            token = self._guarded(_FAIL_OPEN, self.store.acquire_slot, key, capacity, ttl, now)
+            if token is None:
+                self.release_request()
+                return _rejected(status, message, 1)
+            if token is not _FAIL_OPEN:
+                g.rate_limit_slots.append((key, token))
+        return None
+
+    def release_request(self, exc=None):
+        for key, token in g.pop('rate_limit_slots', []):
+            self._guarded(None, self.store.release_slot, key, token)
+
+
+def init_rate_limiting(app):
+    return RateLimiter(app)
@@ -0,0 +1,246 @@
+"""
+Reconcile every user's XP, level and achievements with the current rules,
+for after a rule or XP change.
+
+    flask recompute --workers 8
+    flask recompute --resume
+
+Users are split into id ranges that a process pool works through. Each
+batch of users is loaded with a handful of queries, evaluated in Python and
+written back with executemany updates and inserts, in the same transaction
+as the range's checkpoint, so an interrupted run resumes where it stopped.
+
+XP is what the rules give for the current state: calculate_xp() of every
+application plus the rewards of the achievements the user qualifies for.
+Streak achievements read user_streak, run `flask rebuild-streaks` first if
+it was never built.
+"""
+
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+from types import SimpleNamespace
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import click
+from flask.cli import with_appcontext
+from database import db, upsert
+from models import Achievement, Application, RecomputeRange, User, UserStreak, calculate_xp, get_level
+from achievements.achievements_utils import ACHIEVEMENTS, AchievementDefinition, achievement_index
+
+RECOMPUTE_BATCH_SIZE = 500
+RECOMPUTE_RANGE_SIZE = 5000
+
+
+class RuleApplication(NamedTuple):
+    # the fields achievement conditions look at
+    status: str
+    company: str
+
+
+def evaluate_rules(applications: Sequence, longest_streak: int) -> Tuple[int, List[AchievementDefinition]]:
+    """XP and earned achievements for a user with these applications. An
+    achievement's reward can unlock another (Level 5, 1000 XP), so rules are
+    evaluated until nothing new is earned"""
+    xp = sum(calculate_xp(app.status) for app in applications)
+    user = SimpleNamespace(applications=applications, streak=SimpleNamespace(longest=longest_streak),
+                           xp=xp, level=get_level(xp))
+    earned = []
+    remaining = list(ACHIEVEMENTS)
+    while True:
+        unlocked = [achievement_def for achievement_def in remaining if achievement_def.condition(user)]
+        if not unlocked:
+            return user.xp, earned
+        for achievement_def in unlocked:
+            earned.append(achievement_def)
+            remaining.remove(achievement_def)
+            user.xp += achievement_def.xp_reward
+        user.level = get_level(user.xp)
+
+
+def _recompute_batch(user_ids: List[int]) -> Dict:
+    users = db.session.execute(db.select(User.id, User.xp, User.level).where(User.id.in_(user_ids))).all()
+    applications = defaultdict(list)
+    for user_id, status, company in db.session.execute(
+        db.select(Application.user_id, Application.status, Application.company).where(Application.user_id.in_(user_ids))
+    ):
+        applications[user_id].append(RuleApplication(status, company))
+    streaks = dict(db.session.execute(
+        db.select(UserStreak.user_id, UserStreak.longest).where(UserStreak.user_id.in_(user_ids))
+    ).all())
+    held = defaultdict(dict)
+    for achievement_id, user_id, name in db.session.execute(
+        db.select(Achievement.id, Achievement.user_id, Achievement.name).where(Achievement.user_id.in_(user_ids))
+    ):
+        held[user_id].setdefault(name, []).append(achievement_id)
+
+    definitions = achievement_index()
+    now = datetime.utcnow()
+    user_updates, awarded, revoked = [], [], []
+    for user_id, old_xp, old_level in users:
+        xp, earned = evaluate_rules(applications[user_id], streaks.get(user_id, 0))
+        level = get_level(xp)
+        if (xp, level) != (old_xp, old_level):
+            user_updates.append({'id': user_id, 'xp': xp, 'level': level})
+
+        earned_names = {achievement_def.name for achievement_def in earned}
+        awarded += [
+            {'name': achievement_def.name, 'description': achievement_def.description, 'icon': achievement_def.icon,
+             'condition_met': True, 'created_at': now, 'user_id': user_id}
+            for achievement_def in earned if achievement_def.name not in held[user_id]
+        ]
+        for name, achievement_ids in held[user_id].items():
+            if name not in definitions:
+                continue  # retired achievements are left alone, like check_and_revoke_achievements does
+            # ones the user no longer qualifies for, and extra copies of ones they do
+            revoked += achievement_ids if name not in earned_names else achievement_ids[1:]
+
+    if user_updates:
+        db.session.execute(db.update(User), user_updates)
+    if awarded:
+        db.session.execute(db.insert(Achievement), awarded)
+    if revoked:
+        db.session.execute(db.delete(Achievement).where(Achievement.id.in_(revoked)).execution_options(synchronize_session=False))
+    return {'users': len(users), 'xp_changed': len(user_updates), 'awarded': len(awarded), 'revoked': len(revoked)}
+
+
+def recompute_range(run_id: str, start_id: int, end_id: int, batch_size: int = RECOMPUTE_BATCH_SIZE) -> Dict:
+    """Recompute users with start_id <= id < end_id from the range's
+    checkpoint on, one transaction per batch"""
+    totals = {'users': 0, 'xp_changed': 0, 'awarded': 0, 'revoked': 0}
+    last_id = db.session.scalar(db.select(RecomputeRange.last_id).where(
+        RecomputeRange.run_id == run_id, RecomputeRange.start_id == start_id
+    ))
+    last_id = start_id - 1 if last_id is None else last_id
+
+    while True:
+        user_ids = db.session.scalars(
+            db.select(User.id).where(User.id > last_id, User.id < end_id).order_by(User.id).limit(batch_size)
+        ).all()
+        done = len(user_ids) < batch_size
+        counts = _recompute_batch(user_ids) if user_ids else {}
+        for key, value in counts.items():
+            totals[key] += value
+        last_id = user_ids[-1] if user_ids else last_id
+        upsert(
+            RecomputeRange,
+            [{'run_id': run_id, 'start_id': start_id, 'end_id': end_id, 'last_id': last_id,
+              'finished_at': datetime.utcnow() if done else None}],
+            ['run_id', 'start_id'],
+            lambda excluded: {'last_id': excluded.last_id, 'finished_at': excluded.finished_at}
+        )
+        db.session.commit()
+        if done:
+            return totals
+
+
+def plan_run(range_size: int = RECOMPUTE_RANGE_SIZE) -> str:
+    """Split the user ids into ranges for a new run, returns the run id"""
+    run_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    low, high = db.session.execute(db.select(db.func.min(User.id), db.func.max(User.id))).one()
+    ranges = []
+    if low is not None:
+        ranges = [{'run_id': run_id, 'start_id': start, 'end_id': start + range_size}
+                  for start in range(low, high + 1, range_size)]
+    if ranges:
+        db.session.execute(db.insert(RecomputeRange), ranges)
+    db.session.commit()
+    return run_id
+
+
+def latest_unfinished_run() -> Optional[str]:
+    return db.session.scalar(
+        db.select(RecomputeRange.run_id).where(RecomputeRange.finished_at.is_(None))
+        .order_by(RecomputeRange.run_id.desc()).limit(1)
+    )
+
+
+def pending_ranges(run_id: str) -> List[Tuple[int, int]]:
+    return db.session.execute(
+        db.select(RecomputeRange.start_id, RecomputeRange.end_id)
+        .where(RecomputeRange.run_id == run_id, RecomputeRange.finished_at.is_(None))
+        .order_by(RecomputeRange.start_id)
+    ).all()
+
+
+_worker_context = None
+
+
+def _init_worker(workers: int):
+    # a fresh app per process. WEB_CONCURRENCY sizes the postgres pool so all
+    # workers together stay inside DB_MAX_CONNECTIONS, see engine_profiles.py
+    global _worker_context
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    os.environ['GUNICORN_THREADS'] = '1'
+    from app import app
+    _worker_context = app.app_context()
+    _worker_context.push()
+
+
+def _run_range(args) -> Tuple[int, Dict]:
+    run_id, start_id, end_id, batch_size = args
+    try:
+        return start_id, recompute_range(run_id, start_id, end_id, batch_size)
+    finally:
+        db.session.remove()
+
+
+def default_workers() -> int:
+    # sqlite takes one writer at a time, more processes only wait on its lock
+    if db.engine.dialect.name == 'sqlite':
+        return 1
+    return os.cpu_count() or 1
+
+
+def run_recompute(run_id: str, workers: int, batch_size: int = RECOMPUTE_BATCH_SIZE, on_range=None) -> Dict:
+    """Work through a run's unfinished ranges, in this process or a pool of `workers`"""
+    totals = {'users': 0, 'xp_changed': 0, 'awarded': 0, 'revoked': 0}
+    tasks = [(run_id, start_id, end_id, batch_size) for start_id, end_id in pending_ranges(run_id)]
+
+    def add(start_id, counts):
+        for key, value in counts.items():
+            totals[key] += value
+        if on_range:
+            on_range(start_id, counts)
+
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            add(*_run_range(task))
+        return totals
+
+    # spawn, a forked child would share the parent's open connections
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=get_context('spawn'),
+                             initializer=_init_worker, initargs=(workers,)) as pool:
+        for future in as_completed([pool.submit(_run_range, task) for task in tasks]):
+            add(*future.result())
+    return totals
+
+
+@click.command('recompute')
+@click.option('--workers', type=int, default=None, help='Processes, defaults to the CPU count (1 on sqlite)')
+@click.option('--batch-size', default=RECOMPUTE_BATCH_SIZE, help='Users per transaction')
+@click.option('--range-size', default=RECOMPUTE_RANGE_SIZE, help='User ids per unit of work')
+@click.option('--resume', is_flag=True, help='Continue the latest unfinished run instead of starting over')
+@with_appcontext
+def recompute_command(workers, batch_size, range_size, resume):
+    """Recompute every user's XP, level and achievements from the current rules"""
+    run_id = latest_unfinished_run() if resume else None
+    if resume and run_id is None:
+        click.echo("No unfinished run to resume")
+        return
+    run_id = run_id or plan_run(range_size)
+    workers = workers or default_workers()
+    remaining = len(pending_ranges(run_id))
+    click.echo(f"Run {run_id}: {remaining} ranges on {workers} worker(s)")
+
+    started = time.monotonic()
+    totals = run_recompute(run_id, workers, batch_size,
+                           on_range=lambda start_id, counts: click.echo(f"  ids from {start_id}: {counts['users']} users"))
+    click.echo(f"Recomputed {totals['users']} users in {time.monotonic() - started:.1f}s: "
+               f"{totals['xp_changed']} XP changes, {totals['awarded']} achievements awarded, {totals['revoked']} revoked")
+
+
+def init_recompute(app):
+    app.cli.add_command(recompute_command)
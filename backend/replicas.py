@@ -0,0 +1,202 @@
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# seconds behind the primary, measured on the replica itself
+LAG_QUERIES = {
+    'postgresql': (
+        "SELECT CASE WHEN pg_is_in_recovery() "
+        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+    ),
+    # sqlite replicas are file copies (litestream etc), lag can't be measured from sql
+    'sqlite': "SELECT 0"
+}
+
+
+class RoutingSession(Session):
+    """Sends reads made while serving a read-only request to a replica.
+
+    Everything else goes to the primary: flushes, INSERT/UPDATE/DELETE,
+    SELECT ... FOR UPDATE, and every query after this session has written
+    something, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._wants_replica(clause):
+            engine = self._request_replica()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _request_replica(self):
+        # picked once per request: replicas lag by different amounts, reading a
+        # count from one and the rows from another could disagree
+        router = current_app.extensions.get('replica_router')
+        if router is None:
+            return None
+        if 'replica' not in self.info:
+            self.info['replica'] = router.pick()
+        engine = self.info['replica']
+        if engine is not None and not router.is_healthy(engine):
+            # went down mid request, the rest of it reads from the primary
+            engine = self.info['replica'] = None
+        return engine
+
+    def _wants_replica(self, clause) -> bool:
+        if not has_request_context() or not g.get('db_read_only'):
+            return False
+        if self._flushing or self.info.get('wrote') or self.new or self.dirty or self.deleted:
+            self.info['wrote'] = True
+            return False
+        if clause is not None and (getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None):
+            self.info['wrote'] = True
+            return False
+        return True
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = 0.0
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, replicas: List[Replica], max_lag: float, check_interval: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._recent_writers: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def measure_lag(self, replica: Replica) -> float:
+        query = LAG_QUERIES.get(replica.engine.dialect.name, "SELECT 0")
+        with replica.engine.connect() as conn:
+            return float(conn.execute(text(query)).scalar() or 0)
+
+    def check(self, replica: Replica, now: float):
+        try:
+            replica.lag = self.measure_lag(replica)
+            replica.healthy = replica.lag <= self.max_lag
+            if not replica.healthy:
+                logger.warning("Replica %s is %.1fs behind, reading from the primary", replica.name, replica.lag)
+        except DBAPIError:
+            logger.warning("Replica %s is unreachable, reading from the primary", replica.name, exc_info=True)
+            replica.healthy = False
+        replica.checked_at = now
+
+    def pick(self, now: Optional[float] = None):
+        """Next healthy replica engine round robin, None means use the primary"""
+        if self._cycle is None:
+            return None
+        now = now or time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = next(self._cycle)
+            if now - replica.checked_at >= self.check_interval:
+                self.check(replica, now)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def is_healthy(self, engine) -> bool:
+        return any(replica.engine is engine and replica.healthy for replica in self.replicas)
+
+    def mark_down(self, engine):
+        for replica in self.replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+
+    # read-your-writes across requests. A client that just wrote reads from the
+    # primary until the replicas have had max_lag seconds to catch up.
+    # Kept per worker, so a write followed by a read on another worker can still
+    # see max_lag old data, which is the staleness we accept anyway
+    def note_write(self, client: str, now: Optional[float] = None):
+        now = now or time.monotonic()
+        with self._lock:
+            self._recent_writers[client] = now + self.max_lag
+            if len(self._recent_writers) > 10000:
+                self._recent_writers = {k: v for k, v in self._recent_writers.items() if v > now}
+
+    def recently_wrote(self, client: str, now: Optional[float] = None) -> bool:
+        return self._recent_writers.get(client, 0) > (now or time.monotonic())
+
+    def stats(self) -> List[Dict]:
+        return [{'name': r.name, 'healthy': r.healthy, 'lag_seconds': round(r.lag, 2)} for r in self.replicas]
+
+
+def use_primary(view):
+    """Mark a GET endpoint that must read from the primary"""
+    view.use_primary = True
+    return view
+
+
+def _client_key() -> str:
+    # only used to stick a client to the primary after a write, no need to verify the token
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header:
+        return hashlib.sha1(auth_header.encode()).hexdigest()
+    return request.remote_addr or ''
+
+
+def configure_replica_binds(app, urls: List[str]):
+    """Register every replica url as a Flask-SQLAlchemy bind so its engine is
+    created, configured and disposed like the primary. Call before db.init_app"""
+    from engine_profiles import normalize_database_url, build_engine_options
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for i, url in enumerate(urls):
+        binds[f"{REPLICA_BIND_PREFIX}{i}"] = {'url': normalize_database_url(url), **build_engine_options(app.config, url)}
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_replicas(app, db):
+    replicas = [
+        Replica(key, engine) for key, engine in db.engines.items()
+        if key and key.startswith(REPLICA_BIND_PREFIX)
+    ]
+    router = ReplicaRouter(replicas, app.config['DB_REPLICA_MAX_LAG_SECONDS'], app.config['DB_REPLICA_CHECK_INTERVAL'])
+    app.extensions['replica_router'] = router
+    if not replicas:
+        return router
+
+    for replica in replicas:
+        def handle_error(context, replica=replica):
+            # a replica that drops connections mid request is skipped until its next check
+            if context.is_disconnect:
+                router.mark_down(replica.engine)
+        event.listen(replica.engine, 'handle_error', handle_error)
+
+    @app.before_request
+    def route_reads():
+        db.session().info.pop('wrote', None)
+        db.session().info.pop('replica', None)
+        view = app.view_functions.get(request.endpoint)
+        g.db_read_only = (
+            request.method in ('GET', 'HEAD')
+            and not getattr(view, 'use_primary', False)
+            and not router.recently_wrote(_client_key())
+        )
+
+    @app.teardown_request
+    def remember_writes(exc=None):
+        db.session().info.pop('replica', None)
+        if db.session().info.get('wrote') or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            router.note_write(_client_key())
+
+    return router
@@ -1,9 +1,25 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context, url_for
 from models import Application, User, Achievement, calculate_xp, get_level, safe_add_xp, safe_subtract_xp, safe_set_xp
 from database import db
 from datetime import datetime, timedelta, timezone
-from achievements.achievements_utils import ACHIEVEMENTS
-from bulk_import import ApplicationImporter, get_import_template
+from achievements.achievements_utils import ACHIEVEMENTS, achievement_index
+from bulk_import import (ApplicationImporter, BulkImportResult, get_import_template, save_error_report, has_error_report,
+                         iter_error_report, hash_upload, hash_applications, find_previous_upload, describe_upload, record_upload)
+from feed import create_offer_post, get_feed_page, FEED_PAGE_SIZE
+from leaderboards import get_window_leaderboard
+from engine_profiles import pool_stats
+from serializers import APPLICATION_SERIALIZER, ACHIEVEMENT_SERIALIZER
+from compression import cache_compressed
+from ratelimit import rate_limited
+from dashboard import load_dashboard, status_counts_statement
+from companies import search_companies, SEARCH_LIMIT
+from search import search_applications, SEARCH_PAGE_SIZE
+from analytics import get_user_analytics, ANALYTICS_WEEKS
+from insights import get_company_insights
+from streaks import streak_summary
+from status_history import iter_status_events
+from events import broker, event_stream, Subscription, StreamLimitReached
+from ranking import get_xp_page, get_my_rank, LEADERBOARD_PAGE_SIZE
 import jwt
 
 app_routes = Blueprint('routes', __name__)
@@ -12,6 +28,8 @@ app_routes = Blueprint('routes', __name__)
 def limiter():
     return current_app.extensions['limiter']
 
+STREAM_TOKEN_SCOPE = 'events'
+
 def create_jwt_token(user_id):
     payload = {
         'user_id': user_id,
@@ -20,16 +38,30 @@ def create_jwt_token(user_id):
     }
     return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
 
-def verify_jwt_token(token):
+def verify_jwt_token(token, scope=None):
     """Verify and decode JWT token"""
     try:
         payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        # a stream token only opens /events/stream, and only a stream token may
+        if payload.get('scope') != scope:
+            return None
         return payload['user_id']
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+def create_stream_token(user_id):
+    """Short-lived token for /events/stream?token=. EventSource can't send
+    headers, and a query string ends up in proxy and access logs"""
+    payload = {
+        'user_id': user_id,
+        'scope': STREAM_TOKEN_SCOPE,
+        'exp': datetime.now(timezone.utc) + current_app.config['SSE_TOKEN_EXPIRES'],
+        'iat': datetime.now(timezone.utc)
+    }
+    return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
 def get_current_user():
     """Get current user from JWT token or fallback to mock user"""
     auth_header = request.headers.get('Authorization')
@@ -130,15 +162,16 @@ def check_and_award_achievements(user: User):
     # Achievement definitions as of now
     achievements_to_check = ACHIEVEMENTS
     
+    # names the user already has, one query instead of one per achievement
+    existing_names = set(db.session.scalars(db.select(Achievement.name).where(Achievement.user_id == user.id)))
+    
     # Check each achievement
     for achievement_def in achievements_to_check:
-        # Check if user already has this achievement by name
-        existing = Achievement.query.filter_by(user_id=user.id, name=achievement_def['name']).first()
-        if not existing and achievement_def['condition'](user):
+        if achievement_def.name not in existing_names and achievement_def.condition(user):
             new_achievement = Achievement(
-                name=achievement_def['name'],
-                description=achievement_def['description'],
-                icon=achievement_def['icon'],
+                name=achievement_def.name,
+                description=achievement_def.description,
+                icon=achievement_def.icon,
                 condition_met=True,
                 user_id=user.id
             )
@@ -146,7 +179,7 @@ def check_and_award_achievements(user: User):
             new_achievements.append(new_achievement)
             
             # Award XP for unlocking achievement
-            xp_reward = achievement_def.get('xp_reward', 0)
+            xp_reward = achievement_def.xp_reward
             if xp_reward > 0:
                 safe_add_xp(user, xp_reward)
                 total_xp_gained += xp_reward
@@ -163,12 +196,12 @@ def check_and_revoke_achievements(user: User):
     user_achievements = Achievement.query.filter_by(user_id=user.id).all()
     
     for achievement in user_achievements:
-        achievement_definition = next((achievement_def for achievement_def in ACHIEVEMENTS if achievement_def['name'] == achievement.name), None)
+        achievement_definition = achievement_index().get(achievement.name)
         
-        if achievement_definition and not achievement_definition['condition'](user):
-            xp_reward = achievement_definition.get('xp_reward', 0)
+        if achievement_definition and not achievement_definition.condition(user):
+            xp_reward = achievement_definition.xp_reward
             if xp_reward > 0:
-                safe_subtract_xp(user, xp_reward)
+                safe_subtract_xp(user, xp_reward, earned_at=achievement.created_at)
                 total_xp_lost += xp_reward
             
             db.session.delete(achievement)
@@ -185,21 +218,26 @@ def get_all_apps():
     if not current_user:
         return jsonify({'error': 'User not found'}), 404
         
+    # plain row tuples, no ORM objects for what can be thousands of rows
+    rows = db.session.execute(
+        APPLICATION_SERIALIZER.select().where(Application.user_id == current_user.id).order_by(Application.id)
+    )
     return jsonify({
-        'applications': [
-            {
-                'id': app.id,
-                'company': app.company,
-                'position': app.position,
-                'status': app.status,
-                'applied_date': app.applied_date.isoformat() if app.applied_date else None,
-                'notes': app.notes,
-                'created_at': app.created_at.isoformat()
-            }
-            for app in current_user.applications
-        ]
+        'applications': APPLICATION_SERIALIZER.dump_rows(rows)
     })
 
+@app_routes.route('/applications/search', methods=['GET'])
+@rate_limited(per_user='60/minute')
+def search_apps():
+    # ranked full-text search over position, company and notes, ?q=backend python&page=2
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', SEARCH_PAGE_SIZE, type=int)
+    return jsonify(search_applications(current_user.id, request.args.get('q', ''), page, per_page))
+
 @app_routes.route('/applications', methods=['POST'])
 def add_app():
     current_user = get_current_user()
@@ -234,6 +272,9 @@ def add_app():
     elif new_app.status == 'Offer':
         xp_gained = 50
     
+    if new_app.status == 'Offer':
+        create_offer_post(current_user, new_app.company, new_app.position, xp_gained)
+    
     if xp_gained > 0:
         safe_add_xp(current_user, xp_gained)
         db.session.commit()
@@ -242,15 +283,7 @@ def add_app():
     new_achievements, xp_from_achievements = check_and_award_achievements(current_user)
     
     return jsonify({
-        'application': {
-            'id': new_app.id,
-            'company': new_app.company,
-            'position': new_app.position,
-            'status': new_app.status,
-            'applied_date': new_app.applied_date.isoformat() if new_app.applied_date else None,
-            'notes': new_app.notes,
-            'created_at': new_app.created_at.isoformat()
-        },
+        'application': APPLICATION_SERIALIZER.to_dict(new_app),
         'xp_gained': xp_gained + xp_from_achievements,
         'new_achievements': [{'name': a.name, 'icon': a.icon} for a in new_achievements]
     })
@@ -298,6 +331,9 @@ def update_app(app_id):
             elif data['status'] == 'Offer':
                 xp_gained = 50
             
+            if data['status'] == 'Offer':
+                create_offer_post(current_user, app.company, app.position, xp_gained)
+            
             if xp_gained > 0:
                 safe_add_xp(current_user, xp_gained)
                 db.session.commit()
@@ -309,15 +345,7 @@ def update_app(app_id):
     revoked_achievements, xp_lost = check_and_revoke_achievements(current_user)
     
     return jsonify({
-        'application': {
-            'id': app.id,
-            'company': app.company,
-            'position': app.position,
-            'status': app.status,
-            'applied_date': app.applied_date.isoformat() if app.applied_date else None,
-            'notes': app.notes,
-            'created_at': app.created_at.isoformat()
-        },
+        'application': APPLICATION_SERIALIZER.to_dict(app),
         'xp_gained': xp_gained + xp_from_achievements - xp_lost,
         'new_achievements': [{'name': a.name, 'icon': a.icon} for a in new_achievements],
         'revoked_achievements': [{'name': a.name, 'icon': a.icon} for a in revoked_achievements],
@@ -340,8 +368,8 @@ def delete_app(app_id):
     # Delete the application
     db.session.delete(app)
     
-    # Subtract XP from user's total
-    safe_subtract_xp(current_user, xp_to_subtract)
+    # Subtract XP from user's total, and from the windows it was earned in
+    safe_subtract_xp(current_user, xp_to_subtract, earned_at=app.created_at)
     
     db.session.commit()
     
@@ -363,10 +391,11 @@ def get_user_profile():
     if not current_user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Calculate stats
-    total_applications = len(current_user.applications)
-    interviews = len([app for app in current_user.applications if app.status == 'Interviewing'])
-    offers = len([app for app in current_user.applications if app.status == 'Offer'])
+    # Calculate stats, counted by the database instead of loading every application
+    status_counts = dict(db.session.execute(status_counts_statement(current_user.id)).all())
+    total_applications = sum(status_counts.values())
+    interviews = status_counts.get('Interviewing', 0)
+    offers = status_counts.get('Offer', 0)
     
     interview_rate = (interviews / total_applications * 100) if total_applications > 0 else 0
     offer_rate = (offers / total_applications * 100) if total_applications > 0 else 0
@@ -387,10 +416,102 @@ def get_user_profile():
             'offers': offers,
             'interview_rate': round(interview_rate, 1),
             'offer_rate': round(offer_rate, 1)
-        }
+        },
+        'streak': streak_summary(current_user.streak)
     })
 
+@app_routes.route('/user/analytics', methods=['GET'])
+def get_user_analytics_route():
+    # weekly volume, status funnel and conversion rates, ?weeks=26
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    weeks = request.args.get('weeks', ANALYTICS_WEEKS, type=int)
+    return jsonify(get_user_analytics(current_user.id, weeks))
+
+@app_routes.route('/user/status-history', methods=['GET'])
+def get_status_history():
+    # every status change oldest first, streamed as one JSON object per line. ?since=2025-09-01
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    since = None
+    if request.args.get('since'):
+        try:
+            since = datetime.fromisoformat(request.args['since'])
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO date'}), 400
+    
+    events = iter_status_events(current_user.id, since)
+    lines = (current_app.json.dumps(event) + '\n' for event in events)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@app_routes.route('/events/token', methods=['POST'])
+def get_stream_token():
+    # EventSource can't send headers, it gets one of these for ?token= instead.
+    # EventSource reconnects with the same url every SSE_MAX_STREAM_SECONDS,
+    # the token is good for SSE_TOKEN_EXPIRES of that. Once it expired the
+    # stream answers 401, EventSource gives up, and the client opens a new
+    # one with a new token
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify({
+        'token': create_stream_token(current_user.id),
+        'expires_in': int(current_app.config['SSE_TOKEN_EXPIRES'].total_seconds())
+    })
+
+@app_routes.route('/events/stream', methods=['GET'])
+def stream_events():
+    # server-sent events: xp, achievement, achievement_revoked, leaderboard and resync.
+    # ?token= takes a stream token from /events/token, never the session token
+    token = request.args.get('token')
+    if token:
+        user_id = verify_jwt_token(token, scope=STREAM_TOKEN_SCOPE)
+        if user_id is None:
+            # never fall back to another user's stream
+            return jsonify({'error': 'Invalid or expired stream token'}), 401
+        current_user = db.session.get(User, user_id)
+    else:
+        current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    config = current_app.config
+    try:
+        subscription = broker.add(
+            Subscription(current_user.id, config['SSE_QUEUE_SIZE']),
+            config['SSE_MAX_STREAMS_PER_USER'],
+            config['SSE_MAX_STREAMS']
+        )
+    except StreamLimitReached:
+        response = jsonify({'error': 'Too many open event streams'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    # no stream_with_context, the body needs nothing from the request and the
+    # database session goes back to the pool as soon as this returns
+    body = event_stream(subscription, current_app.json.dumps, config['SSE_HEARTBEAT_SECONDS'], config['SSE_MAX_STREAM_SECONDS'])
+    response = Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # the generator's finally only runs once it was started, a client that
+    # disconnects before the first chunk would keep its slot forever
+    response.call_on_close(lambda: broker.remove(subscription))
+    return response
+
+@app_routes.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    # profile, stats, achievements and the first page of applications in one call.
+    # asgi.py serves this same path natively and runs the reads concurrently
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify(load_dashboard(current_user))
+
 @app_routes.route('/achievements/check', methods=['POST'])
+@rate_limited(per_user='30/minute', per_user_concurrency=1)
 def check_achievements():
     """Manually check and award achievements for current user"""
     current_user = get_current_user()
@@ -401,13 +522,14 @@ def check_achievements():
     new_achievements, xp_gained = check_and_award_achievements(current_user)
     
     return jsonify({
-        'new_achievements': [{'name': a.name, 'icon': a.icon, 'xp_reward': ACHIEVEMENTS[next(i for i, ach in enumerate(ACHIEVEMENTS) if ach['name'] == a.name)]['xp_reward']} for a in new_achievements],
+        'new_achievements': [{'name': a.name, 'icon': a.icon, 'xp_reward': achievement_index()[a.name].xp_reward} for a in new_achievements],
         'xp_gained': xp_gained,
         'total_xp': current_user.xp,
         'level': current_user.level
     })
 
 @app_routes.route('/achievements/revoke', methods=['POST'])
+@rate_limited(per_user='30/minute', per_user_concurrency=1)
 def revoke_achievements():
     # remove achievements for current user
     current_user = get_current_user()
@@ -418,33 +540,33 @@ def revoke_achievements():
     revoked_achievements, xp_lost = check_and_revoke_achievements(current_user)
     
     return jsonify({
-        'revoked_achievements': [{'name': a.name, 'icon': a.icon, 'xp_reward': ACHIEVEMENTS[next(i for i, ach in enumerate(ACHIEVEMENTS) if ach['name'] == a.name)]['xp_reward']} for a in revoked_achievements],
+        'revoked_achievements': [{'name': a.name, 'icon': a.icon, 'xp_reward': achievement_index()[a.name].xp_reward} for a in revoked_achievements],
         'xp_lost': xp_lost,
         'total_xp': current_user.xp,
         'level': current_user.level
     })
 
 @app_routes.route('/leaderboard', methods=['GET'])
+@cache_compressed
 def get_leaderboard():
-    # get leaderboard data
+    # get leaderboard data, ?window=week|month|cycle ranks xp earned in the current window only
+    window = request.args.get('window', 'all')
+    if window != 'all':
+        try:
+            leaderboard = get_window_leaderboard(window, request.args.get('key'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        leaderboard['last_updated'] = datetime.now(timezone.utc).isoformat()
+        return jsonify(leaderboard)
+    
     try:
-        xp_leaderboard = User.query.order_by(User.xp.desc()).limit(25).all()
+        # ?offset=&limit= pages through the xp board, the achievements board stays top 25
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', LEADERBOARD_PAGE_SIZE, type=int)
+        xp_page = get_xp_page(offset, limit)
         
         achievements_leaderboard = db.session.query(User, db.func.count(Achievement.id).label('achievement_count')).join(Achievement, User.id == Achievement.user_id).group_by(User.id).order_by(db.func.count(Achievement.id).desc()).limit(25).all()
         
-        # format XP leaderboard
-        xp_rankings = []
-        for i, user in enumerate(xp_leaderboard, 1):
-            xp_rankings.append({
-                'rank': i,
-                'user_id': user.id,
-                'name': user.name,
-                'profile_picture': user.profile_picture,
-                'xp': user.xp,
-                'level': user.level,
-                'achievement_count': len(user.achievements)
-            })
-        
         # Format achievements leaderboard
         achievement_rankings = []
         for i, (user, achievement_count) in enumerate(achievements_leaderboard, 1):
@@ -459,7 +581,7 @@ def get_leaderboard():
             })
         
         return jsonify({
-            'xp_leaderboard': xp_rankings,
+            **xp_page,
             'achievements_leaderboard': achievement_rankings,
             'last_updated': datetime.now(timezone.utc).isoformat()
         })
@@ -468,6 +590,41 @@ def get_leaderboard():
         print(f"Leaderboard error: {e}")
         return jsonify({'error': 'Failed to fetch leaderboard'}), 500
 
+@app_routes.route('/leaderboard/me', methods=['GET'])
+def get_my_leaderboard_rank():
+    # rank, percentile and the users around the current user on the all-time xp board, ?neighbours=2
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    neighbours = request.args.get('neighbours', 2, type=int)
+    return jsonify(get_my_rank(current_user, neighbours))
+
+@app_routes.route('/feed', methods=['GET'])
+@cache_compressed
+def get_feed():
+    # global offer feed, newest first. pass next_cursor back as ?cursor= for older posts
+    try:
+        limit = request.args.get('limit', FEED_PAGE_SIZE, type=int)
+        return jsonify(get_feed_page(request.args.get('cursor'), limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app_routes.route('/companies/search', methods=['GET'])
+def search_companies_route():
+    # autocomplete for the company field, ?q=goo&limit=10
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    return jsonify({'companies': search_companies(query, limit)})
+
+@app_routes.route('/companies/<int:company_id>/insights', methods=['GET'])
+def company_insights(company_id):
+    # application count, interview/offer rates and distinct applicants across all users
+    insights = get_company_insights(company_id)
+    if insights is None:
+        return jsonify({'error': 'Company not found'}), 404
+    return jsonify(insights)
+
 @app_routes.route('/health', methods=['GET'])
 def health_check():
     # health check endpoint for deployment monitoring
@@ -477,31 +634,48 @@ def health_check():
         'timestamp': datetime.now(timezone.utc).isoformat()
     })
 
+@app_routes.route('/health/db', methods=['GET'])
+def database_health_check():
+    # connection pool numbers for the engine profile in use
+    return jsonify({
+        'status': 'healthy',
+        'pool': pool_stats(db.engine),
+        'replicas': current_app.extensions['replica_router'].stats(),
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    })
+
 @app_routes.route('/achievements', methods=['GET'])
 def get_achievements():
     current_user = get_current_user()
     if not current_user:
         return jsonify({'error': 'User not found'}), 404
     
+    rows = db.session.execute(
+        ACHIEVEMENT_SERIALIZER.select().where(Achievement.user_id == current_user.id).order_by(Achievement.id)
+    )
     return jsonify({
-        'achievements': [
-            {
-                'id': achievement.id,
-                'name': achievement.name,
-                'description': achievement.description,
-                'icon': achievement.icon,
-                'condition_met': achievement.condition_met,
-                'created_at': achievement.created_at.isoformat()
-            }
-            for achievement in current_user.achievements
-        ]
+        'achievements': ACHIEVEMENT_SERIALIZER.dump_rows(rows)
     })
 
 @app_routes.route('/applications/bulk-import', methods=['POST'])
+@rate_limited(per_user='10/minute', per_route='120/minute', concurrency=4, per_user_concurrency=1)
 def bulk_import_applications():
+    # ?result=compact keeps the response small for big files: row ranges, errors
+    # grouped by code and a CSV report of every failed row
     current_user = get_current_user()
     if not current_user:
         return jsonify({'error': 'User not found'}), 404
+    compact = request.args.get('result') == 'compact'
+    
+    def already_imported(content_hash):
+        # the same upload again is answered from what the first one recorded
+        previous = find_previous_upload(current_user.id, content_hash)
+        if previous is None:
+            return None
+        empty = BulkImportResult()
+        response_data = empty.to_compact_dict() if compact else empty.to_dict()
+        response_data.update(describe_upload(previous))
+        return jsonify(response_data)
     
     try:
         if 'file' in request.files:
@@ -518,16 +692,20 @@ def bulk_import_applications():
                 return jsonify({'error': 'File too large. Maximum size is 10MB'}), 400
             
             filename = file.filename.lower()
+            if not filename.endswith(('.csv', '.xlsx', '.xls')):
+                return jsonify({'error': 'Unsupported file type. Please use CSV or Excel files'}), 400
+            content_hash = hash_upload(file.stream)
+            response = already_imported(content_hash)
+            if response is not None:
+                return response
             importer = ApplicationImporter(current_user.id)
             
             if filename.endswith('.csv'):
                 csv_content = file.read().decode('utf-8')
                 result = importer.import_from_csv(csv_content)
-            elif filename.endswith(('.xlsx', '.xls')):
+            else:
                 excel_content = file.read()
                 result = importer.import_from_excel(excel_content)
-            else:
-                return jsonify({'error': 'Unsupported file type. Please use CSV or Excel files'}), 400
         elif request.is_json:
             data = request.get_json()
             applications = data.get('applications', [])
@@ -538,6 +716,10 @@ def bulk_import_applications():
             if len(applications) > 1000:
                 return jsonify({'error': 'Too many applications. Maximum is 1000'}), 400
             
+            content_hash = hash_applications(applications)
+            response = already_imported(content_hash)
+            if response is not None:
+                return response
             importer = ApplicationImporter(current_user.id)
             result = importer.import_from_json(applications)
         
@@ -546,6 +728,10 @@ def bulk_import_applications():
         
         # Always commit if there are successful imports
         if result.successful_imports:
+            for imported in result.successful_imports:
+                if imported.status == 'Offer':
+                    create_offer_post(current_user, imported.company, imported.position, imported.xp_gained)
+            
             db.session.commit()
             
             if result.total_xp_gained > 0:
@@ -558,9 +744,16 @@ def bulk_import_applications():
                 result.total_xp_gained += xp_from_achievements
         else:
             db.session.rollback()
+        record_upload(current_user.id, content_hash, result)
         
         # Always return 200 with detailed results
-        response_data = result.to_dict()
+        if compact:
+            response_data = result.to_compact_dict()
+            if result.failed_imports:
+                import_id = save_error_report(current_user.id, result.failed_imports)
+                response_data['error_report'] = url_for('routes.get_import_error_report', import_id=import_id)
+        else:
+            response_data = result.to_dict()
         if result.successful_imports:
             response_data['new_achievements'] = [{'name': a.name, 'icon': a.icon} for a in new_achievements]
         
@@ -570,11 +763,26 @@ def bulk_import_applications():
         db.session.rollback()
         return jsonify({'error': f'Import failed: {str(e)}'}), 500
 
+@app_routes.route('/applications/bulk-import/<import_id>/errors.csv', methods=['GET'])
+def get_import_error_report(import_id):
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'error': 'User not found'}), 404
+    if not has_error_report(current_user.id, import_id):
+        return jsonify({'error': 'Error report not found'}), 404
+    
+    lines = iter_error_report(current_user.id, import_id)
+    return Response(stream_with_context(lines), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename="import-errors-{import_id[:8]}.csv"'
+    })
+
 @app_routes.route('/applications/import-template', methods=['GET'])
+@cache_compressed
 def get_import_template_route():
     return jsonify(get_import_template())
 
 @app_routes.route('/applications/export', methods=['GET'])
+@rate_limited(per_user='20/minute', concurrency=4, per_user_concurrency=2)
 def export_applications():
     current_user = get_current_user()
     if not current_user:
@@ -613,6 +821,7 @@ def export_applications():
         return jsonify({'error': f'Export failed: {str(e)}'}), 500
 
 @app_routes.route('/applications/sample-template', methods=['GET'])
+@cache_compressed
 def get_sample_template():
     try:
         with open('sample_import_template.csv', 'r') as f:
@@ -626,6 +835,7 @@ def get_sample_template():
         return jsonify({'error': f'Failed to load template: {str(e)}'}), 500
 
 @app_routes.route('/applications/clear-all', methods=['DELETE'])
+@rate_limited(per_user='5/minute', per_user_concurrency=1)
 def clear_all_applications():
     """Clear all applications for the current user"""
     current_user = get_current_user()
@@ -636,18 +846,21 @@ def clear_all_applications():
         # Get count before deletion for response
         application_count = len(current_user.applications)
         
-        # Delete all applications
+        # Delete all applications, each one's xp is taken back from the
+        # windows it was earned in
         for app in current_user.applications:
+            safe_subtract_xp(current_user, calculate_xp(app.status), earned_at=app.created_at)
             db.session.delete(app)
         
         db.session.commit()
         
-        safe_set_xp(current_user, 0)
-        db.session.commit()
-        
         # Check for revoked achievements 
         revoked_achievements, xp_lost = check_and_revoke_achievements(current_user)
         
+        # whatever is left isn't accounted for by an application or achievement
+        safe_set_xp(current_user, 0)
+        db.session.commit()
+        
         return jsonify({
             'message': f'Successfully deleted {application_count} applications',
             'deleted_count': application_count,
@@ -0,0 +1,180 @@
+import logging
+import re
+from typing import Dict, List
+from sqlalchemy.exc import DBAPIError
+from database import db, escape_like
+from models import Application
+from serializers import APPLICATION_SERIALIZER
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_TERMS = 8
+
+HIGHLIGHT_START, HIGHLIGHT_END = '<mark>', '</mark>'
+
+# external content FTS5 table over application, triggers keep it in sync with
+# every insert, update and delete (including bulk imports and raw SQL).
+# user_id is indexed too, as one token per row, and every query ANDs it in
+# (see _fts5_query) so the index walks the user's postings instead of every
+# user's matches
+SQLITE_FTS_COLUMNS = "position, notes, company, user_id, content='application', content_rowid='id', tokenize='porter unicode61'"
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS application_fts USING fts5({SQLITE_FTS_COLUMNS})",
+    """CREATE TRIGGER IF NOT EXISTS application_fts_ai AFTER INSERT ON application BEGIN
+        INSERT INTO application_fts(rowid, position, notes, company, user_id)
+        VALUES (new.id, new.position, new.notes, new.company, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS application_fts_ad AFTER DELETE ON application BEGIN
+        INSERT INTO application_fts(application_fts, rowid, position, notes, company, user_id)
+        VALUES ('delete', old.id, old.position, old.notes, old.company, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS application_fts_au AFTER UPDATE OF position, notes, company, user_id ON application BEGIN
+        INSERT INTO application_fts(application_fts, rowid, position, notes, company, user_id)
+        VALUES ('delete', old.id, old.position, old.notes, old.company, old.user_id);
+        INSERT INTO application_fts(rowid, position, notes, company, user_id)
+        VALUES (new.id, new.position, new.notes, new.company, new.user_id);
+    END"""
+]
+
+# tables built with other columns are dropped and rebuilt
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS application_fts_ai",
+    "DROP TRIGGER IF EXISTS application_fts_ad",
+    "DROP TRIGGER IF EXISTS application_fts_au",
+    "DROP TABLE IF EXISTS application_fts"
+]
+
+# generated column, postgres keeps it current on every write. Position weighs
+# most, then company, then notes. The index leads with user_id (btree_gin) so
+# one user's matches are found without scanning everyone's
+POSTGRES_FTS_DDL = [
+    """ALTER TABLE application ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(position, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(company, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(notes, '')), 'C')
+    ) STORED""",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "CREATE INDEX IF NOT EXISTS ix_application_user_search_vector ON application USING gin (user_id, search_vector)",
+    "DROP INDEX IF EXISTS ix_application_search_vector"
+]
+
+# engine -> 'fts5', 'tsvector' or 'like'
+_search_backends = {}
+
+
+def ensure_search_index(engine) -> str:
+    """Create the full-text index for `engine` once per process and return
+    which search backend it supports. Falls back to LIKE when the database
+    has no full-text support (sqlite built without FTS5)."""
+    if engine in _search_backends:
+        return _search_backends[engine]
+
+    backend = 'like'
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == 'sqlite':
+                table_sql = conn.execute(db.text(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'application_fts'"
+                )).scalar()
+                exists = table_sql is not None and SQLITE_FTS_COLUMNS in table_sql
+                if table_sql is not None and not exists:
+                    for statement in SQLITE_FTS_DROP:
+                        conn.execute(db.text(statement))
+                for statement in SQLITE_FTS_DDL:
+                    conn.execute(db.text(statement))
+                if not exists:
+                    # index the rows written before the table existed
+                    conn.execute(db.text("INSERT INTO application_fts(application_fts) VALUES ('rebuild')"))
+                backend = 'fts5'
+            elif engine.dialect.name == 'postgresql':
+                for statement in POSTGRES_FTS_DDL:
+                    conn.execute(db.text(statement))
+                backend = 'tsvector'
+    except DBAPIError:
+        logger.warning("Full-text search is not available, searching with LIKE", exc_info=True)
+
+    _search_backends[engine] = backend
+    return backend
+
+
+def search_terms(query: str) -> List[str]:
+    # words only, so nothing the user types is parsed as query syntax
+    return re.findall(r'\w+', (query or '').casefold())[:MAX_SEARCH_TERMS]
+
+
+def _fts5_query(user_id: int, terms: List[str]) -> str:
+    # every word must match in the text columns, the last one as a prefix since
+    # people search as they type. The user's token narrows it to their rows
+    words = ' '.join(f'"{term}"' for term in terms) + '*'
+    return f'user_id : "{int(user_id)}" AND {{position notes company}} : ({words})'
+
+
+def _tsquery(terms: List[str]) -> str:
+    return ' & '.join(f"{term}:*" for term in terms)
+
+
+def _search_statement(backend: str, user_id: int, terms: List[str]):
+    if backend == 'fts5':
+        fts = db.table('application_fts', db.column('rowid'))
+        # bm25 is lower for better matches, columns are weighted position, notes,
+        # company. user_id matches on every row and doesn't count
+        rank = db.literal_column('bm25(application_fts, 3.0, 1.0, 2.0, 0.0)')
+        snippet = db.literal_column(
+            f"snippet(application_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 12)"
+        )
+        return APPLICATION_SERIALIZER.select().add_columns(rank, snippet).join(
+            fts, fts.c.rowid == Application.id
+        ).where(
+            db.text('application_fts MATCH :match').bindparams(match=_fts5_query(user_id, terms))
+        ).order_by(rank, Application.id)
+
+    if backend == 'tsvector':
+        query = db.func.to_tsquery('english', _tsquery(terms))
+        vector = db.literal_column('application.search_vector')
+        rank = db.func.ts_rank_cd(vector, query)
+        snippet = db.func.ts_headline(
+            'english', db.func.coalesce(Application.notes, Application.position), query,
+            f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxFragments=1, MaxWords=20, MinWords=5'
+        )
+        return APPLICATION_SERIALIZER.select().add_columns(rank, snippet).where(
+            Application.user_id == user_id, vector.op('@@')(query)
+        ).order_by(rank.desc(), Application.id)
+
+    # no index to rank with, every term has to appear somewhere. Terms are
+    # words, which may still hold a _ that LIKE would take as a wildcard
+    conditions = [
+        db.or_(*[column.ilike(f"%{escape_like(term)}%", escape='\\')
+                 for column in (Application.position, Application.notes, Application.company)])
+        for term in terms
+    ]
+    return APPLICATION_SERIALIZER.select().add_columns(db.literal(0), db.null()).where(
+        Application.user_id == user_id, *conditions
+    ).order_by(Application.id)
+
+
+def search_applications(user_id: int, query: str, page: int = 1, per_page: int = SEARCH_PAGE_SIZE) -> Dict:
+    """Ranked full-text search over a user's positions, notes and companies"""
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_SEARCH_PAGE_SIZE))
+    result = {'applications': [], 'page': page, 'per_page': per_page, 'has_more': False}
+
+    terms = search_terms(query)
+    if not terms:
+        return result
+
+    backend = ensure_search_index(db.engine)
+    # one extra row tells us whether there is another page without a COUNT
+    rows = db.session.execute(
+        _search_statement(backend, user_id, terms)
+        .limit(per_page + 1).offset((page - 1) * per_page)
+    ).all()
+
+    result['has_more'] = len(rows) > per_page
+    rows = rows[:per_page]
+    applications = APPLICATION_SERIALIZER.dump_rows(row[:-2] for row in rows)
+    for application, row in zip(applications, rows):
+        application['snippet'] = row[-1]
+    result['applications'] = applications
+    return result
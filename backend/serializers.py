@@ -0,0 +1,95 @@
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, List, Optional
+from flask.json.provider import DefaultJSONProvider
+from database import db
+from models import Application, Achievement
+
+# orjson is optional, everything falls back to the stdlib encoder without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+class ModelSerializer:
+    """Field list and converters for a model, worked out once at import.
+
+    Serialises ORM objects with `to_dict` and plain row tuples (in `columns`
+    order) with `dump_rows`, so list endpoints can skip building ORM objects.
+    """
+
+    def __init__(self, model, fields: List[str], converters: Optional[Dict[str, Callable]] = None):
+        if not fields:
+            raise ValueError("ModelSerializer needs at least one field")
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = tuple(getattr(model, field) for field in fields)
+        getter = attrgetter(*fields)
+        # attrgetter returns the bare value for a single field, rows are always tuples
+        self._getter = getter if len(fields) > 1 else lambda obj: (getter(obj),)
+
+        converters = dict(converters or {})
+        for field, column in zip(self.fields, self.columns):
+            if field not in converters and isinstance(column.type, db.DateTime):
+                converters[field] = _isoformat
+        self._converters = tuple(
+            (index, converters[field]) for index, field in enumerate(self.fields) if field in converters
+        )
+
+    def _from_values(self, values) -> Dict:
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                if values[index] is not None:
+                    values[index] = convert(values[index])
+        return dict(zip(self.fields, values))
+
+    def to_dict(self, obj) -> Dict:
+        return self._from_values(self._getter(obj))
+
+    def dump_rows(self, rows: Iterable) -> List[Dict]:
+        return [self._from_values(row) for row in rows]
+
+    def select(self):
+        return db.select(*self.columns)
+
+
+APPLICATION_SERIALIZER = ModelSerializer(
+    Application, ['id', 'company', 'position', 'status', 'applied_date', 'notes', 'created_at']
+)
+
+ACHIEVEMENT_SERIALIZER = ModelSerializer(
+    Achievement, ['id', 'name', 'description', 'icon', 'condition_met', 'created_at']
+)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson straight to bytes when it's installed"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def _orjson_dumps(self, obj, option: int = 0) -> bytes:
+        # datetimes go through self.default like they do with the stdlib
+        # provider (HTTP dates), so the output doesn't depend on orjson being installed
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | option)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._orjson_dumps(obj, orjson.OPT_INDENT_2 if pretty else 0)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Iterator, List, Optional
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from database import db
+from models import Application, ApplicationStatusEvent
+
+STREAM_BATCH_SIZE = 500
+
+
+def collect_status_events(new, dirty) -> List[dict]:
+    """Event rows for the applications a flush created or moved to another status"""
+    now = datetime.utcnow()
+    rows = []
+    for obj in new:
+        if isinstance(obj, Application):
+            rows.append({
+                'user_id': obj.user_id, 'application_id': obj.id,
+                'from_status': None, 'to_status': obj.status, 'ts': obj.created_at or now
+            })
+    for obj in dirty:
+        if not isinstance(obj, Application):
+            continue
+        history = db.inspect(obj).attrs.status.history
+        if history.deleted and history.added and history.deleted[0] != history.added[0]:
+            rows.append({
+                'user_id': obj.user_id, 'application_id': obj.id,
+                'from_status': history.deleted[0], 'to_status': history.added[0], 'ts': now
+            })
+    return rows
+
+
+# after_flush so new applications have their ids. Every write path (add,
+# update, bulk import) goes through the session, so they all land here
+@event.listens_for(db.session, 'after_flush')
+def _record_status_events(session, flush_context):
+    rows = collect_status_events(session.new, session.dirty)
+    if rows:
+        session.execute(db.insert(ApplicationStatusEvent), rows)
+
+
+def iter_status_events(user_id: int, since: Optional[datetime] = None,
+                       batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+    """A user's status changes oldest first, fetched `batch_size` rows at a
+    time off the (user_id, ts) index instead of loaded all at once"""
+    stmt = db.select(
+        ApplicationStatusEvent.id,
+        ApplicationStatusEvent.application_id,
+        ApplicationStatusEvent.from_status,
+        ApplicationStatusEvent.to_status,
+        ApplicationStatusEvent.ts
+    ).where(ApplicationStatusEvent.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(ApplicationStatusEvent.ts >= since)
+    stmt = stmt.order_by(ApplicationStatusEvent.ts, ApplicationStatusEvent.id)
+
+    for event_id, application_id, from_status, to_status, ts in db.session.execute(
+        stmt.execution_options(yield_per=batch_size)
+    ):
+        yield {
+            'id': event_id,
+            'application_id': application_id,
+            'from_status': from_status,
+            'to_status': to_status,
+            'ts': ts.isoformat()
+        }
+
+
+def backfill_status_events() -> int:
+    """One creation event for every application saved before the event log
+    existed, stamped with its created_at"""
+    has_events = db.select(ApplicationStatusEvent.id).where(ApplicationStatusEvent.application_id == Application.id).exists()
+    result = db.session.execute(
+        db.insert(ApplicationStatusEvent).from_select(
+            ['user_id', 'application_id', 'from_status', 'to_status', 'ts'],
+            db.select(
+                Application.user_id, Application.id, db.null(), Application.status,
+                db.func.coalesce(Application.created_at, db.func.current_timestamp())
+            ).where(~has_events)
+        )
+    )
+    db.session.commit()
+    return result.rowcount or 0
+
+
+@click.command('backfill-status-events')
+@with_appcontext
+def backfill_status_events_command():
+    """Start the status history of existing applications"""
+    click.echo(f"Recorded {backfill_status_events()} status events")
+
+
+def init_status_history(app):
+    app.cli.add_command(backfill_status_events_command)
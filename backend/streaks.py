@@ -0,0 +1,239 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from database import db, upsert, as_date
+from models import Application, ActivityDay, ActivityStreak, UserStreak, User, value_before_flush
+
+ONE_DAY = timedelta(days=1)
+REBUILD_BATCH_SIZE = 200
+
+
+def activity_day(applied_date: Optional[datetime], created_at: Optional[datetime]) -> Optional[date]:
+    # the day the user says they applied, or the day they logged it
+    when = applied_date or created_at
+    return when.date() if when else None
+
+
+def longest_run(days: Iterable[date]) -> int:
+    longest = run = 0
+    previous = None
+    for day in sorted(set(days)):
+        run = run + 1 if previous is not None and previous + ONE_DAY == day else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
+
+
+def collect_day_deltas(new: Iterable, dirty: Iterable, deleted: Iterable) -> Dict:
+    """(user_id, day) -> change in that day's application count for a flush"""
+    deltas = defaultdict(int)
+
+    def add(sign, user_id, applied_date, created_at):
+        day = activity_day(applied_date, created_at)
+        if user_id is not None and day is not None:
+            deltas[(user_id, day)] += sign
+
+    for obj in new:
+        if isinstance(obj, Application):
+            add(1, obj.user_id, obj.applied_date, obj.created_at)
+    for obj in deleted:
+        if isinstance(obj, Application):
+            add(-1, value_before_flush(obj, 'user_id'), value_before_flush(obj, 'applied_date'), value_before_flush(obj, 'created_at'))
+    for obj in dirty:
+        if not isinstance(obj, Application):
+            continue
+        attrs = db.inspect(obj).attrs
+        if attrs.applied_date.history.has_changes() or attrs.user_id.history.has_changes():
+            add(-1, value_before_flush(obj, 'user_id'), value_before_flush(obj, 'applied_date'), value_before_flush(obj, 'created_at'))
+            add(1, obj.user_id, obj.applied_date, obj.created_at)
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def _add_day(session, user_id: int, day: date):
+    # join the runs ending the day before and starting the day after, two index lookups
+    left = session.execute(db.select(ActivityStreak.id, ActivityStreak.start_day, ActivityStreak.days).where(
+        ActivityStreak.user_id == user_id, ActivityStreak.end_day == day - ONE_DAY
+    )).first()
+    right = session.execute(db.select(ActivityStreak.id, ActivityStreak.end_day, ActivityStreak.days).where(
+        ActivityStreak.user_id == user_id, ActivityStreak.start_day == day + ONE_DAY
+    )).first()
+
+    if left and right:
+        session.execute(db.delete(ActivityStreak).where(ActivityStreak.id == right.id)
+                        .execution_options(synchronize_session=False))
+        session.execute(db.update(ActivityStreak).where(ActivityStreak.id == left.id)
+                        .values(end_day=right.end_day, days=left.days + 1 + right.days)
+                        .execution_options(synchronize_session=False))
+    elif left:
+        session.execute(db.update(ActivityStreak).where(ActivityStreak.id == left.id)
+                        .values(end_day=day, days=left.days + 1).execution_options(synchronize_session=False))
+    elif right:
+        session.execute(db.update(ActivityStreak).where(ActivityStreak.id == right.id)
+                        .values(start_day=day, days=right.days + 1).execution_options(synchronize_session=False))
+    else:
+        session.execute(db.insert(ActivityStreak).values(user_id=user_id, start_day=day, end_day=day, days=1))
+
+
+def _remove_day(session, user_id: int, day: date):
+    # the run holding `day` is the first one ending on or after it
+    run = session.execute(
+        db.select(ActivityStreak.id, ActivityStreak.start_day, ActivityStreak.end_day).where(
+            ActivityStreak.user_id == user_id, ActivityStreak.end_day >= day
+        ).order_by(ActivityStreak.end_day).limit(1)
+    ).first()
+    if run is None or run.start_day > day:
+        return
+
+    update = db.update(ActivityStreak).where(ActivityStreak.id == run.id).execution_options(synchronize_session=False)
+    if run.start_day == run.end_day:
+        session.execute(db.delete(ActivityStreak).where(ActivityStreak.id == run.id)
+                        .execution_options(synchronize_session=False))
+    elif day == run.start_day:
+        session.execute(update.values(start_day=day + ONE_DAY, days=(run.end_day - day).days))
+    elif day == run.end_day:
+        session.execute(update.values(end_day=day - ONE_DAY, days=(day - run.start_day).days))
+    else:
+        # split in two
+        session.execute(update.values(end_day=day - ONE_DAY, days=(day - run.start_day).days))
+        session.execute(db.insert(ActivityStreak).values(
+            user_id=user_id, start_day=day + ONE_DAY, end_day=run.end_day, days=(run.end_day - day).days
+        ))
+
+
+def _refresh_user_streaks(session, user_ids: Iterable[int]):
+    rows = []
+    for user_id in user_ids:
+        latest = session.execute(
+            db.select(ActivityStreak.days, ActivityStreak.end_day).where(ActivityStreak.user_id == user_id)
+            .order_by(ActivityStreak.end_day.desc()).limit(1)
+        ).first()
+        longest = session.scalar(db.select(db.func.max(ActivityStreak.days)).where(ActivityStreak.user_id == user_id))
+        rows.append({
+            'user_id': user_id,
+            'current': latest.days if latest else 0,
+            'longest': longest or 0,
+            'last_day': latest.end_day if latest else None
+        })
+    upsert(UserStreak, rows, ['user_id'], lambda excluded: {
+        'current': excluded.current, 'longest': excluded.longest, 'last_day': excluded.last_day
+    })
+
+
+def apply_day_deltas(session, deltas: Dict):
+    if not deltas:
+        return
+
+    # a day only joins or leaves a run when its count goes between zero and non-zero
+    keys = list(deltas)
+    current = dict(
+        ((user_id, day), applications) for user_id, day, applications in session.execute(
+            db.select(ActivityDay.user_id, ActivityDay.day, ActivityDay.applications)
+            .where(db.tuple_(ActivityDay.user_id, ActivityDay.day).in_(keys))
+        )
+    )
+    upsert(
+        ActivityDay,
+        [{'user_id': user_id, 'day': day, 'applications': delta} for (user_id, day), delta in deltas.items()],
+        ['user_id', 'day'],
+        lambda excluded: {'applications': ActivityDay.applications + excluded.applications}
+    )
+    session.execute(db.delete(ActivityDay).where(
+        db.tuple_(ActivityDay.user_id, ActivityDay.day).in_(keys), ActivityDay.applications <= 0
+    ).execution_options(synchronize_session=False))
+
+    changed_users = set()
+    for (user_id, day), delta in sorted(deltas.items()):
+        before = current.get((user_id, day), 0)
+        if before <= 0 < before + delta:
+            _add_day(session, user_id, day)
+            changed_users.add(user_id)
+        elif before > 0 >= before + delta:
+            _remove_day(session, user_id, day)
+            changed_users.add(user_id)
+    _refresh_user_streaks(session, sorted(changed_users))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_streaks(session, flush_context):
+    apply_day_deltas(session, collect_day_deltas(session.new, session.dirty, session.deleted))
+
+
+def streak_summary(streak: Optional[UserStreak], today: Optional[date] = None) -> Dict:
+    """Profile view of a user's streak. The current streak is still alive if
+    its last day was today or yesterday, since today isn't over yet"""
+    today = today or datetime.utcnow().date()
+    if streak is None or streak.last_day is None:
+        return {'current': 0, 'longest': 0, 'last_active_day': None}
+    alive = streak.last_day >= today - ONE_DAY
+    return {
+        'current': streak.current if alive else 0,
+        'longest': streak.longest,
+        'last_active_day': streak.last_day.isoformat()
+    }
+
+
+def _rebuild_users(user_ids: List[int]):
+    for model in (ActivityDay, ActivityStreak, UserStreak):
+        db.session.execute(db.delete(model).where(model.user_id.in_(user_ids)).execution_options(synchronize_session=False))
+
+    day = db.func.date(db.func.coalesce(Application.applied_date, Application.created_at))
+    rows = db.session.execute(
+        db.select(Application.user_id, day, db.func.count(Application.id))
+        .where(Application.user_id.in_(user_ids), day.is_not(None))
+        .group_by(Application.user_id, day).order_by(Application.user_id, day)
+    ).all()
+    if not rows:
+        return
+
+    days = [{'user_id': user_id, 'day': as_date(value), 'applications': count} for user_id, value, count in rows]
+    runs = []
+    for row in days:
+        last = runs[-1] if runs else None
+        if last and last['user_id'] == row['user_id'] and last['end_day'] + ONE_DAY == row['day']:
+            last['end_day'] = row['day']
+            last['days'] += 1
+        else:
+            runs.append({'user_id': row['user_id'], 'start_day': row['day'], 'end_day': row['day'], 'days': 1})
+
+    streaks = {}
+    for run in runs:
+        # runs come in day order, so the last one per user is the latest
+        streak = streaks.setdefault(run['user_id'], {'user_id': run['user_id'], 'longest': 0})
+        streak.update(current=run['days'], last_day=run['end_day'], longest=max(streak['longest'], run['days']))
+
+    db.session.execute(db.insert(ActivityDay), days)
+    db.session.execute(db.insert(ActivityStreak), runs)
+    db.session.execute(db.insert(UserStreak), list(streaks.values()))
+
+
+def rebuild_streaks(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Recompute every user's active days and streaks from their
+    applications, `batch_size` users per transaction"""
+    rebuilt = 0
+    last_id = 0
+    while True:
+        batch = db.session.scalars(
+            db.select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        _rebuild_users(batch)
+        db.session.commit()
+        rebuilt += len(batch)
+        last_id = batch[-1]
+    return rebuilt
+
+
+@click.command('rebuild-streaks')
+@click.option('--batch-size', default=REBUILD_BATCH_SIZE, help='Users per transaction')
+@with_appcontext
+def rebuild_streaks_command(batch_size):
+    """Recompute streaks, needed once for applications saved before streak tracking"""
+    click.echo(f"Rebuilt streaks for {rebuild_streaks(batch_size)} users")
+
+
+def init_streaks(app):
+    app.cli.add_command(rebuild_streaks_command)
@@ -0,0 +1,41 @@
+import time
+from datetime import date, datetime
+from analytics import get_user_analytics, analytics_cache, week_start
+from models import User, Application, db
+from app import create_app
+
+def test_weekly_buckets_funnel_and_invalidation():
+    app = create_app()
+    today = date(2025, 10, 15)  # a wednesday
+    with app.app_context():
+        user = User(name="Analytics", email=f"analytics_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        for applied, status in [
+            (datetime(2025, 10, 13, 9), 'Applied'),       # this week, monday
+            (datetime(2025, 10, 12, 23), 'Interviewing'), # last week, sunday
+            (datetime(2025, 10, 6), 'Offer'),
+            (datetime(2025, 10, 7), 'Rejected'),
+            (datetime(2024, 1, 1), 'Applied'),            # outside the window, still in the funnel
+        ]:
+            db.session.add(Application(company="Acme", position="Co-op", status=status, applied_date=applied, user_id=user.id))
+        db.session.commit()
+
+        result = get_user_analytics(user.id, weeks=3, today=today)
+        assert [w['week'] for w in result['weeks']] == ['2025-09-29', '2025-10-06', '2025-10-13']
+        assert [w['applications'] for w in result['weeks']] == [0, 3, 1]
+        last_week = result['weeks'][1]
+        assert (last_week['interviews'], last_week['offers'], last_week['offer_rate']) == (2, 1, 33.3)
+        assert result['funnel'] == {'applied': 5, 'interviewing': 2, 'offer': 1, 'rejected': 1, 'ghosted': 0, 'withdrawn': 0}
+        assert result['conversion'] == {'interview_rate': 40.0, 'offer_rate': 20.0, 'offer_per_interview_rate': 50.0}
+
+        # cached until the user's applications change
+        assert get_user_analytics(user.id, weeks=3, today=today) is result
+        db.session.add(Application(company="Globex", position="Co-op", status='Applied',
+                                   applied_date=datetime(2025, 10, 14), user_id=user.id))
+        db.session.commit()
+        assert get_user_analytics(user.id, weeks=3, today=today)['weeks'][-1]['applications'] == 2
+
+def test_week_start():
+    assert week_start(date(2025, 10, 19)) == date(2025, 10, 13)
+    assert week_start(date(2025, 10, 13)) == date(2025, 10, 13)
@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import time
+from datetime import datetime
+import pytest
+from models import User, Application, Achievement, db
+from routes import create_jwt_token, create_stream_token
+from app import create_app
+from ratelimit import Limit
+
+def _make_user(app):
+    with app.app_context():
+        user = User(name="Dashboard", email=f"dashboard_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        for i, status in enumerate(["Applied", "Applied", "Interviewing", "Offer"]):
+            db.session.add(Application(company=f"Company {i}", position="Co-op", status=status,
+                                       applied_date=datetime(2025, 9, 1 + i), user_id=user.id))
+        db.session.add(Achievement(name="First Step", description="Applied", icon="🎯", user_id=user.id))
+        db.session.commit()
+        return user.id, create_jwt_token(user.id)
+
+def test_dashboard_route():
+    app = create_app()
+    user_id, token = _make_user(app)
+    with app.test_client() as client:
+        data = client.get('/dashboard', headers={'Authorization': f'Bearer {token}'}).get_json()
+
+    assert data['user']['id'] == user_id
+    assert data['stats']['total_applications'] == 4
+    assert data['stats']['by_status'] == {'Applied': 2, 'Interviewing': 1, 'Offer': 1}
+    assert data['stats']['offer_rate'] == 25.0
+    assert [a['name'] for a in data['achievements']] == ['First Step']
+    assert len(data['applications']) == 4
+
+def _call_asgi(application, path, headers=()):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                 'root_path': '', 'headers': list(headers), 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+        await application(scope, receive, send)
+        if application.engine is not None:
+            await application.engine.dispose()
+
+    asyncio.run(run())
+    start = next(m for m in messages if m['type'] == 'http.response.start')
+    body = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+    return start, body
+
+def test_asgi_dashboard_matches_wsgi():
+    pytest.importorskip('asgiref')
+    pytest.importorskip('aiosqlite')
+    from asgi import CoopTrackerASGI
+
+    app = create_app()
+    # enough for the calls below, the last one goes over it
+    app.extensions['limiter'].default_limit = Limit.parse('4/minute')
+    user_id, token = _make_user(app)
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.test_client() as client:
+        expected = client.get('/dashboard', headers=headers).get_json()
+
+    application = CoopTrackerASGI(app)
+    start, body = _call_asgi(application, '/dashboard', [(b'authorization', headers['Authorization'].encode())])
+    assert start['status'] == 200
+    assert app.json.loads(body) == expected
+
+    # the Flask hooks still run, compression here and the rate limiter below
+    app.config['COMPRESSION_MIN_SIZE'] = 1
+    start, body = _call_asgi(application, '/dashboard', [(b'authorization', headers['Authorization'].encode()),
+                                                         (b'accept-encoding', b'gzip')])
+    assert dict(start['headers'])[b'content-encoding'] == b'gzip'
+    assert app.json.loads(gzip.decompress(body)) == expected
+
+    # everything else goes through the WSGI bridge
+    start, body = _call_asgi(application, '/achievements', [(b'authorization', headers['Authorization'].encode())])
+    assert start['status'] == 200
+    assert [a['name'] for a in app.json.loads(body)['achievements']] == ['First Step']
+
+    start, body = _call_asgi(application, '/dashboard', [(b'authorization', headers['Authorization'].encode())])
+    assert start['status'] == 429 and b'retry-after' in dict(start['headers'])
+
+def test_wsgi_bridge_runs_requests_on_their_own_threads():
+    pytest.importorskip('asgiref')
+    import threading
+    from flask import Flask
+    from asgi import ThreadPoolWsgiToAsgi
+
+    slow = Flask(__name__)
+
+    @slow.route('/slow')
+    def slow_route():
+        time.sleep(0.2)
+        return threading.current_thread().name
+
+    bridge = ThreadPoolWsgiToAsgi(slow, max_threads=2)
+    bodies = []
+
+    async def call():
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                bodies.append(message.get('body', b''))
+
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': '/slow', 'raw_path': b'/slow', 'query_string': b'',
+                 'root_path': '', 'headers': [], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+        await bridge(scope, receive, send)
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(4)])
+
+    started = time.monotonic()
+    asyncio.run(run())
+    elapsed = time.monotonic() - started
+    # two at a time: not one after another, not all four at once
+    assert 0.4 <= elapsed < 0.75
+    assert len({body for body in bodies if body}) >= 2
+
+def test_asgi_event_stream():
+    pytest.importorskip('asgiref')
+    from asgi import CoopTrackerASGI
+    from events import broker
+
+    app = create_app()
+    app.config.update(SSE_HEARTBEAT_SECONDS=0.05, SSE_MAX_STREAM_SECONDS=0.3)
+    user_id, _ = _make_user(app)
+    with app.app_context():
+        token = create_stream_token(user_id)
+    application = CoopTrackerASGI(app)
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        scope = {'type': 'http', 'method': 'GET', 'path': '/events/stream',
+                 'query_string': f'token={token}'.encode(), 'headers': []}
+        asyncio.get_running_loop().call_later(0.1, broker.publish, [{'user_id': user_id, 'event': 'xp', 'data': {'xp': 5}}])
+        await application(scope, receive, send)
+
+    asyncio.run(run())
+    assert messages[0]['status'] == 200
+    body = b''.join(m.get('body', b'') for m in messages[1:]).decode()
+    assert body.startswith('retry: 3000\n\n')
+    assert 'event: xp\ndata: {"xp":5}' in body.replace('": ', '":')
+    assert ': ping' in body
+    assert broker.stats()['streams'] == 0
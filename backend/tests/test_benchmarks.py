@@ -0,0 +1,37 @@
+from models import User, Application, db
+from benchmarks.synthetic_data import SyntheticDataGenerator, generate
+from benchmarks.load_test import percentile, compare_to_baseline, build_schedule, run_load, InProcessTarget
+from routes import create_jwt_token
+from app import create_app
+
+def test_generator_is_seeded():
+    first = SyntheticDataGenerator(seed=7).application_rows(20)
+    second = SyntheticDataGenerator(seed=7).application_rows(20)
+    assert first == second
+    assert {row['status'] for row in first} <= {'Applied', 'Rejected', 'Ghosted', 'Interviewing', 'Offer', 'Withdrawn'}
+
+def test_percentile_and_baseline_compare():
+    values = sorted(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+    baseline = {'endpoints': {'GET /applications': {'p95_ms': 10.0}}}
+    fast = {'endpoints': {'GET /applications': {'p95_ms': 11.0}}}
+    slow = {'endpoints': {'GET /applications': {'p95_ms': 20.0}}}
+    assert compare_to_baseline(fast, baseline, 0.25) == []
+    assert len(compare_to_baseline(slow, baseline, 0.25)) == 1
+
+def test_small_load_run():
+    app = create_app()
+    with app.app_context():
+        totals = generate(users=3, apps_per_user=5, seed=3)
+        users = User.query.filter(User.email.like(f"{totals['email_prefix']}%")).all()
+        assert len(users) == 3
+        assert Application.query.filter(Application.user_id.in_([u.id for u in users])).count() == totals['applications']
+        tokens = [create_jwt_token(user.id) for user in users]
+
+    report = run_load(InProcessTarget(app), build_schedule(20, tokens, seed=3), concurrency=2)
+    assert report['total_requests'] == 20
+    assert sum(stats['requests'] for stats in report['endpoints'].values()) == 20
+    assert all(stats['errors'] == 0 for stats in report['endpoints'].values())
@@ -131,6 +131,21 @@ def test_status_validation():
     
     print("Status validation test passed\n")
 
+def test_column_validation_matches_row_validation():
+    df = pd.DataFrame({
+        'company': ['Google', '', 'Amazon', None],
+        'position': ['SWE Co-op', 'Intern', '  ', 'Analyst'],
+        'status': ['submitted', 'Offer', 'maybe', ''],
+    })
+    importer = ApplicationImporter(1)
+    cleaned = df.astype(object).where(df.notna(), '').astype(str)
+    by_column = importer.validate_columns(cleaned)
+    for i, row in enumerate(cleaned.to_dict('records')):
+        is_valid, errors, _ = importer.validate_row(row, i + 2)
+        assert [message for _, message in by_column.get(i, [])] == errors
+        assert is_valid == (i not in by_column)
+    assert list(by_column) == [1, 2, 3]
+
 if __name__ == "__main__":
     print("Running bulk import tests...\n")
     
@@ -138,6 +153,7 @@ if __name__ == "__main__":
     test_validation()
     test_date_parsing()
     test_status_validation()
+    test_column_validation_matches_row_validation()
     test_csv_import()
     
     print("All tests completed!")
@@ -0,0 +1,88 @@
+import time
+from companies import normalize_company_name, add_company_alias, backfill_company_ids
+from bulk_import import ApplicationImporter
+from models import User, Application, Company, db
+from routes import create_jwt_token
+from app import create_app
+
+def test_normalize_company_name():
+    assert normalize_company_name("  Google, LLC ") == "google"
+    assert normalize_company_name("Hogwarts & Co") == "hogwarts"
+    assert normalize_company_name("Johnson & Johnson") == "johnson & johnson"
+    assert normalize_company_name("Co") == "co"
+    assert normalize_company_name("...") == ""
+
+def test_applications_link_to_one_company_and_search():
+    app = create_app()
+    suffix = time.time_ns()
+    with app.app_context():
+        user = User(name="Companies", email=f"companies_{suffix}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        token = create_jwt_token(user.id)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        for company in [f"Zyxcorp{suffix}", f"zyxcorp{suffix} Inc.", f"Zyxcorp{suffix}Labs"]:
+            assert client.post('/applications', headers=headers, json={
+                'company': company, 'position': 'Co-op', 'status': 'Applied'
+            }).status_code == 200
+
+        companies = client.get(f'/companies/search?q=ZYXCORP{suffix}').get_json()['companies']
+        assert [c['name'] for c in companies] == [f"Zyxcorp{suffix}", f"Zyxcorp{suffix}Labs"]
+        assert client.get('/companies/search?q=').get_json() == {'companies': []}
+
+    with app.app_context():
+        company_ids = db.session.scalars(db.select(Application.company_id).where(Application.user_id == user.id)
+                                         .order_by(Application.id)).all()
+        assert company_ids[0] == company_ids[1] != company_ids[2]
+
+        # an alias merges the company created under that name into the canonical one
+        add_company_alias(f"Zyxcorp{suffix}", f"Zyxcorp{suffix}Labs")
+        assert len(set(db.session.scalars(db.select(Application.company_id).where(Application.user_id == user.id)))) == 1
+        assert db.session.scalar(db.select(Company).where(Company.normalized_name == f"zyxcorp{suffix}labs")) is None
+
+    with app.test_client() as client:
+        companies = client.get(f'/companies/search?q=zyxcorp{suffix}l').get_json()['companies']
+        assert companies == [{'id': company_ids[0], 'name': f"Zyxcorp{suffix}", 'alias': f"Zyxcorp{suffix}Labs"}]
+
+def test_backfill_links_old_rows():
+    app = create_app()
+    with app.app_context():
+        user = User(name="Backfill", email=f"backfill_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        # written around the ORM like rows from before the company table
+        db.session.execute(db.insert(Application).values(company="Legacy Co", position="Co-op", status="Applied", user_id=user.id))
+        db.session.commit()
+
+        assert backfill_company_ids() >= 1
+        company_id = db.session.scalar(db.select(Application.company_id).where(Application.user_id == user.id))
+        assert db.session.get(Company, company_id).normalized_name == "legacy"
+
+def test_import_creates_companies_only_for_saved_rows():
+    app = create_app()
+    suffix = time.time_ns()
+    with app.app_context():
+        user = User(name="Companies", email=f"companies_{suffix}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        token = create_jwt_token(user.id)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        result = client.post('/applications/bulk-import', headers=headers, json={'applications': [
+            {'company': f"Saved{suffix}", 'position': 'Co-op', 'status': 'Applied'},
+            {'company': f"Saved{suffix}", 'position': 'Co-op', 'status': 'Applied'},
+            {'company': f"Rejected{suffix}", 'position': 'Co-op', 'status': 'maybe'},
+        ]}).get_json()
+        assert result['summary']['successful'] == 1 and result['summary']['failed'] == 2
+
+    with app.app_context():
+        names = db.session.scalars(db.select(Company.normalized_name).where(
+            Company.normalized_name.in_([f"saved{suffix}", f"rejected{suffix}"])
+        )).all()
+        assert names == [f"saved{suffix}"]
+        # a duplicate check on its own writes nothing
+        assert ApplicationImporter(user.id).check_duplicate(f"Checked{suffix}", 'Co-op', None) is False
+        assert db.session.scalar(db.select(Company.id).where(Company.normalized_name == f"checked{suffix}")) is None
@@ -0,0 +1,45 @@
+import gzip
+from flask import Response
+from werkzeug.http import parse_accept_header
+from compression import negotiate_encoding
+from app import create_app
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(parse_accept_header('gzip, deflate')) == 'gzip'
+    assert negotiate_encoding(parse_accept_header('gzip;q=0')) is None
+    assert negotiate_encoding(parse_accept_header('identity')) is None
+    assert negotiate_encoding(parse_accept_header('*')) is not None
+
+def test_large_responses_are_gzipped():
+    app = create_app()
+    with app.test_client() as client:
+        plain = client.get('/applications/import-template')
+        assert 'Content-Encoding' not in plain.headers
+
+        resp = client.get('/applications/import-template', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in resp.headers['Vary']
+        assert gzip.decompress(resp.data) == plain.data
+
+        # cacheable endpoint, the second response reuses the compressed body
+        again = client.get('/applications/import-template', headers={'Accept-Encoding': 'gzip'})
+        assert again.data == resp.data
+
+        small = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in small.headers
+
+def test_streamed_responses_compress_incrementally():
+    app = create_app()
+
+    @app.route('/_stream_test')
+    def stream_test():
+        def generate():
+            for i in range(200):
+                yield f'{{"row": {i}}}\n'
+        return Response(generate(), mimetype='application/json')
+
+    with app.test_client() as client:
+        resp = client.get('/_stream_test', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in resp.headers
+        assert gzip.decompress(resp.data).decode().count('"row"') == 200
@@ -0,0 +1,45 @@
+from sqlalchemy import text
+from config import Config
+from database import db
+from engine_profiles import build_engine_options, normalize_database_url
+from app import create_app
+
+def _config(**overrides):
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.pop('SQLALCHEMY_ENGINE_OPTIONS', None)
+    config.update(overrides)
+    return config
+
+def test_postgres_pool_sized_from_workers():
+    config = _config(WEB_CONCURRENCY=4, GUNICORN_THREADS=2, DB_MAX_CONNECTIONS=20, DB_STATEMENT_TIMEOUT_MS=5000)
+    options = build_engine_options(config, 'postgres://u:p@db.example.com/coop')
+
+    # 4 workers share 20 connections -> 5 each, 2 kept open for the 2 threads
+    assert options['pool_size'] == 2
+    assert options['max_overflow'] == 3
+    assert options['connect_args']['sslmode'] == 'require'
+    assert options['connect_args']['options'] == '-c statement_timeout=5000'
+    assert options['connect_args']['application_name'] == 'coop-tracker'
+
+    local = build_engine_options(config, 'postgresql://localhost/coop')
+    assert local['connect_args']['sslmode'] == 'prefer'
+    assert normalize_database_url('postgres://x/y') == 'postgresql://x/y'
+
+def test_explicit_engine_options_win():
+    config = _config(SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 50})
+    assert build_engine_options(config, 'postgresql://localhost/coop')['pool_size'] == 50
+
+def test_sqlite_pragmas_applied_on_connect():
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+            assert conn.execute(text('PRAGMA cache_size')).scalar() == -app.config['SQLITE_CACHE_SIZE_KB']
+
+    with app.test_client() as client:
+        pool = client.get('/health/db').get_json()['pool']
+        assert pool['backend'] == 'sqlite'
+        assert 'checkedout' in pool
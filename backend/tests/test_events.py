@@ -0,0 +1,132 @@
+import threading
+import time
+from datetime import timedelta
+import pytest
+from events import broker, EventBroker, Subscription, SocketRelay, StreamLimitReached
+from models import User, db, safe_add_xp
+from routes import create_jwt_token, create_stream_token, verify_jwt_token, STREAM_TOKEN_SCOPE
+from app import create_app
+
+def test_broker_targets_users_and_resyncs_slow_streams():
+    local = EventBroker()
+    alice = local.add(Subscription(1, max_queued=2), max_per_user=1)
+    bob = local.add(Subscription(2, max_queued=2), max_per_user=1)
+    with pytest.raises(StreamLimitReached):
+        local.add(Subscription(1, max_queued=2), max_per_user=1)
+
+    local.publish([{'user_id': 1, 'event': 'xp', 'data': {'xp': 10}}, {'user_id': None, 'event': 'leaderboard', 'data': {}}])
+    assert [alice.get(0)['event'], alice.get(0)['event']] == ['xp', 'leaderboard']
+    assert bob.get(0)['event'] == 'leaderboard'
+
+    # more than the stream can hold collapses into one resync
+    local.publish([{'user_id': 2, 'event': 'xp', 'data': {}}] * 3)
+    assert bob.get(0)['event'] == 'resync'
+    local.remove(bob)
+    assert local.stats()['streams'] == 1
+
+def test_socket_relay_reaches_other_workers(tmp_path):
+    received = []
+    arrived = threading.Event()
+
+    def on_message(messages):
+        received.extend(messages)
+        arrived.set()
+
+    sender = SocketRelay(str(tmp_path), lambda messages: None)
+    SocketRelay(str(tmp_path), on_message)
+    sender.send([{'user_id': 7, 'event': 'xp', 'data': {'xp': 70}}])
+    assert arrived.wait(2)
+    assert received == [{'user_id': 7, 'event': 'xp', 'data': {'xp': 70}}]
+
+def test_warm_up_starts_the_relay_for_workers_without_streams(tmp_path, monkeypatch):
+    from ranking import rank_index
+    from warmup import warm_up
+    app = create_app()
+    monkeypatch.setattr(broker, 'relay_factory', lambda on_message: SocketRelay(str(tmp_path), on_message))
+    monkeypatch.setattr(broker, 'relay', None)
+    monkeypatch.setattr(broker, '_relay_pid', None)
+    warm_up(app)
+    assert broker.stats()['streams'] == 0 and isinstance(broker.relay, SocketRelay)
+
+    # another worker's leaderboard move lands in this worker's rank index
+    user_id = max(rank_index._xp_by_user, default=0) + 1000
+    sender = SocketRelay(str(tmp_path), lambda messages: None)
+    sender.send([{'user_id': None, 'event': 'leaderboard', 'data': {'user_id': user_id, 'xp': 4242}}])
+    deadline = time.monotonic() + 2
+    while rank_index.xp_of(user_id) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert rank_index.xp_of(user_id) == 4242
+    rank_index.update({user_id: None})
+    broker.relay.sock.close()
+
+def test_stream_pushes_committed_changes():
+    app = create_app()
+    app.config['SSE_HEARTBEAT_SECONDS'] = 0.05
+    with app.app_context():
+        user = User(name="Events", email=f"events_{time.time_ns()}@northeastern.edu", xp=90, level=1)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        token = create_jwt_token(user_id)
+
+    with app.test_client() as client:
+        stream_token = client.post('/events/token', headers={'Authorization': f'Bearer {token}'}).get_json()['token']
+        response = client.get(f'/events/stream?token={stream_token}', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 3000\n\n'
+
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            safe_add_xp(user, 20)
+            db.session.rollback()  # nothing is pushed for rolled back changes
+            user = db.session.get(User, user_id)
+            safe_add_xp(user, 20)
+            db.session.commit()
+
+        events = [next(chunks).decode() for _ in range(2)]
+        assert events[0].startswith('event: xp\n')
+        assert '"xp_delta":20' in events[0].replace(' ', '') and '"level_up":true' in events[0].replace(' ', '')
+        assert events[1].startswith('event: leaderboard\n')
+        assert next(chunks) == b': ping\n\n'
+        response.close()
+    assert broker.stats()['streams'] == 0
+
+
+def test_stream_tokens_only_open_streams():
+    app = create_app()
+    with app.app_context():
+        session_token, stream_token = create_jwt_token(7), create_stream_token(7)
+        assert verify_jwt_token(session_token) == 7
+        assert verify_jwt_token(session_token, scope=STREAM_TOKEN_SCOPE) is None
+        assert verify_jwt_token(stream_token, scope=STREAM_TOKEN_SCOPE) == 7
+        assert verify_jwt_token(stream_token) is None
+
+        # a reconnect after the token expired is refused, not served as someone else
+        app.config['SSE_TOKEN_EXPIRES'] = timedelta(seconds=-1)
+        expired = create_stream_token(7)
+    with app.test_client() as client:
+        for token in (expired, session_token, 'garbage'):
+            response = client.get(f'/events/stream?token={token}')
+            assert response.status_code == 401
+
+
+def test_unread_stream_gives_its_slot_back():
+    from routes import stream_events
+
+    app = create_app()
+    app.config['SSE_MAX_STREAMS_PER_USER'] = 1
+    with app.app_context():
+        user = User(name="Events", email=f"events_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        stream_token = create_stream_token(user.id)
+
+    # the client goes away before the server reads the first chunk, so the
+    # body generator never starts and its finally never runs
+    for _ in range(3):
+        with app.test_request_context(f'/events/stream?token={stream_token}'):
+            response = stream_events()
+            assert response.status_code == 200
+            response.close()
+    assert broker.stats()['streams'] == 0
@@ -0,0 +1,71 @@
+import time
+import pytest
+from models import User, OfferFeedPost, db
+from feed import create_offer_post, get_feed_page, first_page_cache, decode_cursor
+from routes import create_jwt_token
+from app import create_app
+
+def _make_user(label):
+    timestamp = int(time.time() * 1000)
+    user = User(name=f"Feed {label}", email=f"feed_{label}_{timestamp}@northeastern.edu", xp=0, level=1)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_feed_keyset_pagination():
+    app = create_app()
+    with app.app_context():
+        first_page_cache.clear()
+        user = _make_user("pages")
+        for i in range(7):
+            create_offer_post(user, f"Company {i}", f"Role {i}")
+        db.session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            page = get_feed_page(cursor, limit=3)
+            seen.extend(page['posts'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        assert len(seen) == OfferFeedPost.query.count()
+        keys = [(p['date_posted'], p['id']) for p in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert [p['company'] for p in seen[:7]] == [f"Company {i}" for i in reversed(range(7))]
+
+def test_new_posts_update_cached_first_page():
+    app = create_app()
+    with app.app_context():
+        first_page_cache.clear()
+        user = _make_user("cache")
+        get_feed_page()  # warm the cache
+
+        create_offer_post(user, "Cached Co", "Intern")
+        db.session.commit()
+        assert first_page_cache.get(1)[0]['company'] == "Cached Co"
+
+        # rolled back posts never reach the cache
+        create_offer_post(user, "Rolled Back Co", "Intern")
+        db.session.flush()
+        db.session.rollback()
+        assert get_feed_page(limit=1)['posts'][0]['company'] == "Cached Co"
+
+def test_offer_status_creates_post_and_bad_cursor():
+    app = create_app()
+    with app.app_context():
+        user = _make_user("route")
+        headers = {'Authorization': f'Bearer {create_jwt_token(user.id)}'}
+        with app.test_client() as client:
+            resp = client.post('/applications', json={'company': 'Offer Inc', 'position': 'Co-op', 'status': 'Offer'}, headers=headers)
+            assert resp.status_code == 200
+
+            data = client.get('/feed?limit=1').get_json()
+            assert data['posts'][0]['company'] == 'Offer Inc'
+            assert data['posts'][0]['user_id'] == user.id
+
+            assert client.get('/feed?cursor=not-a-cursor').status_code == 400
+
+    with pytest.raises(ValueError):
+        decode_cursor('garbage')
@@ -0,0 +1,74 @@
+import io
+import time
+from bulk_import import ApplicationImporter
+from models import User, Application, db
+from routes import create_jwt_token
+from app import create_app
+
+FIRST = """company,position,status,applied_date
+Dedup Alpha,Co-op,Applied,2025-01-10
+Dedup Beta Inc,Co-op,Interviewing,2025-01-11
+Dedup Gamma,Intern,Applied,"""
+
+OVERLAP = """company,position,status,applied_date
+dedup alpha,co-op,Applied,2025-01-10
+Dedup Beta,Co-op,Offer,2025-01-11
+Dedup Delta,Co-op,Applied,2025-01-12"""
+
+def _upload(client, headers, content):
+    return client.post('/applications/bulk-import', headers=headers, content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(content.encode()), 'apps.csv')}).get_json()
+
+def test_repeated_and_overlapping_uploads(monkeypatch):
+    app = create_app()
+    with app.app_context():
+        user = User(name="Dedup", email=f"dedup_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f'Bearer {create_jwt_token(user.id)}'}
+
+    checked = []
+    check_duplicate = ApplicationImporter.check_duplicate
+    monkeypatch.setattr(ApplicationImporter, 'check_duplicate',
+                        lambda self, company, *args: checked.append(company) or check_duplicate(self, company, *args))
+
+    with app.test_client() as client:
+        first = _upload(client, headers, FIRST)
+        assert first['summary']['successful'] == 3 and 'duplicate_upload' not in first
+
+        # the same file again never reaches the importer
+        checked.clear()
+        again = _upload(client, headers, FIRST)
+        assert again['duplicate_upload'] is True and again['uploaded_at']
+        assert again['summary'] == first['summary'] and again['successful_imports'] == []
+        assert checked == []
+
+        # rows seen before are duplicates without a check_duplicate query each
+        overlap = _upload(client, headers, OVERLAP)
+        assert overlap['summary'] == {'total_processed': 3, 'successful': 1, 'failed': 2, 'duplicates': 2}
+        assert [failed['row'] for failed in overlap['failed_imports']] == [2, 3]
+        assert checked == ['Dedup Delta']
+
+        # once an application from it is deleted, the first file imports again
+        with app.app_context():
+            db.session.execute(db.delete(Application).where(
+                Application.user_id == user_id, Application.company == 'Dedup Gamma'))
+            db.session.commit()
+        reimport = _upload(client, headers, FIRST)
+        assert 'duplicate_upload' not in reimport
+        assert [row['company'] for row in reimport['successful_imports']] == ['Dedup Gamma']
+
+        applications = [{'company': 'Dedup Json', 'position': 'Co-op', 'status': 'Applied'}]
+        assert client.post('/applications/bulk-import', headers=headers, json={'applications': applications}).get_json()['summary']['successful'] == 1
+        assert 'duplicate_upload' in client.post('/applications/bulk-import', headers=headers, json={'applications': applications}).get_json()
+
+        # a batch that was all duplicates isn't remembered, once what it
+        # duplicated is gone it imports
+        duplicates = [{'company': 'Dedup Alpha', 'position': 'Co-op', 'status': 'Applied', 'applied_date': '2025-01-10'}]
+        skipped = client.post('/applications/bulk-import', headers=headers, json={'applications': duplicates}).get_json()
+        assert skipped['summary']['duplicates'] == 1
+        assert 'duplicate_upload' not in client.post('/applications/bulk-import', headers=headers, json={'applications': duplicates}).get_json()
+        client.delete('/applications/clear-all', headers=headers)
+        imported = client.post('/applications/bulk-import', headers=headers, json={'applications': duplicates}).get_json()
+        assert 'duplicate_upload' not in imported and imported['summary']['successful'] == 1
@@ -0,0 +1,50 @@
+import csv
+import io
+import time
+from bulk_import import row_ranges
+from models import User, db
+from routes import create_jwt_token
+from app import create_app
+
+def _user(app, name):
+    with app.app_context():
+        user = User(name=name, email=f"{name.lower()}_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        return {'Authorization': f'Bearer {create_jwt_token(user.id)}'}
+
+def test_row_ranges():
+    assert row_ranges([]) == []
+    assert row_ranges([9, 2, 3, 4, 7, 10, 10]) == [[2, 4], [7, 7], [9, 10]]
+
+def test_compact_result_and_error_report():
+    app = create_app()
+    headers = _user(app, "Importer")
+    other = _user(app, "Snoop")
+
+    lines = ["company,position,status,notes"]
+    lines += [f"Compact {i},Co-op,Applied,ok" for i in range(30)]  # rows 2-31
+    lines += [f"Compact {i},Co-op,maybe,bad status" for i in range(30, 60)]  # rows 32-61
+    lines += ["Compact 0,Co-op,Applied,again", ",Co-op,Applied,no company"]  # rows 62, 63
+    data = {'file': (io.BytesIO("\n".join(lines).encode()), 'apps.csv')}
+
+    with app.test_client() as client:
+        response = client.post('/applications/bulk-import?result=compact', headers=headers,
+                               data=data, content_type='multipart/form-data')
+        assert response.status_code == 200
+        body = response.get_json()
+        assert 'successful_imports' not in body
+        assert body['imported_rows'] == [[2, 31]]
+        assert body['failed_rows_by_code'] == {'invalid_status': [[32, 61]], 'duplicate': [[62, 62]], 'missing_company': [[63, 63]]}
+        assert set(body['error_messages']) == {'invalid_status', 'duplicate', 'missing_company'}
+        assert len(body['failed_imports']) == 20 and body['failed_imports_truncated']
+        assert body['summary'] == {'total_processed': 62, 'successful': 30, 'failed': 32, 'duplicates': 1}
+
+        report = client.get(body['error_report'], headers=headers)
+        assert report.mimetype == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(report.get_data(as_text=True))))
+        assert [int(row['row']) for row in rows] == list(range(32, 64))
+        assert rows[0]['company'] == 'Compact 30' and rows[0]['error_codes'] == 'invalid_status'
+        assert rows[-1]['error_codes'] == 'missing_company'
+
+        assert client.get(body['error_report'], headers=other).status_code == 404
@@ -0,0 +1,47 @@
+import time
+from insights import rebuild_company_insights
+from models import User, Application, Company, CompanyStats, db
+from routes import create_jwt_token
+from app import create_app
+
+def _user(name):
+    user = User(name=name, email=f"{name.lower()}_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+    db.session.add(user)
+    db.session.commit()
+    return user.id, create_jwt_token(user.id)
+
+def test_insights_follow_writes_and_match_a_rebuild():
+    app = create_app()
+    company = f"Insightful{time.time_ns()}"
+    with app.app_context():
+        first_id, first_token = _user("InsightsA")
+        second_id, second_token = _user("InsightsB")
+
+    with app.test_client() as client:
+        for token, status in [(first_token, 'Applied'), (first_token, 'Interviewing'), (second_token, 'Offer')]:
+            assert client.post('/applications', headers={'Authorization': f'Bearer {token}'}, json={
+                'company': company, 'position': 'Co-op', 'status': status
+            }).status_code == 200
+
+    with app.app_context():
+        company_id = db.session.scalar(db.select(Company.id).where(Company.name == company))
+        applications = db.session.scalars(db.select(Application).where(Application.company_id == company_id)
+                                           .order_by(Application.id)).all()
+        applications[0].status = 'Rejected'
+        db.session.commit()
+        db.session.delete(applications[1])
+        db.session.commit()
+
+    with app.test_client() as client:
+        insights = client.get(f'/companies/{company_id}/insights').get_json()
+        assert insights['company'] == {'id': company_id, 'name': company}
+        assert (insights['applications'], insights['applicants'], insights['interviews'], insights['offers']) == (2, 2, 1, 1)
+        assert insights['offer_rate'] == 50.0
+        assert client.get('/companies/0/insights').status_code == 404
+
+    with app.app_context():
+        stats = db.session.get(CompanyStats, company_id)
+        before = (stats.applications, stats.applicants, stats.interviews, stats.offers)
+        rebuild_company_insights([company_id])
+        stats = db.session.get(CompanyStats, company_id)
+        assert (stats.applications, stats.applicants, stats.interviews, stats.offers) == before
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+import pytest
+from models import User, Application, Achievement, XPBucket, safe_add_xp, safe_subtract_xp, db
+from routes import create_jwt_token, check_and_award_achievements
+from leaderboards import get_window_leaderboard, week_key, cycle_key, period_key_for
+from app import create_app
+
+def test_period_keys():
+    assert week_key(datetime(2025, 9, 18)) == '2025-09-15'
+    assert period_key_for('month', datetime(2025, 9, 18)) == '2025-09'
+    assert cycle_key(datetime(2025, 10, 1)) == '2026-spring'
+    assert cycle_key(datetime(2025, 2, 1)) == '2025-fall'
+    with pytest.raises(ValueError):
+        period_key_for('decade')
+
+def test_xp_changes_roll_up_into_windows():
+    app = create_app()
+    with app.app_context():
+        timestamp = int(time.time() * 1000)
+        leader = User(name="Window Leader", email=f"window_leader_{timestamp}@northeastern.edu", xp=5000, level=1)
+        runner_up = User(name="Window Runner Up", email=f"window_runner_{timestamp}@northeastern.edu", xp=0, level=1)
+        db.session.add_all([leader, runner_up])
+        db.session.commit()
+
+        # lifetime xp doesn't count, only what was earned in the window
+        safe_add_xp(leader, 100)
+        safe_add_xp(runner_up, 300)
+        db.session.commit()
+        safe_add_xp(leader, 400)
+        # losses come out of the windows the xp was earned in, the current
+        # ones when that isn't known
+        safe_subtract_xp(runner_up, 50)
+        safe_subtract_xp(runner_up, 40, earned_at=datetime(2024, 1, 10))
+        db.session.commit()
+
+        bucket = XPBucket.query.filter_by(user_id=leader.id, period='week', period_key=period_key_for('week')).one()
+        assert bucket.xp == 500
+
+        for period in ['week', 'month', 'cycle']:
+            board = get_window_leaderboard(period)['xp_leaderboard']
+            ours = [entry for entry in board if entry['user_id'] in (leader.id, runner_up.id)]
+            assert [(entry['user_id'], entry['xp']) for entry in ours] == [(leader.id, 500), (runner_up.id, 250)]
+
+        # rolled back xp never reaches the buckets
+        safe_add_xp(runner_up, 1000)
+        db.session.rollback()
+        db.session.commit()
+        assert XPBucket.query.filter_by(user_id=runner_up.id, period='week').one().xp == 250
+
+def test_clear_all_and_old_deletes_keep_window_xp():
+    app = create_app()
+    with app.app_context():
+        user = User(name="Window Keeper", email=f"window_keeper_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        # an offer from months ago, its xp was earned back then
+        old = Application(company="Old Co", position="Co-op", status="Offer",
+                          applied_date=datetime(2024, 1, 10), created_at=datetime(2024, 1, 10), user_id=user.id)
+        db.session.add(old)
+        user.xp = 2000
+        db.session.commit()
+        # and so were the achievements it unlocked
+        check_and_award_achievements(user)
+        Achievement.query.filter_by(user_id=user.id).update({'created_at': datetime(2024, 1, 10)})
+        db.session.commit()
+        user_id, old_id = user.id, old.id
+        headers = {'Authorization': f'Bearer {create_jwt_token(user_id)}'}
+
+    def week_xp():
+        with app.app_context():
+            bucket = XPBucket.query.filter_by(user_id=user_id, period='week', period_key=period_key_for('week')).first()
+            return bucket.xp if bucket else 0
+
+    with app.test_client() as client:
+        client.post('/applications', headers=headers, json={'company': 'New Co', 'position': 'Co-op', 'status': 'Applied'})
+        earned = week_xp()
+        assert earned > 0
+        # the old offer's xp comes out of the windows it was earned in, not this week
+        assert client.delete(f'/applications/{old_id}', headers=headers).status_code == 200
+        assert week_xp() == earned
+        # everything earned this week is taken back with it, nothing below 0
+        assert client.delete('/applications/clear-all', headers=headers).status_code == 200
+        assert week_xp() == 0
+
+def test_window_xp_cannot_be_farmed_by_add_and_delete():
+    app = create_app()
+    with app.app_context():
+        user = User(name="Window Farmer", email=f"window_farmer_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f'Bearer {create_jwt_token(user_id)}'}
+
+    def bucket_xp(period):
+        with app.app_context():
+            bucket = XPBucket.query.filter_by(user_id=user_id, period=period, period_key=period_key_for(period)).first()
+            return bucket.xp if bucket else 0
+
+    with app.test_client() as client:
+        for _ in range(3):
+            created = client.post('/applications', headers=headers,
+                                  json={'company': 'Farm Co', 'position': 'Co-op', 'status': 'Offer'}).get_json()
+            assert bucket_xp('week') > 0
+            client.delete(f"/applications/{created['application']['id']}", headers=headers)
+        with app.app_context():
+            assert db.session.get(User, user_id).xp == 0
+        assert [bucket_xp(period) for period in ('week', 'month', 'cycle')] == [0, 0, 0]
+
+def test_window_leaderboard_route():
+    app = create_app()
+    with app.test_client() as client:
+        resp = client.get('/leaderboard?window=week')
+        assert resp.status_code == 200
+        assert resp.get_json()['window'] == 'week'
+        assert client.get('/leaderboard?window=decade').status_code == 400
+        assert client.get('/leaderboard?window=decade&key=2025-09').status_code == 400
@@ -0,0 +1,41 @@
+import json
+import os
+import time
+import pstats
+from profiler import sign_profile_token, verify_profile_token
+from app import create_app
+
+def test_profile_tokens_are_signed_and_expire():
+    token = sign_profile_token('secret', int(time.time()) + 60)
+    assert verify_profile_token('secret', token)
+    assert not verify_profile_token('other-secret', token)
+    assert not verify_profile_token('secret', sign_profile_token('secret', int(time.time()) - 1))
+    assert not verify_profile_token('secret', 'garbage')
+
+def test_signed_requests_write_profiles(tmp_path):
+    app = create_app()
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    token = sign_profile_token(app.config['PROFILE_SECRET'], int(time.time()) + 60)
+
+    with app.test_client() as client:
+        assert 'X-Profile-Id' not in client.get('/leaderboard').headers
+        assert 'X-Profile-Id' not in client.get('/leaderboard', headers={'X-Profile': 'bad.token'}).headers
+        assert os.listdir(tmp_path) == []
+
+        resp = client.get('/leaderboard', headers={'X-Profile': token})
+        profile_id = resp.headers['X-Profile-Id']
+
+    base = tmp_path / f"{profile_id}-routes.get_leaderboard"
+    assert pstats.Stats(f"{base}.pstats").total_calls > 0
+    assert os.path.exists(f"{base}.collapsed")
+    sql = json.loads(open(f"{base}.sql.json").read())
+    assert sql['status'] == 200
+    assert any('FROM user' in s['sql'] for s in sql['statements'])
+
+def test_sampled_endpoints(tmp_path):
+    app = create_app()
+    app.config['PROFILE_DIR'] = str(tmp_path)
+    app.config['PROFILE_SAMPLE_RATES'] = {'routes.health_check': 1.0}
+    with app.test_client() as client:
+        assert 'X-Profile-Id' in client.get('/health').headers
+        assert 'X-Profile-Id' not in client.get('/applications/import-template').headers
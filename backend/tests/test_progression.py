@@ -0,0 +1,57 @@
+import time
+import pytest
+from models import User, get_level, db
+from progression import LevelCurve, relevel_all_users
+from app import create_app
+
+def test_default_curve_matches_original_levels():
+    for xp in [0, 1, 99, 100, 199, 250, 999, 1000, 5432, 99_999, 100_000, 10 ** 7 + 42]:
+        assert get_level(xp) == max(1, xp // 100 + 1)
+    assert get_level(-50) == 1
+    # no cap, the old formula had none
+    assert LevelCurve.from_config(None).xp_for_level(5000) == 499_900
+
+def test_curve_types():
+    geometric = LevelCurve.from_config({'type': 'geometric', 'base': 100, 'ratio': 2, 'max_level': 5})
+    assert geometric.thresholds == [0, 100, 300, 700, 1500]
+    assert geometric.level_for_xp(299) == 2
+    assert geometric.level_for_xp(300) == 3
+    assert geometric.level_for_xp(10 ** 6) == 5
+
+    polynomial = LevelCurve.from_config({'type': 'polynomial', 'base': 50, 'exponent': 2, 'max_level': 4})
+    assert polynomial.thresholds == [0, 50, 200, 450]
+
+    tabulated = LevelCurve.from_config({'type': 'tabulated', 'thresholds': [0, 10, 40]})
+    assert tabulated.level_for_xp(39) == 2
+    assert tabulated.xp_for_level(3) == 40
+
+    with pytest.raises(ValueError):
+        LevelCurve([5, 10])
+    with pytest.raises(ValueError):
+        LevelCurve.from_config({'type': 'logarithmic'})
+
+def test_relevel_all_users():
+    app = create_app()
+    with app.app_context():
+        timestamp = int(time.time() * 1000)
+        users = []
+        for i, xp in enumerate([0, 150, 320, 2000, 250_000]):
+            user = User(name=f"Relevel {i}", email=f"relevel{i}_{timestamp}@northeastern.edu", xp=xp, level=1)
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+
+        curve = LevelCurve.from_config({'type': 'geometric', 'base': 100, 'ratio': 2, 'max_level': 5})
+        # tiny chunks so the range-bounded updates get exercised too
+        relevel_all_users(curve, chunk_size=2)
+
+        for user in users:
+            db.session.refresh(user)
+            assert user.level == curve.level_for_xp(user.xp)
+        assert [u.level for u in users] == [1, 2, 3, 5, 5]
+
+        # an uncapped curve keeps going past its precomputed levels
+        relevel_all_users(LevelCurve.from_config(None))
+        for user in users:
+            db.session.refresh(user)
+        assert [u.level for u in users] == [1, 2, 4, 21, 2501]
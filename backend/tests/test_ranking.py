@@ -0,0 +1,59 @@
+import time
+from ranking import XPRankIndex, rank_index
+from models import User, db, safe_add_xp
+from routes import create_jwt_token
+from app import create_app
+
+def test_rank_index_order_statistics():
+    index = XPRankIndex()
+    index.load([(1, 50), (2, 10), (3, 50), (4, 0)])
+    assert (index.count_above(50), index.count_above(10), index.count_below(50)) == (0, 2, 2)
+    # positions in xp descending order, with how many users are strictly above
+    assert [index.xp_at_position(p) for p in range(4)] == [(50, 0), (50, 0), (10, 2), (0, 3)]
+    assert index.xp_at_position(4) is None
+
+    # past the tree's size it grows, moves and removals keep the counts right
+    index.update({2: 5000, 4: None, 5: 20})
+    assert index.total() == 4
+    assert index.xp_at_position(0) == (5000, 0)
+    assert index.count_above(20) == 3 and index.count_below(20) == 0
+
+    # values past the tree limit live in the overflow list and still rank exactly
+    small = XPRankIndex(tree_limit=64)
+    small.load([(1, 10), (2, 1000), (3, 500), (4, 1000)])
+    assert [small.xp_at_position(p) for p in range(4)] == [(1000, 0), (1000, 0), (500, 2), (10, 3)]
+    assert (small.count_above(500), small.count_below(500), small.count_above(10)) == (2, 1, 3)
+    small.update({2: 20})
+    assert small.xp_at_position(1) == (500, 1) and small.count_above(10) == 3
+
+def test_leaderboard_me_and_offset_paging():
+    app = create_app()
+    suffix = time.time_ns()
+    with app.app_context():
+        # far above everyone else the other tests create
+        users = [User(name=f"Ranked {i}", email=f"ranked_{suffix}_{i}@northeastern.edu", xp=10 ** 9 - i * 10, level=1)
+                 for i in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        ids = [user.id for user in users]
+        token = create_jwt_token(ids[2])
+        total = db.session.scalar(db.select(db.func.count(User.id)))
+        top_before = db.session.scalar(db.select(db.func.count(User.id)).where(User.xp > 10 ** 9))
+
+    with app.test_client() as client:
+        me = client.get('/leaderboard/me?neighbours=1', headers={'Authorization': f'Bearer {token}'}).get_json()
+        assert me['rank'] == top_before + 3
+        assert me['total_users'] == total
+        assert [n['user_id'] for n in me['neighbours']] == ids[1:4]
+        assert [n['is_me'] for n in me['neighbours']] == [False, True, False]
+
+        page = client.get(f'/leaderboard?offset={top_before + 1}&limit=2').get_json()
+        assert [(e['rank'], e['user_id']) for e in page['xp_leaderboard']] == [(top_before + 2, ids[1]), (top_before + 3, ids[2])]
+        assert page['has_more'] and 'achievements_leaderboard' in page
+
+    with app.app_context():
+        # a committed xp change moves the user without a reload
+        safe_add_xp(db.session.get(User, ids[4]), 25)
+        db.session.commit()
+        assert rank_index.xp_of(ids[4]) == 10 ** 9 - 15
+        assert rank_index.count_above(10 ** 9 - 15) == top_before + 2
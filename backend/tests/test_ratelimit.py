@@ -0,0 +1,76 @@
+import time
+from ratelimit import Limit, MemoryStore, SQLiteStore, rate_limited
+from app import create_app
+
+def test_token_bucket_refills():
+    store = MemoryStore()
+    limit = Limit.parse('2/minute')
+    assert store.consume('k', limit, 0)[0]
+    assert store.consume('k', limit, 0)[0]
+    allowed, retry_after = store.consume('k', limit, 0)
+    assert not allowed and retry_after == 30
+    assert store.consume('k', limit, 30)[0]
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'ratelimit.db')
+    worker_a, worker_b = SQLiteStore(path), SQLiteStore(path)
+    limit = Limit.parse('3/hour')
+    assert [worker_a.consume('k', limit, 0)[0], worker_b.consume('k', limit, 0)[0],
+            worker_a.consume('k', limit, 0)[0], worker_b.consume('k', limit, 0)[0]] == [True, True, True, False]
+
+    token = worker_a.acquire_slot('slots', 1, ttl=60, now=0)
+    assert token and worker_b.acquire_slot('slots', 1, ttl=60, now=1) is None
+    # a slot left behind by a dead worker is reclaimed after its ttl
+    assert worker_b.acquire_slot('slots', 1, ttl=60, now=61)
+    worker_a.release_slot('slots', token)
+
+def test_routes_answer_429_and_503():
+    app = create_app()
+
+    @app.route('/_limited', methods=['POST'])
+    @rate_limited(per_user='2/minute')
+    def limited():
+        return {'ok': True}
+
+    @app.route('/_busy', methods=['POST'])
+    @rate_limited(concurrency=1)
+    def busy():
+        return {'ok': True}
+
+    with app.test_client() as client:
+        assert client.post('/_limited').status_code == 200
+        assert client.post('/_limited').status_code == 200
+        resp = client.post('/_limited')
+        assert resp.status_code == 429
+        assert int(resp.headers['Retry-After']) >= 1
+
+        # slots are released when the request finishes
+        assert client.post('/_busy').status_code == 200
+        assert client.post('/_busy').status_code == 200
+
+        # another request is still holding the only slot
+        limiter = app.extensions['limiter']
+        assert limiter.store.acquire_slot('slots:busy', 1, ttl=60, now=time.time())
+        resp = client.post('/_busy')
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After'] == '1'
+
+def test_anonymous_clients_behind_the_proxy_get_their_own_buckets():
+    app = create_app()
+
+    @app.route('/_anonymous', methods=['POST'])
+    @rate_limited(per_user='1/minute')
+    def anonymous():
+        return {'ok': True}
+
+    def post(forwarded_for):
+        # every request reaches the app from the proxy's address
+        return client.post('/_anonymous', headers={'X-Forwarded-For': forwarded_for},
+                           environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code
+
+    with app.test_client() as client:
+        assert post('203.0.113.5') == 200
+        assert post('203.0.113.6') == 200
+        assert post('203.0.113.5') == 429
+        # only the proxy's own entry is trusted, a client can't pick a fresh bucket
+        assert post('198.51.100.1, 203.0.113.5') == 429
@@ -0,0 +1,83 @@
+import time
+from datetime import datetime
+from models import User, Application, Achievement, RecomputeRange, get_level, db
+from recompute import evaluate_rules, recompute_range, latest_unfinished_run, pending_ranges, RuleApplication
+from app import create_app
+
+def _seed(count):
+    # straight inserts, so nothing has been awarded or counted yet
+    stamp = time.time_ns()
+    db.session.execute(db.insert(User), [
+        {'name': f"Recompute {i}", 'email': f"recompute_{stamp}_{i}@northeastern.edu", 'xp': 999, 'level': 3}
+        for i in range(count)
+    ])
+    ids = db.session.scalars(db.select(User.id).where(User.email.like(f"recompute_{stamp}_%")).order_by(User.id)).all()
+    db.session.execute(db.insert(Application), [
+        {'company': f"Co {j}", 'position': 'Co-op', 'status': 'Offer' if j == 0 else 'Applied',
+         'user_id': user_id, 'created_at': datetime(2025, 1, 1)}
+        for n, user_id in enumerate(ids) for j in range(n)
+    ])
+    db.session.execute(db.insert(Achievement), [
+        {'name': 'WE DID IT!', 'description': 'stale', 'icon': '🏆', 'user_id': ids[0]},
+        {'name': 'Retired Badge', 'description': 'gone', 'icon': '🪦', 'user_id': ids[0]},
+    ])
+    db.session.commit()
+    return ids
+
+def test_rules_evaluate_to_a_fixed_point():
+    assert evaluate_rules([], 0) == (0, [])
+    xp, earned = evaluate_rules([RuleApplication('Offer', 'Co')], 0)
+    names = [a.name for a in earned]
+    # the offer's rewards push the user past 500 XP, which is another achievement
+    assert names[0] == 'First Steps' and 'WE DID IT!' in names and 'XP Hunter' in names
+    assert xp == 250 + sum(a.xp_reward for a in earned)
+
+def test_recompute_reconciles_users_and_resumes():
+    app = create_app()
+    with app.app_context():
+        ids = _seed(6)
+        run_id = 'test-' + str(time.time_ns())
+        db.session.execute(db.insert(RecomputeRange), [
+            {'run_id': run_id, 'start_id': ids[0], 'end_id': ids[3]},
+            {'run_id': run_id, 'start_id': ids[3], 'end_id': ids[-1] + 1},
+        ])
+        db.session.commit()
+
+        counts = recompute_range(run_id, ids[0], ids[3], batch_size=2)
+        assert counts['users'] == 3
+        assert pending_ranges(run_id) == [(ids[3], ids[-1] + 1)]
+        assert latest_unfinished_run() is not None
+
+        # no applications: no xp, the stale achievement goes, the retired one stays
+        first = db.session.get(User, ids[0])
+        assert (first.xp, first.level) == (0, 1)
+        assert db.session.scalars(db.select(Achievement.name).where(Achievement.user_id == ids[0])).all() == ['Retired Badge']
+        untouched = db.session.get(User, ids[4])
+        assert untouched.xp == 999
+
+        recompute_range(run_id, ids[3], ids[-1] + 1, batch_size=2)
+        assert pending_ranges(run_id) == []
+        for n, user_id in enumerate(ids):
+            user = db.session.get(User, user_id)
+            xp, earned = evaluate_rules([RuleApplication('Offer' if j == 0 else 'Applied', f"Co {j}") for j in range(n)], 0)
+            assert (user.xp, user.level) == (xp, get_level(xp))
+            names = db.session.scalars(db.select(Achievement.name).where(Achievement.user_id == user_id)).all()
+            assert set(names) - {'Retired Badge'} == {a.name for a in earned}
+
+        # a second pass finds nothing to change
+        db.session.execute(db.insert(RecomputeRange), [{'run_id': run_id + 'b', 'start_id': ids[0], 'end_id': ids[-1] + 1}])
+        db.session.commit()
+        assert recompute_range(run_id + 'b', ids[0], ids[-1] + 1) == {'users': 6, 'xp_changed': 0, 'awarded': 0, 'revoked': 0}
+
+def test_recompute_command_with_a_process_pool():
+    app = create_app()
+    with app.app_context():
+        ids = _seed(3)
+    result = app.test_cli_runner().invoke(args=['recompute', '--workers', '2', '--range-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Recomputed' in result.output
+    run_id = result.output.split()[1].rstrip(':')
+    with app.app_context():
+        assert db.session.get(User, ids[0]).xp == 0
+        assert db.session.scalar(db.select(db.func.count()).select_from(RecomputeRange).where(RecomputeRange.run_id == run_id)) > 1
+        assert pending_ranges(run_id) == []
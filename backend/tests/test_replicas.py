@@ -0,0 +1,75 @@
+import time
+from sqlalchemy.exc import OperationalError
+from models import User, Application, db
+from routes import create_jwt_token
+from app import create_app
+
+def _seed(engine, user_id, email, company):
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(db.insert(User).values(id=user_id, name="Replica", email=email, xp=0, level=1))
+        conn.execute(db.insert(Application).values(company=company, position="Co-op", status="Applied", user_id=user_id))
+
+def test_reads_go_to_the_replica_until_the_client_writes(tmp_path, monkeypatch):
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    monkeypatch.setenv('DATABASE_URL', primary_url)
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"sqlite:///{tmp_path / 'replica.db'}")
+    app = create_app()
+
+    email = f"replica_{time.time_ns()}@northeastern.edu"
+    with app.app_context():
+        # the replica is a stale copy, it never saw the primary's application
+        _seed(db.engine, 1, email, "Primary Co")
+        _seed(db.engines['replica_0'], 1, email, "Replica Co")
+        token = create_jwt_token(1)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        companies = [a['company'] for a in client.get('/applications', headers=headers).get_json()['applications']]
+        assert companies == ["Replica Co"]
+
+        assert client.post('/applications', headers=headers, json={
+            'company': "New Co", 'position': "Co-op", 'status': "Applied"
+        }).status_code == 200
+        # read-your-writes, this client reads from the primary for a while
+        companies = [a['company'] for a in client.get('/applications', headers=headers).get_json()['applications']]
+        assert companies == ["Primary Co", "New Co"]
+
+def test_falls_back_to_the_primary_when_the_replica_is_down(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"sqlite:///{tmp_path / 'replica.db'}")
+    app = create_app()
+    router = app.extensions['replica_router']
+
+    with app.app_context():
+        replica_engine = db.engines['replica_0']
+        assert router.pick() is replica_engine
+
+        def unreachable(replica):
+            raise OperationalError("SELECT 0", {}, Exception("connection refused"))
+        monkeypatch.setattr(router, 'measure_lag', unreachable)
+        assert router.pick(now=time.monotonic() + router.check_interval) is None
+        assert router.stats() == [{'name': 'replica_0', 'healthy': False, 'lag_seconds': 0.0}]
+
+        # too far behind counts as down as well
+        monkeypatch.setattr(router, 'measure_lag', lambda replica: router.max_lag + 1)
+        assert router.pick(now=time.monotonic() + 2 * router.check_interval) is None
+        monkeypatch.setattr(router, 'measure_lag', lambda replica: 0.5)
+        assert router.pick(now=time.monotonic() + 3 * router.check_interval) is replica_engine
+
+def test_a_request_reads_from_one_replica(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', ",".join(f"sqlite:///{tmp_path / name}" for name in ['a.db', 'b.db']))
+    app = create_app()
+    with app.app_context():
+        replicas = {db.engines['replica_0'], db.engines['replica_1']}
+
+    used = []
+    with app.test_request_context('/applications'):
+        app.preprocess_request()
+        for _ in range(4):
+            used.append(db.session.get_bind(clause=db.select(User.id)))
+        # the pinned replica goes down, the rest of the request uses the primary
+        app.extensions['replica_router'].mark_down(used[0])
+        assert db.session.get_bind(clause=db.select(User.id)) is db.engine
+    assert used[0] in replicas and used == [used[0]] * 4
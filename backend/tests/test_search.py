@@ -0,0 +1,83 @@
+import time
+import pytest
+import search
+from models import User, Application, db
+from routes import create_jwt_token
+from app import create_app
+
+def _user_with_notes(app):
+    with app.app_context():
+        user = User(name="Search", email=f"search_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        return user.id, create_jwt_token(user.id)
+
+def _search(client, headers, q, **params):
+    return client.get('/applications/search', headers=headers, query_string={'q': q, **params}).get_json()
+
+@pytest.mark.parametrize('backend', ['fts5', 'like'])
+def test_search_is_ranked_paginated_and_kept_in_sync(backend, monkeypatch):
+    app = create_app()
+    if backend == 'like':
+        monkeypatch.setattr(search, '_search_backends', {})
+        monkeypatch.setattr(search, 'ensure_search_index', lambda engine: 'like')
+    user_id, token = _user_with_notes(app)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        for company, position, notes in [
+            ("Acme", "Backend Engineer Co-op", "Python and Postgres"),
+            ("Globex", "Data Analyst Co-op", "Referred by an engineer, mostly SQL"),
+            ("Initech", "Designer Co-op", "Portfolio review"),
+        ]:
+            client.post('/applications', headers=headers,
+                        json={'company': company, 'position': position, 'status': 'Applied', 'notes': notes})
+
+        results = _search(client, headers, 'engineer')['applications']
+        assert {a['company'] for a in results} == {"Acme", "Globex"}
+        if backend == 'fts5':
+            # the position match ranks above the notes match
+            assert [a['company'] for a in results] == ["Acme", "Globex"]
+            assert '<mark>' in results[0]['snippet']
+
+        # prefix matching on the last word, every word has to match
+        assert [a['company'] for a in _search(client, headers, 'portf')['applications']] == ["Initech"]
+        assert _search(client, headers, 'python portfolio')['applications'] == []
+        assert _search(client, headers, 'NEAR("*"')['applications'] == []
+        # the user's own id only scopes the search, it isn't searchable
+        assert _search(client, headers, str(user_id))['applications'] == []
+        # _ is a wildcard to LIKE, not to the user
+        assert _search(client, headers, 'p_thon')['applications'] == []
+
+        # other users' applications never show up
+        other_id, other_token = _user_with_notes(app)
+        client.post('/applications', headers={'Authorization': f'Bearer {other_token}'},
+                    json={'company': "Hooli", 'position': "Platform Engineer Co-op", 'status': 'Applied'})
+        assert {a['company'] for a in _search(client, headers, 'engineer')['applications']} == {"Acme", "Globex"}
+
+        page = _search(client, headers, 'co op', per_page=2)
+        assert len(page['applications']) == 2 and page['has_more']
+        assert len(_search(client, headers, 'co op', per_page=2, page=2)['applications']) == 1
+
+        # updates and deletes reach the index
+        initech = _search(client, headers, 'portfolio')['applications'][0]
+        client.put(f"/applications/{initech['id']}", headers=headers, json={'notes': 'Whiteboard interview'})
+        assert _search(client, headers, 'portfolio')['applications'] == []
+        assert [a['id'] for a in _search(client, headers, 'whiteboard')['applications']] == [initech['id']]
+        client.delete(f"/applications/{initech['id']}", headers=headers)
+        assert _search(client, headers, 'whiteboard')['applications'] == []
+
+
+def test_outdated_fts_table_is_rebuilt(tmp_path):
+    engine = db.create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(db.text("CREATE TABLE application (id INTEGER PRIMARY KEY, user_id INTEGER, position TEXT, notes TEXT, company TEXT)"))
+        conn.execute(db.text("INSERT INTO application VALUES (1, 5, 'Engineer', NULL, 'Acme')"))
+        # as built before user_id was indexed
+        conn.execute(db.text("CREATE VIRTUAL TABLE application_fts USING fts5(position, notes, company, user_id UNINDEXED, content='application', content_rowid='id')"))
+
+    assert search.ensure_search_index(engine) == 'fts5'
+    with engine.connect() as conn:
+        assert conn.execute(db.text(
+            "SELECT rowid FROM application_fts WHERE application_fts MATCH :match"
+        ), {'match': search._fts5_query(5, ['engineer'])}).all() == [(1,)]
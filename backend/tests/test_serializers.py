@@ -0,0 +1,59 @@
+import time
+from datetime import datetime
+import serializers
+from serializers import ModelSerializer, APPLICATION_SERIALIZER
+from models import User, Application, db
+from routes import create_jwt_token
+from app import create_app
+
+def test_rows_and_objects_serialise_the_same():
+    app = create_app()
+    with app.app_context():
+        user = User(name="Serializer", email=f"serializer_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        application = Application(company="Acme", position="Co-op", status="Applied",
+                                  applied_date=datetime(2025, 9, 1, 12, 30), notes=None, user_id=user.id)
+        db.session.add(application)
+        db.session.commit()
+
+        row = db.session.execute(APPLICATION_SERIALIZER.select().where(Application.id == application.id)).one()
+        assert APPLICATION_SERIALIZER.dump_rows([row]) == [APPLICATION_SERIALIZER.to_dict(application)]
+
+        with app.test_client() as client:
+            headers = {'Authorization': f'Bearer {create_jwt_token(user.id)}'}
+            data = client.get('/applications', headers=headers).get_json()
+        assert data['applications'] == [{
+            'id': application.id,
+            'company': 'Acme',
+            'position': 'Co-op',
+            'status': 'Applied',
+            'applied_date': '2025-09-01T12:30:00',
+            'notes': None,
+            'created_at': application.created_at.isoformat()
+        }]
+
+def test_single_field_serializer():
+    serializer = ModelSerializer(Application, ['created_at'])
+    assert serializer.dump_rows([(datetime(2025, 1, 2),)]) == [{'created_at': '2025-01-02T00:00:00'}]
+    assert serializer.to_dict(Application(created_at=datetime(2025, 1, 2))) == {'created_at': '2025-01-02T00:00:00'}
+
+def test_json_output_does_not_depend_on_orjson(monkeypatch):
+    payload = {'when': datetime(2025, 1, 2, 3, 4, 5), 'day': datetime(2025, 1, 2).date(), 'n': 1}
+    app = create_app()
+    with app.app_context():
+        with_orjson = app.json.response(payload).get_json()
+        monkeypatch.setattr(serializers, 'orjson', None)
+        assert app.json.response(payload).get_json() == with_orjson
+        assert with_orjson['when'] == 'Thu, 02 Jan 2025 03:04:05 GMT'
+
+def test_stdlib_fallback_converts_datetimes(monkeypatch):
+    monkeypatch.setattr(serializers, 'orjson', None)
+    serializer = ModelSerializer(Application, ['id', 'applied_date', 'created_at'])
+    row = (1, datetime(2025, 1, 2, 3, 4, 5), None)
+    assert serializer.dump_rows([row]) == [{'id': 1, 'applied_date': '2025-01-02T03:04:05', 'created_at': None}]
+
+    app = create_app()
+    with app.app_context():
+        response = app.json.response({'when': '2025-01-02T03:04:05', 'n': 1})
+        assert response.get_json() == {'when': '2025-01-02T03:04:05', 'n': 1}
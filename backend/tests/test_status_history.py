@@ -0,0 +1,42 @@
+import json
+import time
+from models import User, Application, ApplicationStatusEvent, db
+from routes import create_jwt_token
+from status_history import backfill_status_events
+from app import create_app
+
+def test_status_changes_are_logged_and_streamed_in_order():
+    app = create_app()
+    with app.app_context():
+        user = User(name="History", email=f"history_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        token = create_jwt_token(user.id)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.test_client() as client:
+        app_id = client.post('/applications', headers=headers, json={
+            'company': 'History Co', 'position': 'Co-op', 'status': 'Applied'
+        }).get_json()['application']['id']
+        for status in ['Interviewing', 'Interviewing', 'Offer']:
+            assert client.put(f'/applications/{app_id}', headers=headers, json={'status': status}).status_code == 200
+        # notes only, no status change
+        client.put(f'/applications/{app_id}', headers=headers, json={'notes': 'signed'})
+
+        response = client.get('/user/status-history', headers=headers)
+        assert response.mimetype == 'application/x-ndjson'
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [(e['from_status'], e['to_status']) for e in events] == [
+            (None, 'Applied'), ('Applied', 'Interviewing'), ('Interviewing', 'Offer')
+        ]
+        assert {e['application_id'] for e in events} == {app_id}
+        assert client.get('/user/status-history?since=tomorrow', headers=headers).status_code == 400
+
+    with app.app_context():
+        # applications from before the log get a creation event, once
+        db.session.execute(db.delete(ApplicationStatusEvent).where(ApplicationStatusEvent.application_id == app_id))
+        db.session.commit()
+        assert backfill_status_events() >= 1
+        assert backfill_status_events() == 0
+        assert db.session.scalars(db.select(ApplicationStatusEvent.to_status)
+                                  .where(ApplicationStatusEvent.application_id == app_id)).all() == ['Offer']
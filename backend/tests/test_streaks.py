@@ -0,0 +1,78 @@
+import time
+from datetime import date, datetime, timedelta
+from streaks import rebuild_streaks, streak_summary
+from models import User, Application, ActivityStreak, UserStreak, db
+from routes import create_jwt_token
+from app import create_app
+
+START = datetime(2025, 3, 3, 12)
+
+def _runs(user_id):
+    return db.session.execute(
+        db.select(ActivityStreak.start_day, ActivityStreak.days).where(ActivityStreak.user_id == user_id)
+        .order_by(ActivityStreak.start_day)
+    ).all()
+
+def test_runs_merge_split_and_match_a_rebuild():
+    app = create_app()
+    with app.app_context():
+        user = User(name="Streaks", email=f"streaks_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+
+        # days 0, 1, 3 and 4, then day 2 joins them into one run of five
+        for offset in [0, 1, 3, 4, 4]:
+            db.session.add(Application(company="Streak Co", position="Co-op", status="Applied",
+                                       applied_date=START + timedelta(days=offset), user_id=user.id))
+        db.session.commit()
+        assert [days for _, days in _runs(user.id)] == [2, 2]
+        gap = Application(company="Streak Co", position="Co-op", status="Applied",
+                          applied_date=START + timedelta(days=2), user_id=user.id)
+        db.session.add(gap)
+        db.session.commit()
+        assert _runs(user.id) == [(START.date(), 5)]
+
+        # moving the middle day away splits the run again, one of two apps on a day keeps it active
+        gap.applied_date = START + timedelta(days=10)
+        db.session.commit()
+        db.session.delete(db.session.scalars(db.select(Application).where(
+            Application.user_id == user.id, Application.applied_date == START + timedelta(days=4))).first())
+        db.session.commit()
+        assert [days for _, days in _runs(user.id)] == [2, 2, 1]
+
+        streak = db.session.get(UserStreak, user.id)
+        assert (streak.current, streak.longest, streak.last_day) == (1, 2, (START + timedelta(days=10)).date())
+        incremental = _runs(user.id)
+
+        rebuild_streaks()
+        assert _runs(user.id) == incremental
+
+def test_streak_summary_and_achievement():
+    assert streak_summary(None) == {'current': 0, 'longest': 0, 'last_active_day': None}
+    streak = UserStreak(current=3, longest=8, last_day=date(2025, 3, 9))
+    assert streak_summary(streak, today=date(2025, 3, 10))['current'] == 3
+    assert streak_summary(streak, today=date(2025, 3, 11)) == {'current': 0, 'longest': 8, 'last_active_day': '2025-03-09'}
+
+    app = create_app()
+    with app.app_context():
+        user = User(name="Grinder", email=f"grinder_{time.time_ns()}@northeastern.edu", xp=0, level=1)
+        db.session.add(user)
+        db.session.commit()
+        # seven distinct days that aren't consecutive don't count
+        for offset in [0, 1, 2, 3, 4, 5, 7]:
+            db.session.add(Application(company="Grind Co", position="Co-op", status="Applied",
+                                       applied_date=START + timedelta(days=offset), user_id=user.id))
+        db.session.commit()
+        token = create_jwt_token(user.id)
+
+    with app.test_client() as client:
+        headers = {'Authorization': f'Bearer {token}'}
+        awarded = [a['name'] for a in client.post('/achievements/check', headers=headers).get_json()['new_achievements']]
+        assert 'Consistent Grinder' not in awarded
+        assert client.get('/user/profile', headers=headers).get_json()['streak']['longest'] == 6
+
+        # the missing day closes the gap
+        response = client.post('/applications', headers=headers, json={
+            'company': 'Grind Co', 'position': 'Co-op', 'status': 'Applied', 'applied_date': (START + timedelta(days=6)).isoformat()
+        })
+        assert 'Consistent Grinder' in [a['name'] for a in response.get_json()['new_achievements']]
@@ -0,0 +1,18 @@
+from achievements.achievements_utils import achievement_index
+from warmup import after_fork, warm_up, hot_statements
+from database import db
+from app import create_app
+
+def test_warm_up_fills_pools_and_statement_cache():
+    app = create_app()
+    app.config['GUNICORN_THREADS'] = 2
+    achievement_index.cache_clear()
+
+    after_fork(app)
+    stats = warm_up(app)
+
+    assert stats['statements'] == len(hot_statements())
+    assert stats['connections'] >= 1
+    assert achievement_index.cache_info().currsize == 1
+    with app.app_context():
+        assert len(db.engine._compiled_cache) > 0
@@ -0,0 +1,92 @@
+import logging
+import time
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from database import db
+from models import User, Achievement, Application
+from achievements.achievements_utils import achievement_index
+from dashboard import user_statement, dashboard_statements
+from serializers import APPLICATION_SERIALIZER
+from leaderboards import get_window_leaderboard
+from feed import get_feed_page
+from ranking import rank_index, board_rows_statement, achievement_counts_statement, LEADERBOARD_PAGE_SIZE
+from events import broker
+
+logger = logging.getLogger(__name__)
+
+# no user has id 0, the statements compile and run but return nothing
+WARMUP_USER_ID = 0
+
+
+def hot_statements() -> List:
+    """The SELECTs behind the most requested endpoints, as the routes build them"""
+    return [
+        user_statement(WARMUP_USER_ID),
+        *dashboard_statements(WARMUP_USER_ID).values(),
+        APPLICATION_SERIALIZER.select().where(Application.user_id == WARMUP_USER_ID).order_by(Application.id),
+        board_rows_statement(0, 0, LEADERBOARD_PAGE_SIZE + 1),
+        achievement_counts_statement([WARMUP_USER_ID]),
+        db.select(User, db.func.count(Achievement.id).label('achievement_count')).join(
+            Achievement, User.id == Achievement.user_id
+        ).group_by(User.id).order_by(db.func.count(Achievement.id).desc()).limit(25),
+        db.select(Achievement.name).where(Achievement.user_id == WARMUP_USER_ID)
+    ]
+
+
+def after_fork(app):
+    """Drop everything the worker inherited from the preloading master.
+    dispose(close=False) leaves the parent's sockets alone and gives the
+    child fresh pools."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    limiter = app.extensions.get('limiter')
+    if limiter is not None:
+        limiter.store.reset_after_fork()
+
+
+def _open_pool(engine, size: int) -> int:
+    # check out `size` connections at once so the pool really holds that many
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(engine.connect())
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+
+def warm_up(app) -> Dict:
+    """Pay the first-request costs before the worker takes traffic: open pool
+    connections, fill SQLAlchemy's compiled statement cache for the hot
+    queries, build the achievement index and run the JSON encoder once."""
+    started = time.perf_counter()
+    stats = {'connections': 0, 'statements': 0}
+    threads = app.config['GUNICORN_THREADS']
+
+    # first, so a failed warm-up still leaves the worker hearing the others' events
+    broker.ensure_relay()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            pool_size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+            stats['connections'] += _open_pool(engine, min(threads, pool_size))
+
+            # compiled statements are cached per engine, replicas need their own pass
+            with Session(engine) as session:
+                for statement in hot_statements():
+                    session.execute(statement).all()
+                    stats['statements'] += 1
+
+        get_window_leaderboard('week')
+        get_feed_page()
+        achievement_index()
+        rank_index.ensure_loaded()
+
+        # first call into orjson and the serialisers
+        app.json.dumps({'applications': APPLICATION_SERIALIZER.dump_rows([]), 'warm': True})
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Worker warmed up: %s", stats)
+    return stats